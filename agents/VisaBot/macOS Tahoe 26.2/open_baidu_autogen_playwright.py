@@ -2,6 +2,7 @@ import asyncio
 import json
 import os
 import sys
+from pathlib import Path
 from typing import Any, AsyncGenerator, Mapping, Sequence, Union
 
 from playwright.sync_api import sync_playwright
@@ -20,6 +21,11 @@ from autogen_core.models import (
 from autogen_core.models._types import LLMMessage
 from autogen_core.tools import FunctionTool, Tool, ToolSchema
 
+# Repository root, so the shared `agents.llm` helpers are importable
+REPO_ROOT = Path(__file__).resolve().parents[3]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
 
 def open_baidu_and_type(query: str) -> str:
     """Open https://www.baidu.com and type the query into the search box."""
@@ -216,6 +222,15 @@ class DummyChatCompletionClient(ChatCompletionClient):
         return None
 
 
+def make_model_client() -> ChatCompletionClient:
+    """Local Ollama model by default; AUTOGEN_DUMMY=1 keeps the scripted client."""
+    if os.environ.get("AUTOGEN_DUMMY") == "1":
+        return DummyChatCompletionClient()
+    from agents.llm.autogen_client import OllamaChatCompletionClient
+
+    return OllamaChatCompletionClient(model=os.environ.get("OLLAMA_MODEL", "llama3.1:8b"))
+
+
 async def main() -> None:
     tool = FunctionTool(
         open_baidu_and_type,
@@ -223,9 +238,10 @@ async def main() -> None:
         description="Open baidu.com and type a query into the search box.",
     )
 
+    model_client = make_model_client()
     assistant = AssistantAgent(
         name="BaiduAssistant",
-        model_client=DummyChatCompletionClient(),
+        model_client=model_client,
         tools=[tool],
         system_message="Use tools to complete the task. Reply with TERMINATE when done.",
         max_tool_iterations=2,
@@ -237,7 +253,12 @@ async def main() -> None:
         max_turns=3,
     )
 
-    await Console(team.run_stream(task="打开百度，并在搜索框输入：顾欣欣"))
+    try:
+        await Console(team.run_stream(task="打开百度，并在搜索框输入：顾欣欣"))
+    finally:
+        result = model_client.close()
+        if asyncio.iscoroutine(result):
+            await result
 
 
 if __name__ == "__main__":
@@ -3,6 +3,7 @@ import asyncio
 import json
 import os
 import sys
+from pathlib import Path
 from typing import Any, AsyncGenerator, Mapping, Sequence, Union
 
 from dotenv import load_dotenv
@@ -20,6 +21,11 @@ from autogen_core.models import ChatCompletionClient, CreateResult, RequestUsage
 from autogen_core.models._types import LLMMessage
 from autogen_core.tools import FunctionTool, Tool, ToolSchema
 
+# Repository root, so the shared `agents.llm` helpers are importable
+REPO_ROOT = Path(__file__).resolve().parents[3]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
 load_dotenv()
 
 def open_tls_and_wait(url: str) -> str:
@@ -163,6 +169,14 @@ class DummyChatCompletionClient(ChatCompletionClient):
     def close(self) -> None:
         return None
 
+def make_model_client(target_url: str) -> ChatCompletionClient:
+    """默认使用本地 Ollama 模型；AUTOGEN_DUMMY=1 时使用固定脚本的 Dummy 客户端"""
+    if os.environ.get("AUTOGEN_DUMMY") == "1":
+        return DummyChatCompletionClient(target_url)
+    from agents.llm.autogen_client import OllamaChatCompletionClient
+
+    return OllamaChatCompletionClient(model=os.environ.get("OLLAMA_MODEL", "llama3.1:8b"))
+
 async def main(target_url: str = "https://visas-fr.tlscontact.com/") -> None:
     """主程序：Autogen 框架调用 MouseWork 模块"""
     tool = FunctionTool(
@@ -171,9 +185,10 @@ async def main(target_url: str = "https://visas-fr.tlscontact.com/") -> None:
         description="Open TLSContact URL, handle verification (auto + manual fallback).",
     )
 
+    model_client = make_model_client(target_url)
     assistant = AssistantAgent(
         name="TLSOpener",
-        model_client=DummyChatCompletionClient(target_url),
+        model_client=model_client,
         tools=[tool],
         system_message="Use open_tls_and_wait tool to open the page. Reply TERMINATE when done.",
         max_tool_iterations=2,
@@ -186,7 +201,12 @@ async def main(target_url: str = "https://visas-fr.tlscontact.com/") -> None:
     )
 
     print(f"🚀 启动 TLSContact 页面工具：{target_url}")
-    await Console(team.run_stream(task=f"打开页面并处理验证：{target_url}"))
+    try:
+        await Console(team.run_stream(task=f"打开页面并处理验证：{target_url}"))
+    finally:
+        result = model_client.close()
+        if asyncio.iscoroutine(result):
+            await result
 
 if __name__ == "__main__":
     if os.name == "posix":
@@ -1,9 +1,22 @@
 #!/usr/bin/env python3
 import argparse
 import os
-from typing import Optional
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
 
-import requests
+# Repository root, so the shared `agents.llm` helpers are importable
+REPO_ROOT = Path(__file__).resolve().parents[3]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from agents.llm.admission import set_priority
+from agents.llm.chat_session import ChatSession
+from agents.llm.client import get_client
+from agents.llm.hedging import Hedger, stream_json
+from agents.llm.model_manager import ModelManager, configured_models, enabled as preload_enabled
+from agents.llm.semantic_cache import SemanticCache
 
 
 def load_dotenv_file(path: str = ".env") -> None:
@@ -40,7 +53,7 @@ SYSTEM_PROMPT = (
 )
 
 
-def ask_ollama(question: str) -> str:
+def ollama_request(question: str) -> Tuple[str, Dict[str, Any]]:
     url = f"{OLLAMA_BASE_URL}/api/chat"
     payload = {
         "model": OLLAMA_MODEL,
@@ -51,13 +64,16 @@ def ask_ollama(question: str) -> str:
         "options": {"temperature": VISABOT_TEMPERATURE},
         "stream": False,
     }
-    response = requests.post(url, json=payload, timeout=120)
-    response.raise_for_status()
-    data = response.json()
+    return url, payload
+
+
+def ask_ollama(question: str) -> str:
+    url, payload = ollama_request(question)
+    data = get_client().post_json(url, payload)
     return data.get("message", {}).get("content", "")
 
 
-def ask_openai(question: str) -> str:
+def openai_request(question: str) -> Tuple[str, Dict[str, Any], Dict[str, str]]:
     if not OPENAI_API_KEY:
         raise RuntimeError("OPENAI_API_KEY is not set in .env")
 
@@ -74,20 +90,60 @@ def ask_openai(question: str) -> str:
             {"role": "user", "content": question},
         ],
     }
+    return url, payload, headers
 
-    response = requests.post(url, headers=headers, json=payload, timeout=120)
-    response.raise_for_status()
-    data = response.json()
+
+def openai_content(data: Dict[str, Any]) -> str:
     choices = data.get("choices", [])
     if not choices:
         return ""
     return choices[0].get("message", {}).get("content", "")
 
 
+def ask_openai(question: str) -> str:
+    url, payload, headers = openai_request(question)
+    return openai_content(get_client().post_json(url, payload, headers=headers))
+
+
+# Enabled with SEMANTIC_CACHE=1: paraphrased questions reuse earlier answers
+SEMANTIC_CACHE = SemanticCache.from_env(
+    namespace=f"visabot-{OPENAI_MODEL if MODEL_TYPE == 'openai' else OLLAMA_MODEL}"
+)
+
+
+# Opt-in with VISABOT_HEDGE_OPENAI=1, since every hedge is a paid OpenAI call:
+# a local answer that is slow to start streaming is raced against OpenAI, and
+# the first to stream a token wins while the other is cancelled.  The delay
+# comes from Ollama's measured first-token times (the metrics log, then this
+# session's answers); until there are enough of them nothing is hedged.
+HEDGER = (
+    Hedger.from_env("VISABOT_HEDGE_OPENAI", require_samples=True)
+    if MODEL_TYPE != "openai" and OPENAI_API_KEY else None
+)
+if HEDGER is not None:
+    HEDGER.seed_from_metrics(OLLAMA_MODEL, endpoint=urlsplit(OLLAMA_BASE_URL).netloc)
+
+
+def ask_hedged(question: str) -> str:
+    url, payload = ollama_request(question)
+    openai_url, openai_payload, headers = openai_request(question)
+    data = HEDGER.call(
+        lambda attempt: stream_json(url, payload, attempt),
+        lambda attempt: stream_json(openai_url, openai_payload, attempt, headers=headers),
+    )
+    if "choices" in data:
+        return openai_content(data)
+    return data.get("message", {}).get("content", "")
+
+
 def ask_visabot(question: str) -> str:
     if MODEL_TYPE == "openai":
-        return ask_openai(question)
-    return ask_ollama(question)
+        ask = ask_openai
+    else:
+        ask = ask_ollama if HEDGER is None else ask_hedged
+    if SEMANTIC_CACHE is None:
+        return ask(question)
+    return SEMANTIC_CACHE.get_or_compute(question, lambda: ask(question))
 
 
 def run_single(question: str) -> None:
@@ -96,41 +152,80 @@ def run_single(question: str) -> None:
     print(answer.strip() or "(empty response)")
 
 
-def run_interactive() -> None:
-    print("VisaBot interactive mode. Type 'exit' to quit.\n")
+def run_turn(session: ChatSession, question: str, turn_stats: bool) -> None:
+    answer = session.send(question)
+    print("\n=== VisaBot ===")
+    print(answer.strip() or "(empty response)")
+    if turn_stats:
+        print(f"[{session.turns[-1].summary()}]")
+
+
+def run_interactive(stateless: bool = False, turn_stats: bool = False) -> None:
+    print("VisaBot interactive mode. Type 'exit' to quit, 'reset' to start a new conversation.\n")
+    # Load the model while the user types the first question, and keep it warm
+    if MODEL_TYPE != "openai" and preload_enabled():
+        ModelManager(OLLAMA_BASE_URL).start(configured_models(OLLAMA_MODEL))
+    # Follow-up questions see the conversation so far; the semantic cache and
+    # hedging only apply to standalone questions
+    session = None
+    if MODEL_TYPE != "openai" and not stateless:
+        session = ChatSession(
+            OLLAMA_MODEL,
+            system=SYSTEM_PROMPT,
+            base_url=OLLAMA_BASE_URL,
+            options={"temperature": VISABOT_TEMPERATURE},
+        )
     while True:
         try:
             user_input = input("visa> ").strip()
         except (KeyboardInterrupt, EOFError):
             print("\nBye")
-            return
+            break
 
         if not user_input:
             continue
         if user_input.lower() in {"exit", "quit"}:
             print("Bye")
-            return
+            break
+        if user_input.lower() == "reset" and session is not None:
+            session.reset()
+            print("Started a new conversation.")
+            continue
 
         try:
-            run_single(user_input)
+            if session is None:
+                run_single(user_input)
+            else:
+                run_turn(session, user_input, turn_stats)
         except Exception as exc:
             print(f"Error: {exc}")
 
+    if session is not None and session.turns:
+        print(session.stats_line())
+    if SEMANTIC_CACHE is not None:
+        print(SEMANTIC_CACHE.stats_line())
+    if HEDGER is not None:
+        print(HEDGER.stats_line())
+
 
-def main(question: Optional[str]) -> None:
+def main(question: Optional[str], stateless: bool = False, turn_stats: bool = False) -> None:
+    # Someone is waiting for the answer: go ahead of batch jobs on the same Ollama
+    set_priority("interactive")
     if question:
         run_single(question)
     else:
-        run_interactive()
+        run_interactive(stateless, turn_stats)
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="VisaBot for macOS Tahoe 26.2")
     parser.add_argument("--question", help="Ask VisaBot a single question and exit")
+    parser.add_argument("--stateless", action="store_true", help="Interactive mode: answer every question on its own")
+    parser.add_argument("--turn-stats", action="store_true", help="Interactive mode: show prompt-eval time per turn")
     args = parser.parse_args()
 
     try:
-        main(args.question)
+        main(args.question, args.stateless, args.turn_stats)
     except Exception as exc:
         print(f"Fatal: {exc}")
         raise
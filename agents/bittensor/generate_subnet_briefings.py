@@ -4,6 +4,10 @@
 Reads result.csv (produced by scrape_tao_subnet_githubs.py), visits each
 GitHub repo, fetches the README, extracts hardware requirements, and writes
 a per-subnet markdown briefing.
+
+Each fetched row is appended to a JSONL run journal (flushed per row), so an
+interrupted run can be continued with ``--resume`` without re-fetching the
+READMEs it already downloaded.
 """
 
 from __future__ import annotations
@@ -11,6 +15,8 @@ from __future__ import annotations
 import argparse
 import base64
 import csv
+import json
+import os
 import re
 import sys
 import time
@@ -24,6 +30,7 @@ DEFAULT_INPUT = SCRIPT_DIR / "result.csv"
 DEFAULT_OUTPUT_DIR = SCRIPT_DIR / "briefings"
 DEFAULT_TIMEOUT = 20
 DEFAULT_DELAY = 1.0
+JOURNAL_FILENAME = ".briefings_journal.jsonl"
 
 
 # ---------------------------------------------------------------------------
@@ -231,6 +238,58 @@ def write_briefing(
     return filepath
 
 
+# ---------------------------------------------------------------------------
+# Run journal
+# ---------------------------------------------------------------------------
+
+def load_journal(journal_path: Path) -> dict[str, dict]:
+    """Read the run journal and return the latest record per subnet_id.
+
+    A run killed mid-write can leave a truncated last line; such lines are
+    ignored so the row is simply fetched again.
+    """
+    records: dict[str, dict] = {}
+    if not journal_path.exists():
+        return records
+    with journal_path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            subnet_id = str(record.get("subnet_id", ""))
+            if subnet_id:
+                records[subnet_id] = record
+    return records
+
+
+def open_journal(journal_path: Path, resume: bool):
+    """Open the journal for appending; a fresh run truncates it.
+
+    On resume, a truncated last line left by a crash mid-write is cut off
+    first, so the next record starts on a line of its own instead of being
+    merged into the broken one (and lost on the following resume).
+    """
+    if not resume:
+        return journal_path.open("w", encoding="utf-8")
+    if journal_path.exists():
+        with journal_path.open("r+b") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+    return journal_path.open("a", encoding="utf-8")
+
+
+def append_journal(handle, record: dict) -> None:
+    """Append one record to the journal and force it to disk."""
+    handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+    handle.flush()
+    os.fsync(handle.fileno())
+
+
 # ---------------------------------------------------------------------------
 # CLI
 # ---------------------------------------------------------------------------
@@ -279,6 +338,17 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Skip subnets that already have a briefing file.",
     )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted run from the journal, reusing fetched READMEs.",
+    )
+    parser.add_argument(
+        "--journal",
+        type=Path,
+        default=None,
+        help=f"Run journal path (default: <output-dir>/{JOURNAL_FILENAME})",
+    )
     return parser.parse_args()
 
 
@@ -310,57 +380,95 @@ def main() -> int:
         "Accept": "application/vnd.github.v3+json",
     })
 
+    journal_path = args.journal or args.output_dir / JOURNAL_FILENAME
+    journal: dict[str, dict] = {}
+    if args.resume:
+        journal = load_journal(journal_path)
+        print(f"Resuming from {journal_path} ({len(journal)} subnets recorded)")
+    # A fresh run truncates the journal; --resume keeps appending to it
+    journal_file = open_journal(journal_path, args.resume)
+
     success = 0
     skipped = 0
     failed = 0
+    resumed = 0
 
-    for i, row in enumerate(rows):
-        subnet_id = row.get("subnet_id", "?")
-        subnet_name = row.get("subnet_name", "unknown")
-        github_url = row.get("github_links", "").strip()
-
-        # Multiple URLs may be pipe-separated
-        urls = [u.strip() for u in github_url.split("|") if u.strip()]
-        owner_repo = None
-        for url in urls:
-            owner_repo = normalize_github_url(url)
-            if owner_repo:
-                break
-
-        if not owner_repo:
-            _safe_print(f"  SN {subnet_id:>3} | {subnet_name} | SKIP: not a repo URL ({github_url})")
-            skipped += 1
-            continue
-
-        owner, repo = owner_repo
-        _safe_print(f"  SN {subnet_id:>3} | {subnet_name} | {owner}/{repo} ...", end=" ")
-
-        # Skip if briefing already exists
-        if args.skip_existing:
-            safe_name = sanitize_filename(subnet_name)
-            existing = args.output_dir / f"SN{subnet_id}_{safe_name}.md"
-            if existing.exists():
-                _safe_print("SKIP (exists)")
+    try:
+        for i, row in enumerate(rows):
+            subnet_id = row.get("subnet_id", "?")
+            subnet_name = row.get("subnet_name", "unknown")
+            github_url = row.get("github_links", "").strip()
+
+            # Multiple URLs may be pipe-separated
+            urls = [u.strip() for u in github_url.split("|") if u.strip()]
+            owner_repo = None
+            for url in urls:
+                owner_repo = normalize_github_url(url)
+                if owner_repo:
+                    break
+
+            if not owner_repo:
+                _safe_print(f"  SN {subnet_id:>3} | {subnet_name} | SKIP: not a repo URL ({github_url})")
                 skipped += 1
                 continue
 
-        readme_text = fetch_readme(session, owner, repo, args.timeout, args.no_api)
-        if readme_text is None:
-            _safe_print("NO README")
-            hw = "无要求"
-        else:
-            hw = extract_hardware_requirements(readme_text)
-            _safe_print("OK" if hw != "无要求" else "OK (no hw info)")
-
-        filepath = write_briefing(
-            args.output_dir, int(subnet_id), subnet_name, owner, repo, hw
-        )
-        success += 1
-
-        if args.delay > 0 and i < len(rows) - 1:
-            time.sleep(args.delay)
+            owner, repo = owner_repo
+            _safe_print(f"  SN {subnet_id:>3} | {subnet_name} | {owner}/{repo} ...", end=" ")
+
+            # Reuse the README fetched by the interrupted run; rows that had
+            # no README are fetched again since there is nothing to reuse.
+            record = journal.get(str(subnet_id))
+            if record is not None and record.get("readme") is not None:
+                hw = extract_hardware_requirements(record["readme"])
+                write_briefing(
+                    args.output_dir, int(subnet_id), subnet_name, owner, repo, hw
+                )
+                _safe_print("RESUMED")
+                resumed += 1
+                success += 1
+                continue
 
-    print(f"\nDone: {success} briefings, {skipped} skipped, {failed} failed")
+            # Skip if briefing already exists
+            if args.skip_existing:
+                safe_name = sanitize_filename(subnet_name)
+                existing = args.output_dir / f"SN{subnet_id}_{safe_name}.md"
+                if existing.exists():
+                    _safe_print("SKIP (exists)")
+                    skipped += 1
+                    continue
+
+            readme_text = fetch_readme(session, owner, repo, args.timeout, args.no_api)
+            if readme_text is None:
+                _safe_print("NO README")
+                hw = "无要求"
+                outcome = "no_readme"
+            else:
+                hw = extract_hardware_requirements(readme_text)
+                _safe_print("OK" if hw != "无要求" else "OK (no hw info)")
+                outcome = "ok" if hw != "无要求" else "no_hw"
+
+            filepath = write_briefing(
+                args.output_dir, int(subnet_id), subnet_name, owner, repo, hw
+            )
+            append_journal(journal_file, {
+                "subnet_id": subnet_id,
+                "subnet_name": subnet_name,
+                "repo": f"{owner}/{repo}",
+                "outcome": outcome,
+                "briefing": filepath.name,
+                "readme": readme_text,
+            })
+            success += 1
+
+            if args.delay > 0 and i < len(rows) - 1:
+                time.sleep(args.delay)
+    except KeyboardInterrupt:
+        print(f"\n[interrupted] rerun with --resume to continue from {journal_path}")
+        return 130
+    finally:
+        journal_file.close()
+
+    print(f"\nDone: {success} briefings ({resumed} resumed), {skipped} skipped, {failed} failed")
     print(f"Output: {args.output_dir}")
     return 0
 
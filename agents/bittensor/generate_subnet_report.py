@@ -4,11 +4,20 @@
 Reads all SN{id}_{name}.md files from the briefings/ directory, parses their
 structured content, classifies hardware requirements, and produces a single
 consolidated report in Chinese.
+
+Classification defaults to a keyword regex.  With ``--llm-classify`` the
+hardware snippets are sent to a local Ollama model in batched JSON-mode
+prompts; answers are cached by a hash of the snippet, the model and the
+prompt version, so reruns only ask about subnets whose hardware text
+changed.
 """
 
 from __future__ import annotations
 
 import argparse
+import hashlib
+import json
+import os
 import re
 import sys
 from pathlib import Path
@@ -17,6 +26,24 @@ from pathlib import Path
 SCRIPT_DIR = Path(__file__).resolve().parent
 DEFAULT_INPUT_DIR = SCRIPT_DIR / "briefings"
 DEFAULT_OUTPUT = SCRIPT_DIR / "subnet_report.md"
+DEFAULT_LLM_CACHE = SCRIPT_DIR / ".hw_classify_cache.json"
+DEFAULT_OLLAMA_URL = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+DEFAULT_OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "llama3.1:8b")
+DEFAULT_LLM_BATCH_SIZE = 32
+DEFAULT_LLM_TIMEOUT = 300
+# Reply tokens allowed per snippet ({"id": .., "category": ".."} plus slack)
+LLM_REPLY_TOKENS_PER_ITEM = 24
+# num_ctx is rounded up to this, so similar batches load the model alike
+LLM_NUM_CTX_STEP = 2048
+# Bump whenever build_classify_prompt changes, so cached answers are re-asked
+CLASSIFY_PROMPT_VERSION = 1
+
+HW_CATEGORIES = ("GPU必需", "CPU为主", "仅内存存储", "其他硬件需求")
+
+# Repository root, so the shared `agents.llm` helpers are importable
+REPO_ROOT = SCRIPT_DIR.parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
 
 
 # ---------------------------------------------------------------------------
@@ -90,15 +117,171 @@ def classify_hw(hw_text: str) -> str:
     return "其他硬件需求"
 
 
+def snippet_hash(hw_text: str, model: str) -> str:
+    """Cache key for a hardware snippet as classified by ``model`` with the current prompt."""
+    key = f"{model}\0{CLASSIFY_PROMPT_VERSION}\0{hw_text}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def load_llm_cache(cache_path: Path) -> dict[str, str]:
+    if not cache_path.exists():
+        return {}
+    try:
+        return json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_llm_cache(cache_path: Path, cache: dict[str, str]) -> None:
+    tmp = cache_path.with_suffix(cache_path.suffix + ".tmp")
+    tmp.write_text(json.dumps(cache, ensure_ascii=False, indent=1), encoding="utf-8")
+    tmp.replace(cache_path)
+
+
+def build_classify_prompt(batch: list[tuple[int, str]]) -> str:
+    """Build one prompt that asks for the categories of a batch of snippets."""
+    lines = [
+        "Classify the hardware requirements of each Bittensor subnet below.",
+        "Allowed categories:",
+        "- GPU必需: a GPU / graphics card / VRAM is required",
+        "- CPU为主: CPU cores matter, no GPU needed",
+        "- 仅内存存储: only RAM, memory or disk/storage is specified",
+        "- 其他硬件需求: anything else",
+        'Reply with JSON only: {"results": [{"id": <id>, "category": "<category>"}, ...]}',
+        "with exactly one entry per id.",
+        "",
+    ]
+    for idx, text in batch:
+        lines.append(f"### id={idx}")
+        lines.append(hw_summary(text, max_len=600))
+        lines.append("")
+    return "\n".join(lines)
+
+
+def batch_num_ctx(prompt: str, items: int, model: str) -> int:
+    """Context size that holds ``prompt`` and the reply for ``items`` snippets.
+
+    Ollama's default context is much smaller than a full batch; a prompt
+    that overflows it is silently truncated and the first ids go missing.
+    """
+    from agents.llm.tokens import get_counter
+
+    needed = get_counter(model).count(prompt) + items * LLM_REPLY_TOKENS_PER_ITEM
+    return -(-needed // LLM_NUM_CTX_STEP) * LLM_NUM_CTX_STEP
+
+
+def request_llm_batch(
+    batch: list[tuple[int, str]], base_url: str, model: str, timeout: int
+) -> dict[int, str]:
+    """Send one batched JSON-mode prompt to Ollama; return {id: category}."""
+    from agents.llm.client import get_client
+
+    url = f"{base_url.rstrip('/')}/api/chat"
+    prompt = build_classify_prompt(batch)
+    payload = {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "format": "json",
+        "stream": False,
+        "options": {"temperature": 0, "num_ctx": batch_num_ctx(prompt, len(batch), model)},
+    }
+    # Batch priority for admission and the retry deadline; `timeout` caps
+    # each attempt, and a generation that timed out is not repeated
+    reply = get_client().post_json(url, payload, timeout=timeout, priority="batch")
+    content = reply.get("message", {}).get("content", "")
+    data = json.loads(content)
+    results = data.get("results", []) if isinstance(data, dict) else data
+
+    answers: dict[int, str] = {}
+    for entry in results:
+        try:
+            idx = int(entry["id"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        category = entry.get("category")
+        if category in HW_CATEGORIES:
+            answers[idx] = category
+    return answers
+
+
+def classify_hw_llm(
+    items: list[dict],
+    base_url: str,
+    model: str,
+    cache_path: Path,
+    batch_size: int = DEFAULT_LLM_BATCH_SIZE,
+    timeout: int = DEFAULT_LLM_TIMEOUT,
+) -> dict[str, int]:
+    """Set item["category"] using a local LLM, batching uncached snippets.
+
+    Snippets a batch reply leaves out are asked about one at a time; those
+    still unanswered (or a failed request) fall back to the regex
+    classifier.  Returns request/cache counters for reporting.
+    """
+    cache = load_llm_cache(cache_path)
+    stats = {"cached": 0, "classified": 0, "fallback": 0, "requests": 0, "single": 0}
+
+    pending: list[tuple[int, str]] = []
+    for idx, item in enumerate(items):
+        if not item["has_hw"]:
+            item["category"] = "无要求"
+            continue
+        cached = cache.get(snippet_hash(item["hw_text"], model))
+        if cached in HW_CATEGORIES:
+            item["category"] = cached
+            stats["cached"] += 1
+        else:
+            pending.append((idx, item["hw_text"]))
+
+    def ask(batch: list[tuple[int, str]]) -> dict[int, str] | None:
+        stats["requests"] += 1
+        try:
+            return request_llm_batch(batch, base_url, model, timeout)
+        except Exception as exc:
+            print(f"[warn] LLM request failed, using regex: {exc}", file=sys.stderr)
+            return None
+
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        answers = ask(batch)
+        if answers is None:
+            answers = {}
+        elif len(batch) > 1:
+            # The reply skipped some ids: ask about those on their own
+            for entry in batch:
+                if entry[0] not in answers:
+                    stats["single"] += 1
+                    answers.update(ask([entry]) or {})
+        for idx, text in batch:
+            category = answers.get(idx)
+            if category is None:
+                items[idx]["category"] = classify_hw(text)
+                stats["fallback"] += 1
+            else:
+                items[idx]["category"] = category
+                cache[snippet_hash(text, model)] = category
+                stats["classified"] += 1
+        # Persist after every batch so an interrupted run keeps its answers
+        if answers:
+            save_llm_cache(cache_path, cache)
+
+    return stats
+
+
 def summarize(items: list[dict]) -> dict:
-    """Compute summary statistics from parsed briefing items."""
+    """Compute summary statistics from parsed briefing items.
+
+    Items that already carry a "category" (e.g. from ``classify_hw_llm``)
+    keep it; the rest are classified with the regex.
+    """
     total = len(items)
     with_hw = sum(1 for i in items if i["has_hw"])
     without_hw = total - with_hw
 
     # Classify each item
     for item in items:
-        item["category"] = classify_hw(item["hw_text"])
+        if "category" not in item:
+            item["category"] = classify_hw(item["hw_text"])
 
     category_counts: dict[str, int] = {}
     for item in items:
@@ -215,6 +398,33 @@ def parse_args() -> argparse.Namespace:
         default=DEFAULT_OUTPUT,
         help=f"Output report file path (default: {DEFAULT_OUTPUT})",
     )
+    parser.add_argument(
+        "--llm-classify",
+        action="store_true",
+        help="Classify hardware requirements with a local Ollama model.",
+    )
+    parser.add_argument(
+        "--llm-url",
+        default=DEFAULT_OLLAMA_URL,
+        help=f"Ollama base URL (default: {DEFAULT_OLLAMA_URL})",
+    )
+    parser.add_argument(
+        "--llm-model",
+        default=DEFAULT_OLLAMA_MODEL,
+        help=f"Ollama model for classification (default: {DEFAULT_OLLAMA_MODEL})",
+    )
+    parser.add_argument(
+        "--llm-batch-size",
+        type=int,
+        default=DEFAULT_LLM_BATCH_SIZE,
+        help="Subnets per LLM request.",
+    )
+    parser.add_argument(
+        "--llm-cache",
+        type=Path,
+        default=DEFAULT_LLM_CACHE,
+        help=f"Classification cache file (default: {DEFAULT_LLM_CACHE})",
+    )
     return parser.parse_args()
 
 
@@ -232,6 +442,21 @@ def main() -> int:
 
     print(f"Loaded {len(items)} briefing files")
 
+    if args.llm_classify:
+        llm_stats = classify_hw_llm(
+            items,
+            args.llm_url,
+            args.llm_model,
+            args.llm_cache,
+            batch_size=max(1, args.llm_batch_size),
+        )
+        print(
+            f"LLM classification: {llm_stats['requests']} requests, "
+            f"{llm_stats['single']} single-item retries, "
+            f"{llm_stats['classified']} classified, {llm_stats['cached']} cached, "
+            f"{llm_stats['fallback']} regex fallback"
+        )
+
     stats = summarize(items)
     report = render_report(items, stats)
 
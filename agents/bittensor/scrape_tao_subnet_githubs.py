@@ -6,15 +6,23 @@ The tao.app explorer is a Next.js SPA protected by Cloudflare.  Subnet data
 so we extract it directly from the single explorer page instead of crawling
 each subnet page individually.
 
+By default the page is streamed: chunks are scanned for the marker as they
+arrive, the array bytes are bracket-matched incrementally and the connection
+is closed as soon as the array ends, so the rest of the payload is never
+downloaded.
+
 Requires: cloudscraper (bypasses Cloudflare challenge), requests
 """
 
 from __future__ import annotations
 
 import argparse
+import codecs
 import csv
 import json
+import re
 import sys
+import time
 from dataclasses import dataclass, asdict
 from pathlib import Path
 
@@ -24,6 +32,9 @@ import cloudscraper
 EXPLORER_URL = "https://www.tao.app/explorer"
 BASE_URL = "https://www.tao.app"
 DEFAULT_TIMEOUT = 30
+DEFAULT_CHUNK_SIZE = 64 * 1024
+ITEMS_MARKER = "subnetScreenerItems"
+MAX_ARRAY_CHARS = 1_000_000
 
 
 @dataclass
@@ -34,6 +45,15 @@ class SubnetGithubInfo:
     github_links: list[str]
 
 
+@dataclass
+class StreamFetchMetrics:
+    bytes_read: int = 0
+    time_to_marker: float | None = None
+    time_to_data: float | None = None
+    elapsed: float = 0.0
+    complete: bool = False
+
+
 def build_scraper() -> cloudscraper.CloudScraper:
     return cloudscraper.create_scraper()
 
@@ -44,9 +64,114 @@ def fetch_explorer_html(scraper: cloudscraper.CloudScraper, timeout: int) -> str
     return response.text
 
 
+class _ArrayScanner:
+    """Incremental bracket matcher for the subnetScreenerItems array.
+
+    Text is fed chunk by chunk; once the marker and the matching closing
+    bracket have been seen, ``done`` is set and ``raw`` holds the array.
+    """
+
+    _BRACKETS = re.compile(r"[\[\]]")
+
+    def __init__(self) -> None:
+        self._pending = ""
+        self._parts: list[str] = []
+        self._size = 0
+        self.found_marker = False
+        self.started = False
+        self.done = False
+        self.depth = 0
+
+    @property
+    def raw(self) -> str:
+        return "".join(self._parts)
+
+    def feed(self, text: str) -> None:
+        if self.done:
+            return
+        if not self.started:
+            text = self._pending + text
+            if not self.found_marker:
+                idx = text.find(ITEMS_MARKER)
+                if idx < 0:
+                    # Keep enough tail to match a marker split across chunks
+                    self._pending = text[-(len(ITEMS_MARKER) - 1):]
+                    return
+                self.found_marker = True
+                text = text[idx + len(ITEMS_MARKER):]
+            start = text.find("[")
+            if start < 0:
+                self._pending = ""
+                return
+            self.started = True
+            self._pending = ""
+            text = text[start:]
+
+        for m in self._BRACKETS.finditer(text):
+            self.depth += 1 if m.group() == "[" else -1
+            if self.depth == 0:
+                self._parts.append(text[: m.end()])
+                self.done = True
+                return
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size > MAX_ARRAY_CHARS:
+            raise ValueError(f"{ITEMS_MARKER} array exceeds {MAX_ARRAY_CHARS} chars")
+
+
+def fetch_subnet_items_streaming(
+    scraper: cloudscraper.CloudScraper,
+    timeout: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> tuple[list[dict], StreamFetchMetrics]:
+    """Stream the explorer page and stop once subnetScreenerItems is complete."""
+    metrics = StreamFetchMetrics()
+    scanner = _ArrayScanner()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    t0 = time.perf_counter()
+
+    response = scraper.get(EXPLORER_URL, timeout=timeout, stream=True)
+    try:
+        response.raise_for_status()
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            if not chunk:
+                continue
+            metrics.bytes_read += len(chunk)
+            scanner.feed(decoder.decode(chunk))
+            if scanner.found_marker and metrics.time_to_marker is None:
+                metrics.time_to_marker = time.perf_counter() - t0
+            if scanner.done:
+                metrics.time_to_data = time.perf_counter() - t0
+                metrics.complete = True
+                break
+    finally:
+        # Drops the connection instead of draining the remaining payload
+        response.close()
+        metrics.elapsed = time.perf_counter() - t0
+
+    if not scanner.done:
+        return [], metrics
+    return _decode_items(scanner.raw), metrics
+
+
+def _decode_items(raw: str) -> list[dict]:
+    """Parse the bracket-matched array text, undoing RSC string escaping."""
+    # Next.js RSC payloads may have escaped quotes
+    raw = raw.replace('\\"', '"')
+
+    try:
+        items = json.loads(raw)
+    except json.JSONDecodeError:
+        # Fallback: more aggressive unescaping
+        raw = raw.replace("\\\\", "\\")
+        items = json.loads(raw)
+
+    return items
+
+
 def extract_subnet_items(explorer_html: str) -> list[dict]:
     """Extract the subnetScreenerItems JSON array from the Next.js RSC payload."""
-    marker = "subnetScreenerItems"
+    marker = ITEMS_MARKER
     idx = explorer_html.find(marker)
     if idx < 0:
         return []
@@ -59,7 +184,7 @@ def extract_subnet_items(explorer_html: str) -> list[dict]:
     # Match brackets to find the end of the JSON array
     depth = 0
     end = start
-    for i in range(start, min(start + 1_000_000, len(explorer_html))):
+    for i in range(start, min(start + MAX_ARRAY_CHARS, len(explorer_html))):
         if explorer_html[i] == "[":
             depth += 1
         elif explorer_html[i] == "]":
@@ -68,18 +193,7 @@ def extract_subnet_items(explorer_html: str) -> list[dict]:
                 end = i + 1
                 break
 
-    raw = explorer_html[start:end]
-    # Next.js RSC payloads may have escaped quotes
-    raw = raw.replace('\\"', '"')
-
-    try:
-        items = json.loads(raw)
-    except json.JSONDecodeError:
-        # Fallback: more aggressive unescaping
-        raw = raw.replace("\\\\", "\\")
-        items = json.loads(raw)
-
-    return items
+    return _decode_items(explorer_html[start:end])
 
 
 def build_subnet_infos(raw_items: list[dict]) -> list[SubnetGithubInfo]:
@@ -166,6 +280,11 @@ def parse_args() -> argparse.Namespace:
         default=None,
         help="Optional output file path. Supports .json and .csv.",
     )
+    parser.add_argument(
+        "--no-stream",
+        action="store_true",
+        help="Download the whole explorer page instead of stopping at the data.",
+    )
     return parser.parse_args()
 
 
@@ -174,12 +293,21 @@ def main() -> int:
     scraper = build_scraper()
 
     try:
-        explorer_html = fetch_explorer_html(scraper, args.timeout)
+        if args.no_stream:
+            raw_items = extract_subnet_items(fetch_explorer_html(scraper, args.timeout))
+        else:
+            raw_items, metrics = fetch_subnet_items_streaming(scraper, args.timeout)
+            ttm = f"{metrics.time_to_marker:.2f}s" if metrics.time_to_marker is not None else "n/a"
+            ttd = f"{metrics.time_to_data:.2f}s" if metrics.time_to_data is not None else "n/a"
+            print(
+                f"[fetch] {metrics.bytes_read} bytes read, time to marker {ttm}, time to data {ttd}, "
+                f"total {metrics.elapsed:.2f}s, complete={metrics.complete}",
+                file=sys.stderr,
+            )
     except Exception as exc:
         print(f"[error] explorer fetch failed: {exc}", file=sys.stderr)
         return 1
 
-    raw_items = extract_subnet_items(explorer_html)
     if not raw_items:
         print("[error] no subnet data found in explorer page", file=sys.stderr)
         return 1
@@ -0,0 +1,39 @@
+"""Tests for the run journal of generate_subnet_briefings.py.
+
+Run with: python -m pytest agents/bittensor
+"""
+import json
+
+import pytest
+
+pytest.importorskip("cloudscraper")
+
+from generate_subnet_briefings import append_journal, load_journal, open_journal  # noqa: E402
+
+
+def test_resume_after_truncated_write_keeps_new_records(tmp_path):
+    journal = tmp_path / "journal.jsonl"
+    complete = json.dumps({"subnet_id": 1, "status": "ok"}) + "\n"
+    # A run killed halfway through writing the record of subnet 2
+    journal.write_text(complete + '{"subnet_id": 2, "sta', encoding="utf-8")
+
+    with open_journal(journal, resume=True) as handle:
+        append_journal(handle, {"subnet_id": 3, "status": "ok"})
+
+    assert journal.read_text(encoding="utf-8").endswith("\n")
+    assert sorted(load_journal(journal)) == ["1", "3"]
+
+    # The record written on resume survives a second resume too
+    with open_journal(journal, resume=True) as handle:
+        append_journal(handle, {"subnet_id": 2, "status": "ok"})
+    assert sorted(load_journal(journal)) == ["1", "2", "3"]
+
+
+def test_fresh_run_truncates_journal(tmp_path):
+    journal = tmp_path / "journal.jsonl"
+    journal.write_text(json.dumps({"subnet_id": 1}) + "\n", encoding="utf-8")
+
+    with open_journal(journal, resume=False) as handle:
+        append_journal(handle, {"subnet_id": 2})
+
+    assert sorted(load_journal(journal)) == ["2"]
@@ -0,0 +1 @@
+"""Shared LLM HTTP helpers used by the agent and example scripts."""
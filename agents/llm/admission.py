@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+"""Priority admission control for a local LLM shared by several programs.
+
+One CPU-bound Ollama serves the GUI, VisaBot and the batch jobs.  Left
+alone, an interactive prompt queues behind every request a batch run has
+in flight.  With ``LLM_ADMISSION=1`` each call first asks a small local
+broker for a slot on its backend (``host:port``):
+
+- at most ``--max-in-flight`` requests run per backend (``--limit`` per host)
+- waiting requests are admitted by priority class (``interactive`` before
+  ``default`` before ``batch``), first come first served within a class
+- one slot is kept for ``interactive`` requests, so a batch never fills
+  the backend completely
+- a slot is held by an open TCP connection to the broker, so a client that
+  crashes releases its slot automatically
+
+The broker is started on first use (``LLM_ADMISSION_AUTOSTART=0`` to turn
+that off) or by hand.  If it cannot be reached, calls go ahead unthrottled.
+Time spent waiting for a slot is logged as ``queue_s`` by
+``agents.llm.metrics``.
+
+Usage:
+  from agents.llm.admission import admit, set_priority
+
+  set_priority("batch")                 # once, in a batch script
+  with admit(url) as queued_s:          # queued_s is None when not gated
+      resp = requests.post(url, json=payload)
+
+  python -m agents.llm.admission serve --max-in-flight 2 --limit gpu-box:11434=4
+  python -m agents.llm.admission status
+
+Environment variables:
+  LLM_ADMISSION              set to 1 to enable (default: 0)
+  LLM_ADMISSION_ADDR         broker address (default: 127.0.0.1:11500)
+  LLM_ADMISSION_MAX_INFLIGHT broker: concurrent requests per backend (default: 2)
+  LLM_ADMISSION_LIMITS       broker: per-backend limits, e.g. localhost:11434=1
+  LLM_ADMISSION_HOSTS        extra non-local hosts to gate, comma-separated
+  LLM_PRIORITY               this process's priority class (default: default)
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import heapq
+import ipaddress
+import itertools
+import json
+import os
+import select
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from agents.llm.config import env_flag
+
+
+PRIORITIES = {"interactive": 0, "default": 1, "batch": 2}
+DEFAULT_PORT = 11500
+DEFAULT_MAX_IN_FLIGHT = int(os.environ.get("LLM_ADMISSION_MAX_INFLIGHT", "2"))
+# Slots per backend that only interactive requests may take
+INTERACTIVE_RESERVE = 1
+CONNECT_TIMEOUT = 0.5
+AUTOSTART_WAIT = 3.0
+# How long to stop trying an unreachable broker
+RETRY_AFTER = 30.0
+_WAIT_POLL = 1.0
+
+_priority = os.environ.get("LLM_PRIORITY", "default")
+
+
+def set_priority(name: str) -> None:
+    """Priority class for every call this process makes from now on."""
+    global _priority
+    if name not in PRIORITIES:
+        raise ValueError(f"unknown priority {name!r}; expected one of {', '.join(PRIORITIES)}")
+    _priority = name
+
+
+def current_priority() -> str:
+    return _priority if _priority in PRIORITIES else "default"
+
+
+_LOOPBACK_NAMES = {"localhost", "::1", "0.0.0.0"}
+
+
+def backend_key(url: str) -> str:
+    """``host:port`` of a URL; loopback spellings share one key."""
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    host = (parts.hostname or "").lower()
+    if host in _LOOPBACK_NAMES:
+        host = "127.0.0.1"
+    return f"{host}:{port}"
+
+
+def parse_limits(spec: str) -> Dict[str, int]:
+    """``"localhost:11434=1, gpu:11434=4"`` -> ``{"127.0.0.1:11434": 1, ...}``."""
+    limits = {}
+    for part in spec.split(","):
+        if "=" in part:
+            key, value = part.rsplit("=", 1)
+            limits[backend_key(f"http://{key.strip()}")] = int(value)
+    return limits
+
+
+def _parse_addr(value: str) -> Tuple[str, int]:
+    host, _, port = value.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+# -- broker ----------------------------------------------------------------
+
+
+class _Backend:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self.waiting: List[Tuple[int, int]] = []
+        self.admitted: Dict[str, int] = {name: 0 for name in PRIORITIES}
+        self.waited: Dict[str, float] = {name: 0.0 for name in PRIORITIES}
+
+
+class Broker:
+    """Per-backend slot accounting with a priority queue of waiters."""
+
+    def __init__(self, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT, limits: Optional[Dict[str, int]] = None):
+        self.max_in_flight = max_in_flight
+        self.limits = dict(limits or {})
+        self._backends: Dict[str, _Backend] = {}
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+
+    def _backend(self, key: str) -> _Backend:
+        if key not in self._backends:
+            self._backends[key] = _Backend(self.limits.get(key, self.max_in_flight))
+        return self._backends[key]
+
+    @staticmethod
+    def _cap(backend: _Backend, priority: str) -> int:
+        if priority == "interactive" or backend.limit <= INTERACTIVE_RESERVE:
+            return backend.limit
+        return backend.limit - INTERACTIVE_RESERVE
+
+    def acquire(self, key: str, priority: str, gone: Callable[[], bool] = lambda: False) -> Optional[float]:
+        """Block until a slot is free; returns the seconds waited, None if the client left."""
+        if priority not in PRIORITIES:
+            priority = "default"
+        t0 = time.monotonic()
+        with self._cond:
+            backend = self._backend(key)
+            ticket = (PRIORITIES[priority], next(self._seq))
+            heapq.heappush(backend.waiting, ticket)
+            try:
+                while backend.waiting[0] != ticket or backend.in_flight >= self._cap(backend, priority):
+                    self._cond.wait(_WAIT_POLL)
+                    if gone():
+                        return None
+                backend.in_flight += 1
+            finally:
+                backend.waiting.remove(ticket)
+                heapq.heapify(backend.waiting)
+                # The next waiter may be admissible now
+                self._cond.notify_all()
+            waited = time.monotonic() - t0
+            backend.admitted[priority] += 1
+            backend.waited[priority] += waited
+            return waited
+
+    def release(self, key: str) -> None:
+        with self._cond:
+            self._backend(key).in_flight -= 1
+            self._cond.notify_all()
+
+    def status(self) -> Dict[str, Any]:
+        with self._cond:
+            by_priority = {v: k for k, v in PRIORITIES.items()}
+            return {
+                key: {
+                    "limit": b.limit,
+                    "in_flight": b.in_flight,
+                    "waiting": [by_priority[p] for p, _ in sorted(b.waiting)],
+                    "admitted": dict(b.admitted),
+                    "mean_wait_s": {
+                        name: round(b.waited[name] / b.admitted[name], 4)
+                        for name in PRIORITIES if b.admitted[name]
+                    },
+                }
+                for key, b in self._backends.items()
+            }
+
+
+def _client_gone(sock: socket.socket) -> bool:
+    readable, _, _ = select.select([sock], [], [], 0)
+    if not readable:
+        return False
+    try:
+        return sock.recv(1, socket.MSG_PEEK) == b""
+    except OSError:
+        return True
+
+
+class _BrokerHandler(socketserver.StreamRequestHandler):
+    server: "BrokerServer"
+
+    def setup(self) -> None:
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        super().setup()
+
+    def _reply(self, message: Dict[str, Any]) -> None:
+        self.wfile.write((json.dumps(message) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+    def handle(self) -> None:
+        try:
+            request = json.loads(self.rfile.readline() or b"{}")
+        except ValueError:
+            return
+        broker = self.server.broker
+        if request.get("op") == "status":
+            self._reply(broker.status())
+            return
+        if request.get("op") != "acquire":
+            return
+        key = str(request.get("backend", "")).lower()
+        waited = broker.acquire(key, str(request.get("priority")), lambda: _client_gone(self.request))
+        if waited is None:
+            return
+        try:
+            self._reply({"ok": True, "wait_s": round(waited, 4)})
+            # The slot is held until the client closes the connection
+            while self.rfile.read(4096):
+                pass
+        except OSError:
+            pass
+        finally:
+            broker.release(key)
+
+
+class BrokerServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    # On Windows SO_REUSEADDR lets a second broker bind the same port
+    allow_reuse_address = os.name != "nt"
+
+    def __init__(self, address: Tuple[str, int], broker: Broker):
+        self.broker = broker
+        super().__init__(address, _BrokerHandler)
+
+
+# -- client ----------------------------------------------------------------
+
+
+def _is_local(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        addr = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return addr.is_loopback or addr.is_private
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        address: Tuple[str, int] = ("127.0.0.1", DEFAULT_PORT),
+        autostart: bool = True,
+        hosts: Optional[Set[str]] = None,
+    ):
+        self.address = address
+        self.autostart = autostart
+        self.hosts = {h.lower() for h in hosts or ()}
+        self._down_until = 0.0
+        self._spawned = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["AdmissionController"]:
+        """Controller configured from ``LLM_ADMISSION*``, or None when disabled."""
+        if not env_flag("LLM_ADMISSION", False):
+            return None
+        hosts = {h.strip() for h in os.environ.get("LLM_ADMISSION_HOSTS", "").split(",") if h.strip()}
+        return cls(
+            _parse_addr(os.environ.get("LLM_ADMISSION_ADDR", f"127.0.0.1:{DEFAULT_PORT}")),
+            autostart=env_flag("LLM_ADMISSION_AUTOSTART", True),
+            hosts=hosts,
+        )
+
+    def gated(self, url: str) -> bool:
+        """Local backends (and ``hosts``) are gated; hosted APIs are not."""
+        key = backend_key(url)
+        host = key.rsplit(":", 1)[0]
+        return _is_local(host) or host in self.hosts or key in self.hosts
+
+    def _spawn_broker(self) -> None:
+        host, port = self.address
+        kwargs: Dict[str, Any] = (
+            {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP} if os.name == "nt" else {"start_new_session": True}
+        )
+        subprocess.Popen(
+            [sys.executable, "-m", "agents.llm.admission", "serve", "--host", host, "--port", str(port)],
+            cwd=str(Path(__file__).resolve().parents[2]),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            **kwargs,
+        )
+
+    def _connect(self) -> Optional[socket.socket]:
+        if time.monotonic() < self._down_until:
+            return None
+        try:
+            return socket.create_connection(self.address, timeout=CONNECT_TIMEOUT)
+        except OSError:
+            pass
+        with self._lock:
+            if time.monotonic() < self._down_until:
+                return None
+            try:
+                # Another thread may have started the broker meanwhile
+                return socket.create_connection(self.address, timeout=CONNECT_TIMEOUT)
+            except OSError:
+                pass
+            if self.autostart and not self._spawned:
+                self._spawned = True
+                try:
+                    self._spawn_broker()
+                except OSError:
+                    pass
+                deadline = time.monotonic() + AUTOSTART_WAIT
+                while time.monotonic() < deadline:
+                    try:
+                        return socket.create_connection(self.address, timeout=CONNECT_TIMEOUT)
+                    except OSError:
+                        time.sleep(0.1)
+        self._down_until = time.monotonic() + RETRY_AFTER
+        return None
+
+    @contextlib.contextmanager
+    def admit(self, url: str, priority: Optional[str] = None) -> Iterator[Optional[float]]:
+        """Hold a slot on ``url``'s backend for the duration of the block.
+
+        Yields the seconds spent queueing, or None if the call was not gated
+        (hosted API, or the broker is unreachable).  The wait is bounded by
+        the current ``agents.llm.retry`` deadline (or the priority's default
+        one); past it, ``DeadlineExceeded`` is raised and the broker drops
+        the queue entry when the connection closes.
+        """
+        from agents.llm.retry import DEFAULT_DEADLINES, DeadlineExceeded, cap_timeout
+
+        if not self.gated(url):
+            yield None
+            return
+        t0 = time.perf_counter()
+        sock = self._connect()
+        if sock is None:
+            yield None
+            return
+        try:
+            priority = priority or current_priority()
+            wait_s = cap_timeout(DEFAULT_DEADLINES.get(priority, DEFAULT_DEADLINES["default"]))
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.settimeout(wait_s)
+            request = {"op": "acquire", "backend": backend_key(url), "priority": priority}
+            sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+            try:
+                reply = sock.makefile("rb").readline()
+            except socket.timeout:
+                raise DeadlineExceeded(
+                    f"no admission slot on {backend_key(url)} within {wait_s:.1f}s"
+                ) from None
+            # An empty reply means the broker went away: carry on unthrottled
+            yield time.perf_counter() - t0 if reply else None
+        finally:
+            sock.close()
+
+
+_default: Optional[AdmissionController] = None
+_default_loaded = False
+
+
+def get_admission() -> Optional[AdmissionController]:
+    global _default, _default_loaded
+    if not _default_loaded:
+        _default = AdmissionController.from_env()
+        _default_loaded = True
+    return _default
+
+
+def admit(url: str, priority: Optional[str] = None) -> "contextlib.AbstractContextManager[Optional[float]]":
+    """``get_admission().admit(...)``, or a no-op yielding None when disabled."""
+    controller = get_admission()
+    if controller is None:
+        return contextlib.nullcontext(None)
+    return controller.admit(url, priority)
+
+
+def query_status(address: Tuple[str, int]) -> Dict[str, Any]:
+    with socket.create_connection(address, timeout=CONNECT_TIMEOUT) as sock:
+        sock.sendall(b'{"op": "status"}\n')
+        return json.loads(sock.makefile("rb").readline())
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="Run the admission broker")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--max-in-flight", type=int, default=DEFAULT_MAX_IN_FLIGHT, help="Concurrent requests per backend")
+    serve.add_argument("--limit", action="append", default=[], metavar="HOST:PORT=N", help="Per-backend limit")
+    status = sub.add_parser("status", help="Show slots and queues of a running broker")
+    status.add_argument("--addr", default=os.environ.get("LLM_ADMISSION_ADDR", f"127.0.0.1:{DEFAULT_PORT}"))
+    args = parser.parse_args()
+
+    if args.command == "status":
+        try:
+            backends = query_status(_parse_addr(args.addr))
+        except OSError as exc:
+            print(f"No broker at {args.addr}: {exc}")
+            return 1
+        if not backends:
+            print("No requests seen yet")
+        for key, b in backends.items():
+            waits = ", ".join(f"{k} {v:.2f}s" for k, v in b["mean_wait_s"].items()) or "-"
+            print(
+                f"{key:<24} in flight {b['in_flight']}/{b['limit']}  waiting {len(b['waiting'])} "
+                f"{b['waiting'] or ''}  admitted {sum(b['admitted'].values())}  mean wait: {waits}"
+            )
+        return 0
+
+    limits = parse_limits(os.environ.get("LLM_ADMISSION_LIMITS", ""))
+    limits.update(parse_limits(",".join(args.limit)))
+    server = BrokerServer((args.host, args.port), Broker(args.max_in_flight, limits))
+    print(f"admission broker on {args.host}:{args.port}, {args.max_in_flight} in flight per backend")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,361 @@
+"""AutoGen ``ChatCompletionClient`` for a local Ollama server.
+
+Talks to the native ``/api/chat`` endpoint through the shared
+``agents.llm.client`` (pooled keep-alive connections, retries within the
+priority's deadline, admission and metrics), run off the event loop, so
+an AutoGen team reasons with a real local model:
+
+- ``create_stream`` yields text deltas as Ollama produces them, then the
+  final ``CreateResult``
+- tools are sent in Ollama's function format and ``tool_calls`` in the
+  reply become ``FunctionCall`` objects; tool results go back as
+  ``role: tool`` messages
+- ``RequestUsage`` comes from Ollama's ``prompt_eval_count`` and
+  ``eval_count``
+- reasoning (Ollama's ``thinking`` or a leading ``<think>`` block) goes
+  to ``CreateResult.thought``, never into ``content``
+- ``json_output`` maps to ``format`` (``"json"`` or a Pydantic model's
+  JSON schema)
+- blocking work runs in worker threads that see the caller's context, so an
+  enclosing ``agents.llm.retry.deadline()`` applies
+
+A cancelled ``create_stream`` closes its response, which ends generation
+on the server.  Cancelling ``create`` is best-effort: the caller is released
+at once, but the request runs to completion in its worker thread, keeping
+its connection and admission slot until then.
+
+Usage:
+  client = OllamaChatCompletionClient(model="llama3.1:8b")
+  agent = AssistantAgent("assistant", model_client=client, tools=[tool])
+  ...
+  await client.close()
+
+Requires ``autogen-core``.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import time
+import uuid
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Dict, List, Mapping, Optional, Sequence, Union
+
+from autogen_core import CancellationToken, FunctionCall, Image
+from autogen_core.models import (
+    AssistantMessage,
+    ChatCompletionClient,
+    CreateResult,
+    FunctionExecutionResultMessage,
+    LLMMessage,
+    ModelInfo,
+    RequestUsage,
+    SystemMessage,
+    UserMessage,
+)
+from autogen_core.tools import Tool, ToolSchema
+
+from agents.llm.admission import admit
+from agents.llm.chat_session import DEFAULT_NUM_CTX
+from agents.llm.client import get_client
+from agents.llm.metrics import record_call
+from agents.llm.model_manager import DEFAULT_KEEP_ALIVE
+from agents.llm.streaming import _DONE, extract_delta, parse_stream_line
+from agents.llm.tokens import get_counter
+
+
+DEFAULT_MODEL_INFO: ModelInfo = {
+    "vision": False,
+    "function_calling": True,
+    "json_output": True,
+    "family": "unknown",
+    "structured_output": True,
+    "multiple_system_messages": True,
+}
+# Top-level /api/chat fields accepted in extra_create_args; anything else is a model option
+_REQUEST_FIELDS = ("keep_alive", "format", "think")
+
+
+def _image_b64(image: Image) -> str:
+    return image.to_base64()
+
+
+def to_ollama_messages(messages: Sequence[LLMMessage]) -> List[Dict[str, Any]]:
+    """AutoGen messages as ``/api/chat`` messages."""
+    out: List[Dict[str, Any]] = []
+    for message in messages:
+        if isinstance(message, SystemMessage):
+            out.append({"role": "system", "content": message.content})
+        elif isinstance(message, UserMessage):
+            if isinstance(message.content, str):
+                out.append({"role": "user", "content": message.content})
+            else:
+                text = "\n".join(part for part in message.content if isinstance(part, str))
+                images = [_image_b64(part) for part in message.content if isinstance(part, Image)]
+                out.append({"role": "user", "content": text, **({"images": images} if images else {})})
+        elif isinstance(message, AssistantMessage):
+            if isinstance(message.content, str):
+                out.append({"role": "assistant", "content": message.content})
+            else:
+                calls = [
+                    {"function": {"name": call.name, "arguments": _arguments(call.arguments)}}
+                    for call in message.content
+                ]
+                out.append({"role": "assistant", "content": message.thought or "", "tool_calls": calls})
+        elif isinstance(message, FunctionExecutionResultMessage):
+            for result in message.content:
+                # ``name`` was added to FunctionExecutionResult in autogen-core 0.4.8
+                name = getattr(result, "name", None)
+                out.append({"role": "tool", "content": result.content, **({"tool_name": name} if name else {})})
+    return out
+
+
+def _arguments(raw: str) -> Any:
+    try:
+        return json.loads(raw) if raw else {}
+    except ValueError:
+        return raw
+
+
+def _tool_schema(tool: Union[Tool, ToolSchema]) -> Dict[str, Any]:
+    schema = tool.schema if isinstance(tool, Tool) else tool
+    return {
+        "type": "function",
+        "function": {
+            "name": schema["name"],
+            "description": schema.get("description", ""),
+            "parameters": schema.get("parameters", {"type": "object", "properties": {}}),
+        },
+    }
+
+
+def _split_thought(content: str) -> "tuple[Optional[str], str]":
+    """Separate a leading ``<think>...</think>`` block (deepseek-r1 and similar).
+
+    A block that is never closed (the reply stopped while thinking) is all thought.
+    """
+    stripped = content.lstrip()
+    if stripped.startswith("<think>"):
+        thought, _, rest = stripped[len("<think>"):].partition("</think>")
+        return thought.strip() or None, rest.lstrip()
+    return None, content
+
+
+def _in_thread(fn: Callable[..., Any], *args: Any) -> "asyncio.Future[Any]":
+    """``fn(*args)`` in the default executor, with the caller's contextvars (e.g. its deadline)."""
+    context = contextvars.copy_context()
+    return asyncio.get_running_loop().run_in_executor(None, functools.partial(context.run, fn, *args))
+
+
+class OllamaChatCompletionClient(ChatCompletionClient):
+    def __init__(
+        self,
+        model: str,
+        base_url: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+        num_ctx: int = DEFAULT_NUM_CTX,
+        keep_alive: str = DEFAULT_KEEP_ALIVE,
+        model_info: Optional[ModelInfo] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.model = model
+        self.url = f"{(base_url or os.environ.get('OLLAMA_BASE_URL', 'http://localhost:11434')).rstrip('/')}/api/chat"
+        # Stable options (num_ctx above all) keep Ollama from reloading the model
+        self.options = dict(options or {}, num_ctx=num_ctx)
+        self.num_ctx = num_ctx
+        self.keep_alive = keep_alive
+        self._model_info: ModelInfo = dict(DEFAULT_MODEL_INFO, **(model_info or {}))  # type: ignore[assignment]
+        # Per-attempt read timeout; None means the client's LLM_CHAT_TIMEOUT
+        self.timeout = timeout
+        self._counter = get_counter(model)
+        self._total_usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+        self._actual_usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+
+    # -- request building ----------------------------------------------------
+
+    def _payload(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Union[Tool, ToolSchema]],
+        tool_choice: Union[Tool, str],
+        json_output: Union[bool, type, None],
+        extra_create_args: Mapping[str, Any],
+        stream: bool,
+    ) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {
+            "model": self.model,
+            "messages": to_ollama_messages(messages),
+            "options": dict(self.options),
+            "keep_alive": self.keep_alive,
+            "stream": stream,
+        }
+        if tools and tool_choice != "none":
+            if isinstance(tool_choice, Tool):
+                tools = [t for t in tools if _tool_schema(t)["function"]["name"] == tool_choice.name]
+            payload["tools"] = [_tool_schema(t) for t in tools]
+        if json_output is True:
+            payload["format"] = "json"
+        elif isinstance(json_output, type) and hasattr(json_output, "model_json_schema"):
+            payload["format"] = json_output.model_json_schema()
+        for key, value in extra_create_args.items():
+            if key == "options":
+                payload["options"].update(value)
+            elif key in _REQUEST_FIELDS:
+                payload[key] = value
+            else:
+                payload["options"][key] = value
+        return payload
+
+    def _result(
+        self, final: Dict[str, Any], content: str, tool_calls: List[Dict[str, Any]], thinking: str = ""
+    ) -> CreateResult:
+        usage = RequestUsage(
+            prompt_tokens=int(final.get("prompt_eval_count") or 0),
+            completion_tokens=int(final.get("eval_count") or 0),
+        )
+        for attr in ("_total_usage", "_actual_usage"):
+            current = getattr(self, attr)
+            setattr(self, attr, RequestUsage(
+                prompt_tokens=current.prompt_tokens + usage.prompt_tokens,
+                completion_tokens=current.completion_tokens + usage.completion_tokens,
+            ))
+        thought, text = _split_thought(content)
+        thought = thinking or (final.get("message") or {}).get("thinking") or thought
+        if tool_calls:
+            # Prose next to tool calls is reasoning too; content holds only the calls
+            thought = "\n\n".join(part for part in (thought, text) if part) or None
+            calls = [
+                FunctionCall(
+                    id=call.get("id") or f"call_{uuid.uuid4().hex[:12]}",
+                    name=call["function"]["name"],
+                    arguments=json.dumps(call["function"].get("arguments") or {}, ensure_ascii=False),
+                )
+                for call in tool_calls
+            ]
+            return CreateResult(
+                finish_reason="function_calls", content=calls, usage=usage, cached=False, thought=thought
+            )
+        reason = final.get("done_reason")
+        finish = reason if reason in ("stop", "length") else "stop" if final.get("done") else "unknown"
+        return CreateResult(finish_reason=finish, content=text, usage=usage, cached=False, thought=thought)
+
+    @contextlib.asynccontextmanager
+    async def _slot(self) -> AsyncIterator[Optional[float]]:
+        # admit() blocks on a socket; wait for the slot off the event loop
+        cm = admit(self.url)
+        waiting = _in_thread(cm.__enter__)
+        try:
+            queued = await asyncio.shield(waiting)
+        except asyncio.CancelledError:
+            waiting.add_done_callback(lambda _: cm.__exit__(None, None, None))
+            raise
+        try:
+            yield queued
+        finally:
+            cm.__exit__(None, None, None)
+
+    # -- ChatCompletionClient ------------------------------------------------
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Union[Tool, ToolSchema]] = (),
+        tool_choice: Union[Tool, str] = "auto",
+        json_output: Union[bool, type, None] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        payload = self._payload(messages, tools, tool_choice, json_output, extra_create_args, stream=False)
+        # post_json waits for admission, retries and logs the call itself.
+        # Cancelling releases the caller only; the request itself runs on
+        request = _in_thread(lambda: get_client().post_json(self.url, payload, timeout=self.timeout))
+        if cancellation_token is not None:
+            cancellation_token.link_future(request)
+        data = await request
+        message = data.get("message") or {}
+        return self._result(data, message.get("content") or "", message.get("tool_calls") or [])
+
+    async def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Union[Tool, ToolSchema]] = (),
+        tool_choice: Union[Tool, str] = "auto",
+        json_output: Union[bool, type, None] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        payload = self._payload(messages, tools, tool_choice, json_output, extra_create_args, stream=True)
+        parts: List[str] = []
+        thinking: List[str] = []
+        tool_calls: List[Dict[str, Any]] = []
+        final: Dict[str, Any] = {}
+        ttft: Optional[float] = None
+        async with self._slot() as queued:
+            t0 = time.perf_counter()
+            # Retried within the deadline until the response headers arrive
+            resp = await _in_thread(lambda: get_client().open_stream(self.url, payload, timeout=self.timeout))
+            reading: List["asyncio.Future[Any]"] = []
+            if cancellation_token is not None:
+                # Stop waiting at once; closing the response below ends the generation
+                cancellation_token.add_callback(lambda: reading and reading[-1].cancel())
+            try:
+                resp.raise_for_status()
+                lines = resp.iter_lines()
+                while True:
+                    if cancellation_token is not None and cancellation_token.is_cancelled():
+                        raise asyncio.CancelledError()
+                    reading[:] = [_in_thread(next, lines, None)]
+                    line = await reading[0]
+                    if line is None:
+                        break
+                    event = parse_stream_line(line)
+                    if event is None:
+                        continue
+                    if event is _DONE:
+                        break
+                    delta = extract_delta(event)
+                    message = event.get("message") or {}
+                    tool_calls.extend(message.get("tool_calls") or [])
+                    if message.get("thinking"):
+                        thinking.append(message["thinking"])
+                    if delta:
+                        if ttft is None:
+                            ttft = time.perf_counter() - t0
+                        parts.append(delta)
+                        yield delta
+                    if event.get("done"):
+                        final = event
+            finally:
+                resp.close()
+        record_call(self.url, payload, final, time.perf_counter() - t0, ttft_s=ttft, stream=True, queue_s=queued)
+        yield self._result(final, "".join(parts), tool_calls, "".join(thinking))
+
+    async def close(self) -> None:
+        # Connections belong to the process-wide client, which outlives this one
+        pass
+
+    def actual_usage(self) -> RequestUsage:
+        return self._actual_usage
+
+    def total_usage(self) -> RequestUsage:
+        return self._total_usage
+
+    def count_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Union[Tool, ToolSchema]] = ()) -> int:
+        tool_tokens = self._counter.count(json.dumps([_tool_schema(t) for t in tools])) if tools else 0
+        return self._counter.count_messages(to_ollama_messages(messages)) + tool_tokens
+
+    def remaining_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Union[Tool, ToolSchema]] = ()) -> int:
+        return max(0, self.num_ctx - self.count_tokens(messages, tools=tools))
+
+    @property
+    def capabilities(self) -> Any:  # deprecated in AutoGen in favour of model_info
+        return self._model_info
+
+    @property
+    def model_info(self) -> ModelInfo:
+        return self._model_info
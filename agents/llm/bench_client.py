@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Benchmark per-call overhead: bare ``requests.post`` vs the pooled client.
+
+Starts a local HTTP/1.1 stub that answers ``/v1/chat/completions`` with a
+short canned completion, then times N sequential calls through each path.
+With a short prompt the model time is zero, so the difference is the cost
+of connection setup that keep-alive pooling removes.
+
+Usage:
+  python -m agents.llm.bench_client --calls 500
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List
+
+
+_CANNED = json.dumps({
+    "id": "chatcmpl-stub",
+    "object": "chat.completion",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+}).encode("utf-8")
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self) -> None:
+        super().setup()
+        # Like real servers (Go's net/http, which Ollama uses): without this,
+        # Nagle + delayed ACK adds ~40 ms to every keep-alive response.
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_POST(self) -> None:  # noqa: N802 (http.server naming)
+        length = int(self.headers.get("Content-Length", "0"))
+        self.rfile.read(length)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(_CANNED)))
+        self.end_headers()
+        self.wfile.write(_CANNED)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def start_stub_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def time_calls(fn: Callable[[], None], calls: int) -> List[float]:
+    fn()  # warm-up (first connection is paid by both paths)
+    samples = []
+    for _ in range(calls):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def report(name: str, samples: List[float]) -> float:
+    mean_ms = statistics.mean(samples) * 1000
+    p50_ms = statistics.median(samples) * 1000
+    p95_ms = sorted(samples)[int(len(samples) * 0.95) - 1] * 1000
+    print(f"{name:<16} mean {mean_ms:7.3f} ms   p50 {p50_ms:7.3f} ms   p95 {p95_ms:7.3f} ms")
+    return mean_ms
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=300, help="Calls per path.")
+    args = parser.parse_args()
+    # Keep telemetry writes out of the timings (and the benchmark out of the log)
+    os.environ["LLM_METRICS"] = "0"
+
+    import requests
+
+    from agents.llm.client import LLMClient
+
+    server = start_stub_server()
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    payload = {"model": "stub", "messages": [{"role": "user", "content": "hi"}], "max_tokens": 1}
+
+    def bare() -> None:
+        r = requests.post(url, json=payload, timeout=30)
+        r.raise_for_status()
+        r.json()
+
+    client = LLMClient()
+
+    def pooled() -> None:
+        client.post_json(url, payload)
+
+    print(f"{args.calls} sequential calls against {url}")
+    bare_ms = report("requests.post", time_calls(bare, args.calls))
+    pooled_ms = report("LLMClient", time_calls(pooled, args.calls))
+    print(f"saved {bare_ms - pooled_ms:.3f} ms/call ({(1 - pooled_ms / bare_ms) * 100:.0f}%)")
+
+    client.close()
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
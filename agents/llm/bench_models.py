@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""Benchmark matrix of Ollama models, quantizations and runtime options.
+
+Runs a fixed prompt suite against every combination of model, quantization,
+``num_thread`` and ``num_ctx``, so ``OLLAMA_MODEL`` / ``DEEPSEEK_MODEL`` (and
+the ``Modelfile`` parameters) can be picked per machine from numbers:
+
+- load time: the model is unloaded first, then loaded with the options
+  under test (wall time of the load request)
+- time to first token, measured client-side on a streamed ``/api/chat``
+- generation and prompt-eval tokens/s from Ollama's eval counters
+- peak RSS of the local Ollama processes during the run (psutil, ``/proc``
+  or ``ps``; not available for a remote server) and the model size from
+  ``/api/ps``
+- pass/fail per task: each suite prompt may carry an ``expect`` regex, and
+  ``format: json`` prompts must parse
+
+The report is a table per configuration plus the fastest passing
+configuration for each task; ``--json`` writes every run for comparing
+machines.
+
+Quantizations are Ollama tags: with ``--quant q4_K_M,q8_0`` the model
+``llama3.1:8b-instruct`` expands to ``llama3.1:8b-instruct-q4_K_M`` and
+``llama3.1:8b-instruct-q8_0``.  Models that are not pulled are reported and
+skipped.
+
+Usage:
+  python -m agents.llm.bench_models --models llama3.1:8b,deepseek-r1:8b
+  python -m agents.llm.bench_models --models llama3.1:8b-instruct --quant q4_K_M,q8_0 \\
+      --num-thread 4,8 --num-ctx 4096,8192 --repeat 3 --json logs/bench_models.json
+  python -m agents.llm.bench_models --models qwen2.5-coder:7b --suite prompts.jsonl
+
+Suite files are JSONL: ``{"task": "code", "prompt": "...", "expect": "def ",
+"format": "json", "max_tokens": 256}`` (only ``task`` and ``prompt`` are
+required).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from itertools import product
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from agents.llm.admission import backend_key
+from agents.llm.model_manager import ModelManager, same_model
+
+
+DEFAULT_SUITE: List[Dict[str, Any]] = [
+    {
+        "task": "code",
+        "prompt": "Write a Python function `slugify(title: str) -> str` that lowercases, strips accents "
+                  "and joins words with hyphens. Reply with the code only.",
+        "expect": r"def\s+slugify",
+        "max_tokens": 256,
+    },
+    {
+        "task": "plan-json",
+        "prompt": 'List the shell commands to create a Python virtualenv and install requests. Answer as JSON: '
+                  '{"actions": [{"type": "shell", "args": {"cmd": "..."}}]}',
+        "format": "json",
+        "expect": r'"actions"',
+        "max_tokens": 200,
+    },
+    {
+        "task": "chat-zh",
+        "prompt": "申请法国短期申根签证需要准备哪些材料？请用中文简要列出。",
+        "expect": r"[\u4e00-\u9fff]{10}",
+        "max_tokens": 256,
+    },
+    {
+        "task": "summary",
+        "prompt": "Summarise in two sentences: Keep-alive connection pooling reuses TCP connections across "
+                  "HTTP requests, removing a handshake per call; on a local model server the saving is small "
+                  "per request but adds up across thousands of short embedding or completion calls.",
+        "expect": r"\w+",
+        "max_tokens": 96,
+    },
+]
+SAMPLE_INTERVAL_S = 0.2
+
+
+@dataclass
+class PromptRun:
+    task: str
+    ttft_s: Optional[float]
+    latency_s: float
+    prompt_tokens: int
+    prompt_tps: Optional[float]
+    eval_tokens: int
+    gen_tps: Optional[float]
+    passed: bool
+    error: Optional[str] = None
+
+
+@dataclass
+class ConfigResult:
+    model: str
+    quantization: Optional[str]
+    parameter_size: Optional[str]
+    num_thread: Optional[int]
+    num_ctx: Optional[int]
+    load_s: Optional[float] = None
+    model_bytes: Optional[int] = None
+    peak_rss_bytes: Optional[int] = None
+    runs: List[PromptRun] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def label(self) -> str:
+        opts = []
+        if self.num_thread:
+            opts.append(f"t{self.num_thread}")
+        if self.num_ctx:
+            opts.append(f"ctx{self.num_ctx}")
+        return self.model + (f" [{' '.join(opts)}]" if opts else "")
+
+    def _median(self, attr: str, task: Optional[str] = None) -> Optional[float]:
+        values = [getattr(r, attr) for r in self.runs if getattr(r, attr) is not None and r.task == (task or r.task)]
+        return statistics.median(values) if values else None
+
+    def passed(self, task: Optional[str] = None) -> bool:
+        runs = [r for r in self.runs if task is None or r.task == task]
+        return bool(runs) and all(r.passed for r in runs)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "ttft_p50_s": self._median("ttft_s"),
+            "gen_tps_p50": self._median("gen_tps"),
+            "prompt_tps_p50": self._median("prompt_tps"),
+            "latency_p50_s": self._median("latency_s"),
+            "pass_rate": sum(r.passed for r in self.runs) / len(self.runs) if self.runs else 0.0,
+        }
+
+
+# -- memory sampling -----------------------------------------------------------
+
+
+def ollama_rss() -> Optional[int]:
+    """Total RSS in bytes of the local ``ollama`` processes (server and model runners)."""
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        total = 0
+        for proc in psutil.process_iter(["name", "memory_info"]):
+            if "ollama" in (proc.info.get("name") or "").lower() and proc.info.get("memory_info"):
+                total += proc.info["memory_info"].rss
+        return total
+    if os.path.isdir("/proc"):
+        total = 0
+        for pid in filter(str.isdigit, os.listdir("/proc")):
+            try:
+                with open(f"/proc/{pid}/comm", encoding="utf-8") as f:
+                    if "ollama" not in f.read().lower():
+                        continue
+                with open(f"/proc/{pid}/status", encoding="utf-8") as f:
+                    for line in f:
+                        if line.startswith("VmRSS:"):
+                            total += int(line.split()[1]) * 1024
+            except OSError:
+                continue  # process exited meanwhile
+        return total
+    if os.name == "posix":
+        try:
+            out = subprocess.run(["ps", "-axo", "rss=,comm="], capture_output=True, text=True, timeout=5).stdout
+        except (OSError, subprocess.SubprocessError):
+            return None
+        return sum(
+            int(line.split(None, 1)[0]) * 1024
+            for line in out.splitlines()
+            if line.strip() and "ollama" in line.lower()
+        )
+    return None
+
+
+class PeakSampler:
+    """Samples ``ollama_rss`` in the background and keeps the maximum."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL_S):
+        self.interval = interval
+        self.peak: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "PeakSampler":
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def _run(self) -> None:
+        while True:
+            rss = ollama_rss()
+            if rss is not None:
+                self.peak = max(self.peak or 0, rss)
+            if self._stop.wait(self.interval):
+                return
+
+
+# -- running -------------------------------------------------------------------
+
+
+def load_suite(path: Optional[str]) -> List[Dict[str, Any]]:
+    if not path:
+        return DEFAULT_SUITE
+    suite = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                if "task" not in item or "prompt" not in item:
+                    raise ValueError(f"suite entries need 'task' and 'prompt': {line.strip()}")
+                suite.append(item)
+    return suite
+
+
+def expand_models(models: List[str], quants: List[str]) -> List[str]:
+    return [f"{m}-{q}" for m in models for q in quants] if quants else list(models)
+
+
+def _check(item: Dict[str, Any], text: str) -> bool:
+    if item.get("format") == "json":
+        try:
+            json.loads(text)
+        except ValueError:
+            return False
+    expect = item.get("expect")
+    return not expect or re.search(expect, text) is not None
+
+
+def run_prompt(url: str, model: str, options: Dict[str, Any], item: Dict[str, Any]) -> PromptRun:
+    from agents.llm.client import get_client
+    from agents.llm.streaming import StreamStats, iter_deltas
+
+    payload: Dict[str, Any] = {
+        "model": model,
+        "messages": [{"role": "user", "content": item["prompt"]}],
+        "options": dict(options, num_predict=item.get("max_tokens", 256), temperature=0),
+        "stream": True,
+    }
+    if item.get("format"):
+        payload["format"] = item["format"]
+    stats = StreamStats()
+    try:
+        resp = get_client().open_stream(url, payload)
+        try:
+            resp.raise_for_status()
+            text = "".join(iter_deltas(resp.iter_lines(), stats, url=url, payload=payload))
+        finally:
+            resp.close()
+    except Exception as exc:
+        return PromptRun(item["task"], None, time.perf_counter() - stats.started, 0, None, 0, None, False, str(exc))
+    final = stats.final or {}
+    prompt_tokens = int(final.get("prompt_eval_count") or 0)
+    prompt_s = (final.get("prompt_eval_duration") or 0) / 1e9
+    return PromptRun(
+        task=item["task"],
+        ttft_s=stats.ttft,
+        latency_s=stats.elapsed,
+        prompt_tokens=prompt_tokens,
+        prompt_tps=prompt_tokens / prompt_s if prompt_s else None,
+        eval_tokens=stats.tokens,
+        gen_tps=stats.tokens_per_s or None,
+        passed=_check(item, text),
+    )
+
+
+def installed_models(manager: ModelManager) -> Dict[str, Dict[str, Any]]:
+    """Pulled models and their ``details`` (quantization_level, parameter_size, ...)."""
+    from agents.llm.client import get_client
+
+    data = get_client().get_json(f"{manager.base_url}/api/tags", timeout=10)
+    return {m.get("name") or m.get("model", ""): m.get("details") or {} for m in data.get("models", [])}
+
+
+def bench_config(
+    manager: ModelManager,
+    model: str,
+    details: Dict[str, Any],
+    num_thread: Optional[int],
+    num_ctx: Optional[int],
+    suite: List[Dict[str, Any]],
+    repeat: int,
+    sample_rss: bool,
+) -> ConfigResult:
+    result = ConfigResult(
+        model=model,
+        quantization=details.get("quantization_level"),
+        parameter_size=details.get("parameter_size"),
+        num_thread=num_thread,
+        num_ctx=num_ctx,
+    )
+    options: Dict[str, Any] = {}
+    if num_thread:
+        options["num_thread"] = num_thread
+    if num_ctx:
+        options["num_ctx"] = num_ctx
+    url = f"{manager.base_url}/api/chat"
+    sampler = PeakSampler() if sample_rss else None
+    try:
+        manager.unload(model)
+        if sampler is not None:
+            sampler.__enter__()
+        # Load with the options under test: num_ctx and num_thread are fixed at load time
+        result.load_s = manager.preload(model, keep_alive="5m", options=options)
+        for _ in range(repeat):
+            for item in suite:
+                result.runs.append(run_prompt(url, model, options, item))
+        resident = next((m for m in manager.resident() if same_model(m.name, model)), None)
+        result.model_bytes = resident.size if resident else None
+    except Exception as exc:
+        result.error = str(exc)
+    finally:
+        if sampler is not None:
+            sampler.__exit__()
+            result.peak_rss_bytes = sampler.peak
+    return result
+
+
+# -- reporting -----------------------------------------------------------------
+
+
+def _fmt(value: Optional[float], spec: str) -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def _gib(n: Optional[int]) -> str:
+    return "-" if not n else f"{n / 2**30:.1f}G"
+
+
+def render_table(results: List[ConfigResult]) -> str:
+    header = f"{'configuration':<44} {'quant':<8} {'load':>6} {'ttft':>6} {'gen t/s':>8} {'pp t/s':>8} {'RSS':>6} {'model':>6} {'pass':>5}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        if r.error and not r.runs:
+            lines.append(f"{r.label:<44} error: {r.error}")
+            continue
+        s = r.summary()
+        lines.append(
+            f"{r.label:<44} {(r.quantization or '-'):<8} {_fmt(r.load_s, '.2f'):>6} {_fmt(s['ttft_p50_s'], '.2f'):>6} "
+            f"{_fmt(s['gen_tps_p50'], '.1f'):>8} {_fmt(s['prompt_tps_p50'], '.0f'):>8} "
+            f"{_gib(r.peak_rss_bytes):>6} {_gib(r.model_bytes):>6} {s['pass_rate']:>5.0%}"
+        )
+    return "\n".join(lines)
+
+
+def best_per_task(results: List[ConfigResult], tasks: List[str]) -> Dict[str, Optional[str]]:
+    """Configuration with the lowest median latency among those passing each task."""
+    picks: Dict[str, Optional[str]] = {}
+    for task in tasks:
+        passing = [r for r in results if r.passed(task) and r._median("latency_s", task) is not None]
+        best = min(passing, key=lambda r: r._median("latency_s", task), default=None)
+        picks[task] = best.label if best else None
+    return picks
+
+
+def machine_info() -> Dict[str, Any]:
+    info: Dict[str, Any] = {
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": sys.version.split()[0],
+    }
+    try:
+        import psutil
+
+        info["memory_bytes"] = psutil.virtual_memory().total
+    except ImportError:
+        pass
+    return info
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--models", required=True, help="Comma-separated Ollama models (tag prefixes with --quant)")
+    parser.add_argument("--quant", default="", help="Comma-separated quantization suffixes, e.g. q4_K_M,q8_0")
+    parser.add_argument("--num-thread", default="", help="Comma-separated num_thread values (default: Ollama's)")
+    parser.add_argument("--num-ctx", default="", help="Comma-separated num_ctx values (default: Ollama's)")
+    parser.add_argument("--suite", help="JSONL prompt suite (default: built-in code/json/Chinese/summary prompts)")
+    parser.add_argument("--repeat", type=int, default=2, help="Runs of the suite per configuration")
+    parser.add_argument("--base-url", help="Ollama server (default: OLLAMA_BASE_URL)")
+    parser.add_argument("--json", dest="json_path", help="Write all results to this file")
+    args = parser.parse_args()
+
+    def ints(spec: str) -> List[Optional[int]]:
+        return [int(v) for v in spec.split(",") if v.strip()] or [None]
+
+    manager = ModelManager(args.base_url)
+    suite = load_suite(args.suite)
+    tasks = list(dict.fromkeys(item["task"] for item in suite))
+    models = expand_models(
+        [m.strip() for m in args.models.split(",") if m.strip()],
+        [q.strip() for q in args.quant.split(",") if q.strip()],
+    )
+    installed = installed_models(manager)
+    sample_rss = backend_key(manager.base_url).startswith("127.0.0.1:") and ollama_rss() is not None
+
+    results: List[ConfigResult] = []
+    for model in models:
+        name = next((n for n in installed if same_model(n, model)), None)
+        if name is None:
+            print(f"skipping {model}: not pulled (ollama pull {model})", file=sys.stderr)
+            continue
+        for num_thread, num_ctx in product(ints(args.num_thread), ints(args.num_ctx)):
+            result = bench_config(manager, model, installed[name], num_thread, num_ctx, suite, args.repeat, sample_rss)
+            print(f"{result.label}: {'error: ' + result.error if result.error else 'done'}", file=sys.stderr)
+            results.append(result)
+    if not results:
+        print("no configurations were run", file=sys.stderr)
+        return 1
+
+    print(render_table(results))
+    print("\nfastest passing configuration per task (median latency):")
+    picks = best_per_task(results, tasks)
+    for task, label in picks.items():
+        print(f"  {task:<12} {label or 'none passed'}")
+
+    if args.json_path:
+        report = {
+            "machine": machine_info(),
+            "base_url": manager.base_url,
+            "suite": suite,
+            "results": [dict(asdict(r), summary=r.summary()) for r in results],
+            "best_per_task": picks,
+        }
+        Path(args.json_path).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.json_path).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\nwrote {args.json_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
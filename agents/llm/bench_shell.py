@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Benchmark the agent's shell backends: a process per command vs ``ShellSession``.
+
+Runs the same ``--steps``-step task (the short commands an agent issues
+while working in a project: ``ls``, ``cat``, ``grep``, writing a file,
+reading an exported variable) through
+
+- ``subprocess.run(cmd, shell=True)``, as ``execute_shell`` did, with
+  ``cd <project> && export ... &&`` prepended to every command since
+  nothing carries over between them
+- the same with ``bash -c``, which is what ``/bin/sh`` is on macOS
+- one ``ShellSession``, where the ``cd`` and ``export`` are the first two
+  steps and hold for the rest
+
+and reports per-command latency and the time per task.
+
+Usage:
+  python -m agents.llm.bench_shell --steps 50 --repeat 5
+"""
+from __future__ import annotations
+
+import argparse
+import shlex
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from agents.llm.bench_client import report
+from agents.llm.shell_session import ShellSession
+
+
+WORK = [
+    "ls -la",
+    "cat README.md",
+    "grep -n TODO src/app.py",
+    "printf 'print(1)\\n' > src/generated.py",
+    "wc -l src/*.py",
+    "test -f src/generated.py && echo exists",
+    "echo $APP_ENV",
+    "pwd",
+]
+
+
+def make_project(root: Path) -> Path:
+    project = root / "project"
+    (project / "src").mkdir(parents=True)
+    (project / "README.md").write_text("# demo\n" + "line\n" * 50)
+    (project / "src" / "app.py").write_text("".join(f"x{i} = {i}  # TODO\n" for i in range(200)))
+    return project
+
+
+def task(steps: int) -> List[str]:
+    return [WORK[i % len(WORK)] for i in range(steps)]
+
+
+def time_task(run: Callable[[str], object], commands: List[str]) -> List[float]:
+    samples = []
+    for cmd in commands:
+        t0 = time.perf_counter()
+        run(cmd)
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--steps", type=int, default=50, help="Commands per task.")
+    parser.add_argument("--repeat", type=int, default=5, help="Times to run the task per backend.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        project = make_project(Path(tmp))
+        setup = f"cd {shlex.quote(str(project))} && export APP_ENV=test"
+        commands = task(args.steps)
+
+        def per_process(cmd: str, executable: Optional[str] = None) -> None:
+            subprocess.run(f"{setup} && {cmd}", shell=True, capture_output=True, text=True,
+                           timeout=300, executable=executable)
+
+        sh_samples, bash_samples, session_samples = [], [], []
+        t0 = time.perf_counter()
+        with ShellSession("bash", cwd=tmp) as shell:
+            shell.run("true")
+            startup_ms = (time.perf_counter() - t0) * 1000
+            for _ in range(args.repeat):
+                sh_samples += time_task(per_process, commands)
+                bash_samples += time_task(lambda cmd: per_process(cmd, "bash"), commands)
+                # The session keeps the cd and export from the first two steps
+                shell.run(f"cd {shlex.quote(tmp)}; unset APP_ENV")
+                session_samples += time_task(shell.run, setup.split(" && ") + commands[2:])
+
+    print(f"{args.steps}-step task x {args.repeat}, per command:")
+    sh_ms = report("subprocess sh", sh_samples)
+    bash_ms = report("subprocess bash", bash_samples)
+    session_ms = report("ShellSession", session_samples)
+    print(f"ShellSession start-up (once per agent): {startup_ms:.1f} ms")
+    for name, ms in (("sh", sh_ms), ("bash", bash_ms)):
+        saved = (ms - session_ms) * args.steps
+        print(f"vs subprocess {name}: saves {ms - session_ms:.2f} ms/command, "
+              f"{saved:.0f} ms per {args.steps}-step task ({ms / session_ms:.1f}x faster)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Benchmark the fallback transports: ``curl`` subprocess vs ``http.client``.
+
+Uses the same local HTTP/1.1 stub as ``bench_client`` and times N sequential
+short calls through a ``curl`` process per call (the old fallback), the
+keep-alive ``StdlibTransport`` and, for reference, the pooled ``LLMClient``.
+It then sends one prompt of ``--large-kb`` KiB through each fallback: on
+Linux a single argv string is capped at 128 KiB, so ``curl -d <json>``
+fails where the streamed request body does not.
+
+Usage:
+  python -m agents.llm.bench_transport --calls 200 --large-kb 512
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import json
+import subprocess
+from typing import Any, Dict
+
+from agents.llm.bench_client import report, start_stub_server, time_calls
+from agents.llm.http_transport import StdlibTransport
+
+
+def curl_post(url: str, payload: Dict[str, Any]) -> Any:
+    cmd = ["curl", "-sS", url, "-H", "Content-Type: application/json", "-d", json.dumps(payload)]
+    completed = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+    if completed.returncode != 0:
+        raise RuntimeError(f"curl failed: {completed.stderr.strip()}")
+    return json.loads(completed.stdout)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200, help="Calls per transport.")
+    parser.add_argument("--large-kb", type=int, default=512, help="Size of the large-prompt check.")
+    args = parser.parse_args()
+    # Keep telemetry writes out of the timings (and the benchmark out of the log)
+    os.environ["LLM_METRICS"] = "0"
+
+    server = start_stub_server()
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    payload = {"model": "stub", "messages": [{"role": "user", "content": "hi"}], "max_tokens": 1}
+    transport = StdlibTransport()
+
+    print(f"{args.calls} sequential calls against {url}")
+    curl_ms = report("curl subprocess", time_calls(lambda: curl_post(url, payload), args.calls))
+    stdlib_ms = report("http.client", time_calls(lambda: transport.post_json(url, payload), args.calls))
+    try:
+        from agents.llm.client import LLMClient
+    except ImportError:
+        print("requests not installed; skipping LLMClient")
+    else:
+        client = LLMClient()
+        report("LLMClient", time_calls(lambda: client.post_json(url, payload), args.calls))
+        client.close()
+    print(f"http.client saves {curl_ms - stdlib_ms:.3f} ms/call vs curl ({curl_ms / stdlib_ms:.1f}x faster)")
+
+    large = dict(payload, messages=[{"role": "user", "content": "x" * (args.large_kb * 1024)}])
+    print(f"\n{args.large_kb} KiB prompt:")
+    for name, fn in (("curl subprocess", curl_post), ("http.client", transport.post_json)):
+        try:
+            fn(url, large)
+            print(f"  {name:<16} ok")
+        except Exception as exc:
+            print(f"  {name:<16} FAILED: {exc}")
+
+    transport.close()
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,172 @@
+"""Content-addressed on-disk cache for LLM responses.
+
+Each response is stored as ``<cache_dir>/llm/<key[:2]>/<key>.json``, where
+the key is a SHA-256 of the endpoint URL and the canonical (sorted-key)
+JSON of the full request payload: model, messages, temperature, max_tokens
+and everything else that influences the answer.
+
+- Entries older than ``ttl`` seconds are treated as misses and removed.
+- A hit touches the file's mtime, so mtime order is LRU order; when the
+  total size exceeds ``max_bytes`` the least recently used entries go first.
+- Sampling at a high temperature is meant to vary, so requests above
+  ``max_temperature`` (or without an explicit temperature) bypass the cache,
+  as do streaming requests.
+
+Settings come from ``config.yaml`` (``global.cache_enabled``, ``cache_dir``,
+``cache_ttl``, ``cache_max_bytes``, ``cache_max_temperature``) and can be
+overridden with the ``CACHE_ENABLED`` / ``CACHE_DIR`` / ``CACHE_TTL``
+environment variables.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from agents.llm.config import env_flag, load_global_config, resolve_path
+
+
+DEFAULT_TTL = 3600
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_TEMPERATURE = 0.3
+
+
+def payload_temperature(payload: Dict[str, Any]) -> Optional[float]:
+    """Temperature of an OpenAI-style or native Ollama payload, if set."""
+    if "temperature" in payload:
+        return payload["temperature"]
+    return (payload.get("options") or {}).get("temperature")
+
+
+def cache_key(url: str, payload: Dict[str, Any]) -> str:
+    canonical = json.dumps(
+        {"url": url, "payload": payload},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        cache_dir: Path,
+        ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_temperature: float = DEFAULT_MAX_TEMPERATURE,
+    ):
+        self.root = Path(cache_dir) / "llm"
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_temperature = max_temperature
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._lock = threading.Lock()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._total_bytes = sum(p.stat().st_size for p in self.root.glob("*/*.json"))
+
+    @classmethod
+    def from_config(cls) -> Optional["ResponseCache"]:
+        """Build the cache from config.yaml/env, or None when disabled."""
+        cfg = load_global_config()
+        if not env_flag("CACHE_ENABLED", bool(cfg.get("cache_enabled", False))):
+            return None
+        return cls(
+            resolve_path(os.environ.get("CACHE_DIR", cfg.get("cache_dir", ".cache"))),
+            ttl=float(os.environ.get("CACHE_TTL", cfg.get("cache_ttl", DEFAULT_TTL))),
+            max_bytes=int(cfg.get("cache_max_bytes", DEFAULT_MAX_BYTES)),
+            max_temperature=float(cfg.get("cache_max_temperature", DEFAULT_MAX_TEMPERATURE)),
+        )
+
+    def cacheable(self, payload: Dict[str, Any]) -> bool:
+        if payload.get("stream"):
+            return False
+        temperature = payload_temperature(payload)
+        return temperature is not None and temperature <= self.max_temperature
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, url: str, payload: Dict[str, Any]) -> Optional[Any]:
+        """Return the cached response, or None on miss/bypass/expiry."""
+        if not self.cacheable(payload):
+            self.bypassed += 1
+            return None
+        path = self._path(cache_key(url, payload))
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        if time.time() - entry.get("created", 0) > self.ttl:
+            self._remove(path)
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        self.hits += 1
+        return entry["response"]
+
+    def put(self, url: str, payload: Dict[str, Any], response: Any) -> None:
+        if not self.cacheable(payload):
+            return
+        path = self._path(cache_key(url, payload))
+        data = json.dumps({"created": time.time(), "response": response}, ensure_ascii=False)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(data, encoding="utf-8")
+        old_size = path.stat().st_size if path.exists() else 0
+        os.replace(tmp, path)
+        with self._lock:
+            self._total_bytes += path.stat().st_size - old_size
+        if self._total_bytes > self.max_bytes:
+            self.evict()
+
+    def _remove(self, path: Path) -> None:
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except OSError:
+            return
+        with self._lock:
+            self._total_bytes -= size
+
+    def evict(self) -> None:
+        """Drop expired entries, then least recently used ones down to 90% of the budget."""
+        entries = []
+        now = time.time()
+        for path in self.root.glob("*/*.json"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for mtime, size, path in entries:
+            if total <= target and now - mtime <= self.ttl:
+                continue
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+        with self._lock:
+            self._total_bytes = total
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "bytes": self._total_bytes,
+        }
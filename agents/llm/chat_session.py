@@ -0,0 +1,215 @@
+"""Multi-turn conversations over Ollama's native ``/api/chat``.
+
+Ollama keeps the KV cache of the last prompt it evaluated for a loaded
+model; when the next prompt starts with the same tokens, only the new
+suffix is evaluated.  A ``ChatSession`` keeps that prefix stable so each
+turn costs roughly the new message, not the whole transcript:
+
+- the system prompt and every earlier message are resent byte-for-byte
+  (assistant replies are stored exactly as returned)
+- ``options`` (including ``num_ctx``) never change within a session, as a
+  different context size reloads the model and drops the cache
+- ``keep_alive`` keeps the model loaded between turns
+- history is trimmed before it overflows ``num_ctx`` (counted with
+  ``agents.llm.tokens``; Ollama would otherwise shift the context and miss
+  the cache on every later turn), dropping the oldest half of the turns at
+  once so the cache is lost once, not on every turn
+
+``TurnStats`` records the server's prompt-eval count and time for each
+turn, so a flat prompt-eval time across turns shows the reuse working.
+
+``format`` (``"json"`` or a JSON schema) constrains every reply, e.g. to
+a tool-call plan; ``stream()`` yields the reply while it is generated.
+
+Usage:
+  session = ChatSession(model="llama3.1:8b", system=SYSTEM_PROMPT)
+  answer = session.send("What documents do I need?")
+  print(session.turns[-1].summary())
+"""
+from __future__ import annotations
+
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from agents.llm.model_manager import DEFAULT_KEEP_ALIVE
+from agents.llm.tokens import get_counter
+
+
+DEFAULT_NUM_CTX = int(os.environ.get("OLLAMA_NUM_CTX", "8192"))
+# Room left in the context for the reply, unless options set num_predict
+REPLY_RESERVE_TOKENS = 1024
+
+
+@dataclass
+class TurnStats:
+    turn: int
+    prompt_tokens: int
+    prompt_eval_s: float
+    eval_tokens: int
+    eval_s: float
+    load_s: float
+    latency_s: float
+    context_tokens: int
+    trimmed: bool = False
+
+    def summary(self) -> str:
+        note = ", history trimmed" if self.trimmed else ""
+        return (
+            f"turn {self.turn}: prompt eval {self.prompt_eval_s:.2f}s for {self.prompt_tokens} new tokens, "
+            f"{self.eval_tokens} generated in {self.latency_s:.1f}s, context ~{self.context_tokens} tokens{note}"
+        )
+
+
+class ChatSession:
+    def __init__(
+        self,
+        model: str,
+        system: Optional[str] = None,
+        base_url: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+        num_ctx: int = DEFAULT_NUM_CTX,
+        keep_alive: str = DEFAULT_KEEP_ALIVE,
+        format: Any = None,
+        timeout: Optional[float] = None,
+    ):
+        self.model = model
+        self.system = system
+        self.url = f"{(base_url or os.environ.get('OLLAMA_BASE_URL', 'http://localhost:11434')).rstrip('/')}/api/chat"
+        self.options = dict(options or {}, num_ctx=num_ctx)
+        self.num_ctx = num_ctx
+        self.keep_alive = keep_alive
+        self.format = format
+        self.timeout = timeout
+        self.counter = get_counter(model)
+        self.history: List[Dict[str, str]] = []
+        self.turns: List[TurnStats] = []
+
+    def _messages(self) -> List[Dict[str, str]]:
+        head = [{"role": "system", "content": self.system}] if self.system else []
+        return head + self.history
+
+    def prompt_budget(self) -> int:
+        """Tokens the prompt may take, leaving room in ``num_ctx`` for the reply."""
+        reserve = self.options.get("num_predict") or REPLY_RESERVE_TOKENS
+        return self.num_ctx - min(reserve, self.num_ctx // 2)
+
+    def max_message_tokens(self) -> int:
+        """Largest user message that fits next to the system prompt."""
+        return self.prompt_budget() - self.counter.count(self.system or "") - 8
+
+    def _trim(self) -> bool:
+        """Drop the oldest half of the exchanges if the next prompt may not fit."""
+        budget = self.prompt_budget()
+        if self.counter.count_messages(self._messages()) <= budget:
+            return False
+        while len(self.history) > 1 and self.counter.count_messages(self._messages()) > budget // 2:
+            # keep user/assistant pairs together so roles still alternate
+            drop = max(2, (len(self.history) - 1) // 2)
+            drop -= drop % 2
+            self.history = self.history[drop:]
+        return True
+
+    def _payload(self, stream: bool) -> Dict[str, Any]:
+        payload = {
+            "model": self.model,
+            "messages": self._messages(),
+            "options": self.options,
+            "keep_alive": self.keep_alive,
+            "stream": stream,
+        }
+        if self.format is not None:
+            payload["format"] = self.format
+        return payload
+
+    def _begin(self, text: str) -> bool:
+        self.history.append({"role": "user", "content": text})
+        return self._trim()
+
+    def _finish(self, reply: str, final: Dict[str, Any], t0: float, trimmed: bool) -> None:
+        self.history.append({"role": "assistant", "content": reply})
+        self.turns.append(TurnStats(
+            turn=len(self.turns) + 1,
+            prompt_tokens=final.get("prompt_eval_count", 0),
+            prompt_eval_s=final.get("prompt_eval_duration", 0) / 1e9,
+            eval_tokens=final.get("eval_count", 0),
+            eval_s=final.get("eval_duration", 0) / 1e9,
+            load_s=final.get("load_duration", 0) / 1e9,
+            latency_s=time.perf_counter() - t0,
+            context_tokens=self.counter.count_messages(self._messages()),
+            trimmed=trimmed,
+        ))
+
+    def send(self, text: str, on_delta: Optional[Callable[[str], None]] = None) -> str:
+        """Send one user message and return the reply; streams to ``on_delta`` if given."""
+        from agents.llm.client import get_client
+
+        if on_delta is not None:
+            parts = []
+            for delta in self.stream(text):
+                parts.append(delta)
+                on_delta(delta)
+            return "".join(parts)
+
+        trimmed = self._begin(text)
+        t0 = time.perf_counter()
+        try:
+            final = get_client().post_json(self.url, self._payload(stream=False), timeout=self.timeout)
+        except Exception:
+            # Leave the history as it was, so a retry resends the same prefix
+            self.history.pop()
+            raise
+        reply = (final.get("message") or {}).get("content", "")
+        self._finish(reply, final, t0, trimmed)
+        return reply
+
+    def _open_stream(self) -> Any:
+        from agents.llm.client import get_client
+
+        resp = get_client().open_stream(self.url, self._payload(stream=True), timeout=self.timeout)
+        if resp.status_code == 400 and isinstance(self.format, dict):
+            # Ollama before 0.5 only understands format="json", not a schema
+            resp.close()
+            self.format = "json"
+            resp = get_client().open_stream(self.url, self._payload(stream=True), timeout=self.timeout)
+        return resp
+
+    def stream(self, text: str) -> Iterator[str]:
+        """Send one user message and yield the reply as it is generated."""
+        from agents.llm.admission import admit
+        from agents.llm.streaming import StreamStats, iter_deltas
+
+        trimmed = self._begin(text)
+        t0 = time.perf_counter()
+        parts = []
+        try:
+            with admit(self.url) as queued:
+                stats = StreamStats()
+                resp = self._open_stream()
+                try:
+                    resp.raise_for_status()
+                    payload = self._payload(stream=True)
+                    for delta in iter_deltas(resp.iter_lines(), stats, url=self.url, payload=payload, queue_s=queued):
+                        parts.append(delta)
+                        yield delta
+                finally:
+                    resp.close()
+        except BaseException:
+            # Failed or abandoned by the caller: forget the unanswered message
+            self.history.pop()
+            raise
+        self._finish("".join(parts), stats.final or {}, t0, trimmed)
+
+    def reset(self) -> None:
+        self.history.clear()
+
+    def stats_line(self) -> str:
+        """Prompt-eval time of the first vs the latest turn."""
+        if not self.turns:
+            return "no turns yet"
+        first, last = self.turns[0], self.turns[-1]
+        return (
+            f"{len(self.turns)} turns; prompt eval {first.prompt_eval_s:.2f}s on turn 1, "
+            f"{last.prompt_eval_s:.2f}s on turn {last.turn} (context ~{last.context_tokens} tokens)"
+        )
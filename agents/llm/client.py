@@ -0,0 +1,228 @@
+"""Pooled keep-alive HTTP client shared by every LLM-calling script.
+
+A bare ``requests.post`` opens (and tears down) a fresh TCP connection per
+call.  ``LLMClient`` keeps one ``requests.Session`` with a sized connection
+pool, so repeated calls to the same Ollama/OpenAI endpoint reuse sockets.
+
+Usage:
+  from agents.llm.client import get_client
+
+  data = get_client().post_json(f"{base}/api/chat", payload)
+
+When ``config.yaml`` enables caching, ``post_json`` answers repeated
+low-temperature requests from ``agents.llm.cache.ResponseCache``.  Calls
+that reach the server wait for a slot when ``agents.llm.admission`` is
+enabled, and are logged by ``agents.llm.metrics``.  ``post_json`` and
+``open_stream`` retry transient failures within one overall deadline
+(``agents.llm.retry``); every timeout is capped at the time left.
+
+Scripts that live outside an importable package (e.g. the per-platform
+agent folders) put the repository root on ``sys.path`` before importing.
+
+Environment variables:
+  LLM_POOL_SIZE            connections kept per host (default: 10)
+  LLM_CONNECT_TIMEOUT      connect timeout in seconds (default: 10)
+  LLM_KEEP_ALIVE           set to 0 to send ``Connection: close`` (default: 1)
+  LLM_CHAT_TIMEOUT         read timeout for chat endpoints (default: 120)
+  LLM_COMPLETIONS_TIMEOUT  read timeout for completion endpoints (default: 60)
+  LLM_EMBEDDINGS_TIMEOUT   read timeout for embedding endpoints (default: 30)
+
+The per-endpoint timeouts cap each attempt; the deadline for the whole
+call, retries included, is set by ``LLM_DEADLINE_*`` (see ``agents.llm.retry``).
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from agents.llm.admission import admit
+from agents.llm.cache import ResponseCache
+from agents.llm.metrics import record_call
+from agents.llm.retry import RetryPolicy, cap_timeout, get_policy, retryable
+
+
+DEFAULT_POOL_SIZE = int(os.environ.get("LLM_POOL_SIZE", "10"))
+DEFAULT_CONNECT_TIMEOUT = float(os.environ.get("LLM_CONNECT_TIMEOUT", "10"))
+DEFAULT_KEEP_ALIVE = os.environ.get("LLM_KEEP_ALIVE", "1") != "0"
+
+# Read timeouts per endpoint kind, in seconds.
+DEFAULT_TIMEOUTS: Dict[str, float] = {
+    "chat": float(os.environ.get("LLM_CHAT_TIMEOUT", "120")),
+    "completions": float(os.environ.get("LLM_COMPLETIONS_TIMEOUT", "60")),
+    "embeddings": float(os.environ.get("LLM_EMBEDDINGS_TIMEOUT", "30")),
+}
+
+# URL path suffix -> endpoint kind. Checked in order, so the more specific
+# "/chat/completions" wins over "/completions".
+_ENDPOINT_KINDS = (
+    ("/chat/completions", "chat"),
+    ("/api/chat", "chat"),
+    ("/completions", "completions"),
+    ("/api/generate", "completions"),
+    ("/embeddings", "embeddings"),
+    ("/api/embed", "embeddings"),
+    ("/api/embeddings", "embeddings"),
+)
+
+
+def endpoint_kind(url: str) -> str:
+    """Return the endpoint kind ("chat", "completions", ...) for a URL."""
+    path = url.split("?", 1)[0].rstrip("/")
+    for suffix, kind in _ENDPOINT_KINDS:
+        if path.endswith(suffix):
+            return kind
+    return "chat"
+
+
+class LLMClient:
+    """A pooled ``requests.Session`` with per-endpoint timeouts."""
+
+    def __init__(
+        self,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        timeouts: Optional[Dict[str, float]] = None,
+        keep_alive: bool = DEFAULT_KEEP_ALIVE,
+        cache: Optional[ResponseCache] = None,
+    ):
+        self.pool_size = pool_size
+        self.cache = cache
+        self.connect_timeout = connect_timeout
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if not keep_alive:
+            self.session.headers["Connection"] = "close"
+
+    def timeout_for(self, url: str, timeout: Optional[float] = None) -> Tuple[float, float]:
+        """(connect, read) timeout for a request; an explicit value wins, the current deadline caps both."""
+        read = cap_timeout(timeout if timeout is not None else self.timeouts[endpoint_kind(url)])
+        return (min(self.connect_timeout, read), read)
+
+    def post(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> requests.Response:
+        """POST a JSON payload and return the raw response (not status-checked)."""
+        return self.session.post(
+            url,
+            json=payload,
+            headers=headers,
+            timeout=self.timeout_for(url, timeout),
+            **kwargs,
+        )
+
+    def post_json(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        use_cache: bool = True,
+        policy: Optional[RetryPolicy] = None,
+        priority: Optional[str] = None,
+    ) -> Any:
+        """POST a JSON payload, raise on HTTP errors and return the decoded body.
+
+        Transient failures are retried under ``policy`` (default: the one for
+        ``priority``, itself defaulting to this process's); ``timeout`` caps
+        each attempt.  ``priority`` also sets the admission class.
+        """
+        cache = self.cache if use_cache else None
+        if cache is not None:
+            cached = cache.get(url, payload)
+            if cached is not None:
+                return cached
+
+        def attempt(attempt_timeout: float) -> Any:
+            with admit(url, priority) as queued:
+                t0 = time.perf_counter()
+                resp = self.post(url, payload, headers=headers, timeout=attempt_timeout)
+                resp.raise_for_status()
+                data = resp.json()
+            record_call(url, payload, data, time.perf_counter() - t0, queue_s=queued)
+            return data
+
+        # A non-streamed generation that timed out would only time out again
+        retry_timeouts = endpoint_kind(url) == "embeddings"
+        if policy is None:
+            policy = RetryPolicy.for_priority(priority) if priority else get_policy()
+        data = policy.call(attempt, self.timeout_for(url, timeout)[1], retry_timeouts)
+        if cache is not None:
+            cache.put(url, payload, data)
+        return data
+
+    def open_stream(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        policy: Optional[RetryPolicy] = None,
+    ) -> requests.Response:
+        """POST with ``stream=True``, retrying until the response headers arrive.
+
+        Once the body is being read nothing is retried.  Error statuses that
+        are not worth retrying are returned unchecked, like ``post``.
+        """
+        def attempt(attempt_timeout: float) -> requests.Response:
+            resp = self.post(url, payload, headers=headers, timeout=attempt_timeout, stream=True)
+            if resp.status_code >= 400:
+                try:
+                    resp.raise_for_status()
+                except requests.HTTPError as exc:
+                    if retryable(exc):
+                        resp.close()
+                        raise
+            return resp
+
+        return (policy or get_policy()).call(attempt, self.timeout_for(url, timeout)[1])
+
+    def get_json(self, url: str, timeout: Optional[float] = None) -> Any:
+        """GET a JSON resource (e.g. ``/api/tags``), raising on HTTP errors."""
+        resp = self.session.get(url, timeout=self.timeout_for(url, timeout))
+        resp.raise_for_status()
+        return resp.json()
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_default_client: Optional[LLMClient] = None
+_default_lock = threading.Lock()
+
+
+def get_client() -> LLMClient:
+    """Return the process-wide shared client, creating it on first use."""
+    global _default_client
+    if _default_client is None:
+        with _default_lock:
+            if _default_client is None:
+                _default_client = LLMClient(cache=ResponseCache.from_config())
+    return _default_client
+
+
+def configure(**kwargs: Any) -> LLMClient:
+    """Replace the shared client, e.g. ``configure(pool_size=32)`` for batch runs."""
+    global _default_client
+    if "cache" not in kwargs:
+        kwargs["cache"] = ResponseCache.from_config()
+    with _default_lock:
+        old, _default_client = _default_client, LLMClient(**kwargs)
+    if old is not None:
+        old.close()
+    return _default_client
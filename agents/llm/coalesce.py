@@ -0,0 +1,206 @@
+"""Micro-batching for concurrent embedding calls.
+
+Threads that embed a few texts each at about the same moment would each
+pay a full HTTP round trip.  ``EmbedCoalescer`` wraps an embed function:
+calls wait up to ``max_wait_s`` (a few milliseconds) for others to join,
+are sent as one batched request, and each caller gets back exactly its own
+vectors.  A batch goes out early once it holds ``max_batch`` texts or
+``max_chars`` characters, and at most ``concurrency`` batches are in flight;
+calls that arrive meanwhile pile up into the next batch, so the heavier the
+load, the larger the batches.
+
+A request is never split across batches.  If a batch of several requests
+fails, each request is retried on its own so one bad input does not fail
+the other callers.
+
+Usage:
+  embed = EmbedCoalescer(ollama_embedder())
+  vectors = parse_embeddings(embed(["some text"]))   # from any thread
+  print(embed.stats_line())
+
+Environment variables (``from_env``):
+  EMBED_COALESCE          set to 0 to disable (``from_env`` returns None)
+  EMBED_COALESCE_MS       how long a call waits for others to join (default: 5)
+  EMBED_COALESCE_MAX      texts per batched request (default: 64)
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from agents.llm.config import env_flag
+from agents.llm.metrics import percentile
+from agents.llm.semantic_cache import EmbedFn, parse_embeddings
+
+
+DEFAULT_MAX_WAIT_S = 0.005
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_CHARS = 64_000
+DEFAULT_CONCURRENCY = 2
+
+
+@dataclass
+class _Request:
+    texts: List[str]
+    future: "Future[List[List[float]]]" = field(default_factory=Future)
+    chars: int = 0
+
+    def __post_init__(self) -> None:
+        self.chars = sum(len(t) for t in self.texts)
+
+
+class EmbedCoalescer:
+    def __init__(
+        self,
+        embed_fn: EmbedFn,
+        max_wait_s: float = DEFAULT_MAX_WAIT_S,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        max_chars: int = DEFAULT_MAX_CHARS,
+        concurrency: int = DEFAULT_CONCURRENCY,
+    ):
+        self.embed_fn = embed_fn
+        self.max_wait_s = max_wait_s
+        self.max_batch = max(1, max_batch)
+        self.max_chars = max_chars
+        self.concurrency = max(1, concurrency)
+        self._cond = threading.Condition()
+        self._pending: List[_Request] = []
+        self._in_flight = 0
+        self._thread: Optional[threading.Thread] = None
+        # Batch-size distribution: texts per round trip -> number of round trips
+        self.batch_sizes: Counter = Counter()
+        self.requests = 0
+        self.texts = 0
+        self.round_trips = 0
+        self.split_retries = 0
+
+    @classmethod
+    def from_env(cls, embed_fn: EmbedFn) -> Optional["EmbedCoalescer"]:
+        if not env_flag("EMBED_COALESCE", True):
+            return None
+        return cls(
+            embed_fn,
+            max_wait_s=float(os.environ.get("EMBED_COALESCE_MS", DEFAULT_MAX_WAIT_S * 1000)) / 1000,
+            max_batch=int(os.environ.get("EMBED_COALESCE_MAX", DEFAULT_MAX_BATCH)),
+        )
+
+    def __call__(self, texts: List[str]) -> Dict[str, Any]:
+        """Embed ``texts``; returns an ``/api/embed``-shaped response, so this is an ``EmbedFn`` too."""
+        return {"embeddings": self.embed(texts)}
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Vectors for ``texts``, in order; blocks until their batch returns."""
+        if not texts:
+            return []
+        request = _Request(list(texts))
+        with self._cond:
+            self.requests += 1
+            self.texts += len(request.texts)
+            self._pending.append(request)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._dispatch_loop, name="embed-coalescer", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+        return request.future.result()
+
+    # -- dispatcher ----------------------------------------------------------
+
+    def _full(self) -> bool:
+        return (
+            sum(len(r.texts) for r in self._pending) >= self.max_batch
+            or sum(r.chars for r in self._pending) >= self.max_chars
+        )
+
+    def _take_batch(self) -> List[_Request]:
+        """Pop whole requests from the front, up to the size limits (at least one)."""
+        batch: List[_Request] = []
+        count = chars = 0
+        while self._pending:
+            request = self._pending[0]
+            if batch and (count + len(request.texts) > self.max_batch or chars + request.chars > self.max_chars):
+                break
+            batch.append(self._pending.pop(0))
+            count += len(request.texts)
+            chars += request.chars
+        return batch
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending or self._in_flight >= self.concurrency:
+                    self._cond.wait()
+                # Give other callers a moment to join, unless the batch is already full
+                deadline = time.monotonic() + self.max_wait_s
+                while not self._full():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._take_batch()
+                self._in_flight += 1
+            threading.Thread(target=self._send, args=(batch,), daemon=True).start()
+
+    def _call(self, texts: List[str]) -> List[List[float]]:
+        with self._cond:
+            self.round_trips += 1
+            self.batch_sizes[len(texts)] += 1
+        vectors = parse_embeddings(self.embed_fn(texts))
+        if len(vectors) != len(texts):
+            raise ValueError(f"expected {len(texts)} embeddings, got {len(vectors)}")
+        return vectors
+
+    def _send(self, batch: List[_Request]) -> None:
+        try:
+            texts = [t for request in batch for t in request.texts]
+            try:
+                vectors = self._call(texts)
+            except Exception as exc:
+                if len(batch) == 1:
+                    batch[0].future.set_exception(exc)
+                    return
+                with self._cond:
+                    self.split_retries += 1
+                for request in batch:
+                    try:
+                        request.future.set_result(self._call(request.texts))
+                    except Exception as single_exc:
+                        request.future.set_exception(single_exc)
+                return
+            start = 0
+            for request in batch:
+                request.future.set_result(vectors[start:start + len(request.texts)])
+                start += len(request.texts)
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+    # -- stats ---------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            sizes = [size for size, n in self.batch_sizes.items() for _ in range(n)]
+            return {
+                "requests": self.requests,
+                "texts": self.texts,
+                "round_trips": self.round_trips,
+                "split_retries": self.split_retries,
+                "batch_sizes": dict(sorted(self.batch_sizes.items())),
+                "batch_p50": percentile(sizes, 50),
+                "batch_p95": percentile(sizes, 95),
+                "batch_max": max(sizes) if sizes else None,
+            }
+
+    def stats_line(self) -> str:
+        s = self.stats()
+        if not s["round_trips"]:
+            return "no embeddings sent yet"
+        return (
+            f"{s['requests']} embed calls ({s['texts']} texts) in {s['round_trips']} round trips; "
+            f"texts per batch p50 {s['batch_p50']:.0f}, p95 {s['batch_p95']:.0f}, max {s['batch_max']}"
+        )
@@ -0,0 +1,47 @@
+"""Read the ``global`` section of the repository's ``config.yaml``.
+
+The file is looked up at ``$MIMOSA_CONFIG`` or ``<repo root>/config.yaml``
+(copy ``config.yaml.example`` to create it).  A missing file or a missing
+PyYAML install yields an empty config, so callers fall back to defaults.
+"""
+from __future__ import annotations
+
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict
+
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+def config_path() -> Path:
+    return Path(os.environ.get("MIMOSA_CONFIG", REPO_ROOT / "config.yaml"))
+
+
+@lru_cache(maxsize=1)
+def load_global_config() -> Dict[str, Any]:
+    """Return ``config.yaml``'s ``global`` mapping (empty if unavailable)."""
+    path = config_path()
+    if not path.exists():
+        return {}
+    try:
+        import yaml
+    except ImportError:
+        return {}
+    with path.open("r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+    return data.get("global") or {}
+
+
+def resolve_path(value: str) -> Path:
+    """Resolve a configured path relative to the config file's directory."""
+    path = Path(value).expanduser()
+    return path if path.is_absolute() else config_path().parent / path
+
+
+def env_flag(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
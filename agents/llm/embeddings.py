@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+"""Batched embedding pipeline over a persistent memory-mapped vector store.
+
+``EmbeddingPipeline`` streams (id, text, metadata) items, skips texts whose
+hash is already in the store, groups the rest into batches bounded by count
+and characters, embeds up to ``concurrency`` batches at once (a batch the
+server rejects, e.g. for a too-long input, is split in half to isolate the
+bad input) and appends the unit-normalised vectors to a ``VectorStore``.
+Transient failures are retried by the embed function's ``RetryPolicy``;
+one that persists, or a passed deadline, stops the run.  Only the hashes
+and ids are held in memory, so corpora of hundreds of thousands of chunks
+embed in constant RAM and a rerun only embeds what is new.
+
+With no batch size given, the first batches try growing sizes and the
+pipeline keeps the one with the best texts/s.
+
+``VectorStore`` keeps ``vectors.f32`` (rows of float32, read through a
+read-only memmap) and ``records.jsonl`` (one ``{"id", "hash", "meta"}``
+line per row).  An interrupted append is repaired on open.
+
+Usage:
+  python -m agents.llm.embeddings build --input corpus.jsonl --store docs
+  python -m agents.llm.embeddings search --store docs "how do I renew a visa"
+  python -m agents.llm.embeddings stats --store docs
+
+  store = VectorStore.for_name("docs")
+  stats = EmbeddingPipeline(ollama_embedder(), store).run(items)
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from agents.llm.admission import set_priority
+from agents.llm.config import load_global_config, resolve_path
+from agents.llm.retry import RETRYABLE_STATUSES, _status
+from agents.llm.semantic_cache import DEFAULT_EMBED_MODEL, EmbedFn, ollama_embedder, parse_embeddings
+
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_BATCH_CHARS = 64_000
+BATCH_SIZE_LADDER = (8, 16, 32, 64, 128)
+SEARCH_BLOCK_ROWS = 65_536
+
+Item = Tuple[str, str, Optional[Dict[str, Any]]]
+
+
+def text_hash(text: str, namespace: str = "") -> str:
+    """Dedup key: the same text embedded by the same model is stored once."""
+    return hashlib.sha256(f"{namespace}\0{text}".encode("utf-8")).hexdigest()
+
+
+def http_embedder(url: str, model: str, headers: Optional[Dict[str, str]] = None) -> EmbedFn:
+    """Embed function for an OpenAI-compatible ``/embeddings`` URL."""
+    from agents.llm.client import get_client
+
+    def embed(texts: List[str]) -> Any:
+        return get_client().post_json(url, {"model": model, "input": texts}, headers=headers)
+
+    return embed
+
+
+class VectorStore:
+    def __init__(self, path: Path):
+        self.dir = Path(path)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._vectors_path = self.dir / "vectors.f32"
+        self._records_path = self.dir / "records.jsonl"
+        self._info_path = self.dir / "info.json"
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.memmap] = None
+        self.dim: Optional[int] = None
+        self.ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._load()
+
+    @classmethod
+    def for_name(cls, name: str) -> "VectorStore":
+        """Open the store ``name`` under ``<cache_dir>/vectors`` (or a path as-is)."""
+        if os.sep in name or "/" in name:
+            return cls(Path(name))
+        root = resolve_path(load_global_config().get("cache_dir", ".cache")) / "vectors"
+        return cls(root / re.sub(r"[^A-Za-z0-9_.-]", "_", name))
+
+    def _load(self) -> None:
+        if self._info_path.exists():
+            self.dim = json.loads(self._info_path.read_text(encoding="utf-8")).get("dim")
+        size = self._vectors_path.stat().st_size if self._vectors_path.exists() else 0
+        max_rows = size // (4 * self.dim) if self.dim else 0
+        lines = 0
+        if self._records_path.exists():
+            with self._records_path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    lines += 1
+                    if len(self.ids) >= max_rows:
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break  # torn last line from an interrupted append
+                    self._rows.setdefault(record["hash"], len(self.ids))
+                    self.ids.append(record["id"])
+        # Cut both files back to the rows present in full on each side
+        rows = len(self.ids)
+        if rows != lines:
+            kept = []
+            with self._records_path.open("r", encoding="utf-8") as f:
+                for _, line in zip(range(rows), f):
+                    kept.append(line)
+            with self._records_path.open("w", encoding="utf-8") as f:
+                f.writelines(kept)
+        expected = rows * 4 * self.dim if self.dim else 0
+        if size != expected:
+            with self._vectors_path.open("r+b") as f:
+                f.truncate(expected)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def has(self, digest: str) -> bool:
+        return digest in self._rows
+
+    def row_of(self, digest: str) -> Optional[int]:
+        return self._rows.get(digest)
+
+    def append(self, vectors: np.ndarray, records: Sequence[Dict[str, Any]]) -> None:
+        """Append rows; ``records`` carry ``id``, ``hash`` and optional ``meta``."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(vectors) != len(records):
+            raise ValueError("one record per vector is required")
+        if not len(vectors):
+            return
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                self._info_path.write_text(json.dumps({"dim": self.dim}), encoding="utf-8")
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"vector dimension {vectors.shape[1]} does not match store dimension {self.dim}")
+            # Vectors first: a crash in between leaves rows without records,
+            # which _load trims, never records pointing past the vectors.
+            with self._vectors_path.open("ab") as f:
+                f.write(vectors.tobytes())
+            with self._records_path.open("a", encoding="utf-8") as f:
+                f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+            for record in records:
+                self._rows.setdefault(record["hash"], len(self.ids))
+                self.ids.append(record["id"])
+
+    def matrix(self) -> Optional[np.ndarray]:
+        """Read-only memmap of all rows (None when empty)."""
+        n = len(self.ids)
+        if n == 0:
+            return None
+        if self._matrix is None or self._matrix.shape[0] != n:
+            self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(n, self.dim))
+        return self._matrix
+
+    def search(self, vector: Sequence[float], k: int = 5) -> List[Tuple[str, float]]:
+        """Top-``k`` (id, cosine similarity), scanning the memmap in blocks."""
+        matrix = self.matrix()
+        if matrix is None:
+            return []
+        # A new array: the caller's float32 vector must not be normalised in place
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        best: List[Tuple[float, int]] = []
+        for start in range(0, matrix.shape[0], SEARCH_BLOCK_ROWS):
+            sims = matrix[start:start + SEARCH_BLOCK_ROWS] @ query
+            top = np.argpartition(-sims, min(k, len(sims)) - 1)[:k]
+            best.extend((float(sims[i]), start + int(i)) for i in top)
+            best = sorted(best, reverse=True)[:k]
+        return [(self.ids[row], sim) for sim, row in best]
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        with self._records_path.open("r", encoding="utf-8") as f:
+            for _, line in zip(range(len(self.ids)), f):
+                yield json.loads(line)
+
+
+@dataclass
+class EmbedStats:
+    submitted: int = 0
+    embedded: int = 0
+    duplicates: int = 0
+    failed: int = 0
+    batches: int = 0
+    splits: int = 0
+    batch_size: int = 0
+    seconds: float = 0.0
+
+    @property
+    def texts_per_s(self) -> float:
+        return self.embedded / self.seconds if self.seconds else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"embedded {self.embedded}/{self.submitted} texts in {self.batches} batches "
+            f"(batch size {self.batch_size}), {self.duplicates} duplicates skipped, "
+            f"{self.failed} failed, {self.splits} batches split, "
+            f"{self.seconds:.1f}s ({self.texts_per_s:.1f} texts/s)"
+        )
+
+
+def _input_error(exc: BaseException) -> bool:
+    """The request's content was refused (bad input, wrong embedding count), not the server failing."""
+    if isinstance(exc, ValueError):
+        return True
+    status = _status(exc)
+    return status is not None and 400 <= status < 500 and status not in RETRYABLE_STATUSES
+
+
+class EmbeddingPipeline:
+    def __init__(
+        self,
+        embed_fn: EmbedFn,
+        store: VectorStore,
+        batch_size: Optional[int] = None,
+        max_batch_chars: int = DEFAULT_MAX_BATCH_CHARS,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        namespace: str = DEFAULT_EMBED_MODEL,
+    ):
+        self.embed_fn = embed_fn
+        self.store = store
+        self.batch_size = batch_size
+        self.max_batch_chars = max_batch_chars
+        self.concurrency = max(1, concurrency)
+        self.namespace = namespace
+        self.stats = EmbedStats()
+        self._stats_lock = threading.Lock()
+
+    # -- embedding -----------------------------------------------------------
+
+    def _embed_once(self, texts: List[str]) -> np.ndarray:
+        vectors = np.asarray(parse_embeddings(self.embed_fn(texts)), dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(texts):
+            raise ValueError(f"expected {len(texts)} embeddings, got shape {vectors.shape}")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+    def _embed_batch(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Vectors for ``texts``; None for inputs the server rejects even on their own.
+
+        Other errors (connection, 5xx, deadline) were already retried by the
+        embed function's policy and are raised.
+        """
+        try:
+            return list(self._embed_once(texts))
+        except Exception as exc:
+            if not _input_error(exc):
+                raise
+        if len(texts) == 1:
+            return [None]
+        with self._stats_lock:
+            self.stats.splits += 1
+        mid = len(texts) // 2
+        return self._embed_batch(texts[:mid]) + self._embed_batch(texts[mid:])
+
+    # -- batching ----------------------------------------------------------
+
+    def _new_items(self, items: Iterable[Item]) -> Iterator[Tuple[str, str, Optional[Dict[str, Any]], str]]:
+        seen: Set[str] = set()
+        for item_id, text, meta in items:
+            self.stats.submitted += 1
+            digest = text_hash(text, self.namespace)
+            if self.store.has(digest) or digest in seen:
+                self.stats.duplicates += 1
+                continue
+            seen.add(digest)
+            yield item_id, text, meta, digest
+
+    def _batches(self, new_items: Iterator[Any], sizes: Iterator[int]) -> Iterator[List[Any]]:
+        batch: List[Any] = []
+        chars = 0
+        limit = next(sizes)
+        for entry in new_items:
+            if batch and (len(batch) >= limit or chars + len(entry[1]) > self.max_batch_chars):
+                yield batch
+                batch, chars, limit = [], 0, next(sizes)
+            batch.append(entry)
+            chars += len(entry[1])
+        if batch:
+            yield batch
+
+    def _store(self, batch: List[Any], vectors: List[Optional[np.ndarray]]) -> None:
+        keep = [(entry, vec) for entry, vec in zip(batch, vectors) if vec is not None]
+        self.stats.failed += len(batch) - len(keep)
+        self.stats.batches += 1
+        if keep:
+            records = [
+                {"id": item_id, "hash": digest, **({"meta": meta} if meta else {})}
+                for (item_id, _, meta, digest), _ in keep
+            ]
+            self.store.append(np.stack([vec for _, vec in keep]), records)
+            self.stats.embedded += len(keep)
+
+    def _calibrate(self, batches: Iterator[List[Any]]) -> int:
+        """Embed the first batches at growing sizes; return the fastest size."""
+        best_size, best_rate = BATCH_SIZE_LADDER[0], 0.0
+        for size in BATCH_SIZE_LADDER:
+            batch = next(batches, None)
+            if batch is None:
+                break
+            t0 = time.perf_counter()
+            self._store(batch, self._embed_batch([entry[1] for entry in batch]))
+            rate = len(batch) / (time.perf_counter() - t0)
+            if len(batch) < size:
+                break  # ran out of input, or hit the character budget
+            if rate > best_rate * 1.1:
+                best_size, best_rate = size, rate
+            else:
+                break  # no longer gaining: larger batches only add latency
+        return best_size
+
+    def run(self, items: Iterable[Item], progress: Optional[Callable[[EmbedStats], None]] = None) -> EmbedStats:
+        """Embed and store every new item; returns (cumulative) stats."""
+        t0 = time.perf_counter()
+        chosen: List[int] = [self.batch_size] if self.batch_size else []
+
+        def sizes() -> Iterator[int]:
+            # The ladder while calibrating, then the chosen size
+            for size in BATCH_SIZE_LADDER:
+                if chosen:
+                    break
+                yield size
+            while True:
+                yield chosen[0]
+
+        batches = self._batches(self._new_items(items), sizes())
+        if not chosen:
+            chosen.append(self._calibrate(batches))
+        self.stats.batch_size = chosen[0]
+
+        pending: Dict[Future, List[Any]] = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for batch in batches:
+                pending[executor.submit(self._embed_batch, [entry[1] for entry in batch])] = batch
+                # Bound the work in flight so input is read only as fast as it embeds
+                if len(pending) >= self.concurrency * 2:
+                    self._drain(pending, FIRST_COMPLETED, progress)
+            self._drain(pending, None, progress)
+        self.stats.seconds += time.perf_counter() - t0
+        return self.stats
+
+    def _drain(
+        self,
+        pending: Dict[Future, List[Any]],
+        until: Optional[str],
+        progress: Optional[Callable[[EmbedStats], None]],
+    ) -> None:
+        while pending:
+            done, _ = wait(pending, return_when=until or ALL_COMPLETED)
+            for future in done:
+                self._store(pending.pop(future), future.result())
+                if progress is not None:
+                    progress(self.stats)
+            if until is not None:
+                return
+
+
+# -- CLI ---------------------------------------------------------------------
+
+
+def read_items(path: Path, text_field: str = "text", id_field: str = "id") -> Iterator[Item]:
+    """Items from JSONL objects (``text_field``/``id_field``, rest is metadata) or plain lines."""
+    with path.open("r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, start=1):
+            line = line.rstrip("\n")
+            if not line.strip():
+                continue
+            if path.suffix == ".jsonl":
+                obj = json.loads(line)
+                text = obj.pop(text_field, "")
+                item_id = str(obj.pop(id_field, lineno))
+                yield item_id, text, obj or None
+            else:
+                yield str(lineno), line, None
+
+
+def _embedder(args: argparse.Namespace) -> EmbedFn:
+    if args.endpoint:
+        headers = {"Authorization": f"Bearer {args.api_key}"} if args.api_key else None
+        return http_embedder(args.endpoint, args.model, headers)
+    return ollama_embedder(args.base_url, args.model)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("build", "search", "stats"):
+        p = sub.add_parser(name)
+        p.add_argument("--store", required=True, help="Store name under <cache_dir>/vectors, or a directory path")
+        if name != "stats":
+            p.add_argument("--model", default=DEFAULT_EMBED_MODEL, help="Embedding model")
+            p.add_argument("--base-url", help="Ollama server (default: OLLAMA_BASE_URL)")
+            p.add_argument("--endpoint", help="OpenAI-compatible embeddings URL instead of Ollama")
+            p.add_argument("--api-key", default=os.environ.get("DEEPSEEK_API_KEY"), help="Bearer token for --endpoint")
+    build = sub.choices["build"]
+    build.add_argument("--input", required=True, type=Path, help="JSONL (one object per line) or text file (one text per line)")
+    build.add_argument("--text-field", default="text")
+    build.add_argument("--id-field", default="id")
+    build.add_argument("--batch-size", type=int, help="Texts per request (default: calibrated)")
+    build.add_argument("--max-batch-chars", type=int, default=DEFAULT_MAX_BATCH_CHARS)
+    build.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    search = sub.choices["search"]
+    search.add_argument("query")
+    search.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    store = VectorStore.for_name(args.store)
+    if args.command == "stats":
+        print(f"{store.dir}: {len(store)} vectors, dim {store.dim}")
+        return 0
+    embed_fn = _embedder(args)
+    if args.command == "search":
+        vector = parse_embeddings(embed_fn([args.query]))[0]
+        for item_id, sim in store.search(vector, args.k):
+            print(f"{sim:.3f}  {item_id}")
+        return 0
+
+    set_priority("batch")
+    pipeline = EmbeddingPipeline(
+        embed_fn,
+        store,
+        batch_size=args.batch_size,
+        max_batch_chars=args.max_batch_chars,
+        concurrency=args.concurrency,
+        namespace=args.model,
+    )
+    last = [0.0]
+
+    def progress(stats: EmbedStats) -> None:
+        now = time.perf_counter()
+        if now - last[0] >= 2:
+            last[0] = now
+            print(f"  {stats.embedded} embedded, {stats.duplicates} duplicates, {stats.failed} failed", flush=True)
+
+    try:
+        stats = pipeline.run(read_items(args.input, args.text_field, args.id_field), progress)
+    except KeyboardInterrupt:
+        print("\nInterrupted; stored vectors are kept and skipped on the next run.")
+        return 130
+    except Exception as exc:
+        print(f"Embedding failed: {exc}\nStored vectors are kept and skipped on the next run.")
+        return 1
+    print(stats.summary())
+    print(f"{store.dir}: {len(store)} vectors, dim {store.dim}")
+    return 0 if stats.failed == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,277 @@
+"""Hedged requests: race a backup call against a slow primary.
+
+The primary call starts immediately.  If it has not produced its first
+token after a delay equal to a high percentile (p95 by default) of the
+primary's recent first-token times, a duplicate goes to a backup (another
+Ollama host, or a hosted API).  Whichever attempt streams its first token
+first wins; the other is cancelled on the spot, which shuts its socket so
+the server stops generating, and its result is discarded.
+
+Calls take an ``Attempt`` argument and should stream: ``stream_json`` does
+this for an OpenAI-compatible or native Ollama endpoint, calling
+``attempt.first_token()`` on the first chunk and abandoning the request
+once the attempt is cancelled.  For a call that cannot stream, the answer
+itself counts as the first token, and a losing call runs to completion.
+
+The delay needs first-token samples; ``seed_from_metrics`` loads them from
+the ``agents.llm.metrics`` log.  With ``require_samples`` a hedger does not
+hedge at all until it has enough of them (use it when the backup costs
+money); otherwise it hedges after ``max_delay``.
+
+Usage:
+  hedger = Hedger.from_env()          # None unless LLM_HEDGE=1
+  hedger.seed_from_metrics("llama3.1:8b")
+  answer = hedger.call(lambda a: stream_json(ollama_url, payload, a),
+                       lambda a: stream_json(openai_url, payload2, a, headers))
+  print(hedger.stats_line())
+
+Environment variables:
+  LLM_HEDGE             set to 1 to enable (``from_env`` returns None otherwise)
+  LLM_HEDGE_PERCENTILE  percentile of first-token times used as the delay (default: 95)
+  LLM_HEDGE_MIN_DELAY   lower bound of the delay in seconds (default: 0.5)
+  LLM_HEDGE_MAX_DELAY   upper bound, also used until enough samples exist (default: 10)
+"""
+from __future__ import annotations
+
+import os
+import queue
+import socket
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from agents.llm.config import env_flag
+
+
+DEFAULT_PERCENTILE = 95.0
+DEFAULT_MIN_DELAY = 0.5
+DEFAULT_MAX_DELAY = 10.0
+DEFAULT_WINDOW = 200
+MIN_SAMPLES = 20
+
+
+class AttemptCancelled(Exception):
+    """Raised inside an attempt that lost the race."""
+
+
+class Attempt:
+    """Handle passed to each side of a hedged call."""
+
+    def __init__(self, name: str, on_first_token: Callable[["Attempt"], None]):
+        self.name = name
+        self.cancelled = threading.Event()
+        self.started = time.perf_counter()
+        self.ttft: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._on_first_token = on_first_token
+        self._on_cancel: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def first_token(self) -> None:
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.started
+            self._on_first_token(self)
+
+    def check(self) -> None:
+        if self.cancelled.is_set():
+            raise AttemptCancelled(self.name)
+
+    def on_cancel(self, fn: Callable[[], None]) -> None:
+        """Call ``fn`` when the attempt is cancelled (right away if it already is)."""
+        with self._lock:
+            if not self.cancelled.is_set():
+                self._on_cancel.append(fn)
+                return
+        fn()
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled.set()
+            callbacks, self._on_cancel = self._on_cancel, []
+        for fn in callbacks:
+            try:
+                fn()
+            except Exception:
+                pass
+
+
+def _shutdown(sock: socket.socket) -> None:
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+def stream_json(
+    url: str,
+    payload: Dict[str, Any],
+    attempt: Attempt,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Optional[float] = None,
+) -> Dict[str, Any]:
+    """POST ``payload`` streamed, as one side of a hedged call; returns the non-streamed body.
+
+    Uses the stdlib transport, whose socket can be shut down from the
+    hedging thread even while the server has not answered yet.
+    """
+    from agents.llm.http_transport import get_transport
+    from agents.llm.streaming import StreamStats, assemble_response, iter_deltas
+
+    payload = dict(payload, stream=True)
+    if url.rstrip("/").endswith("/chat/completions"):
+        payload.setdefault("stream_options", {"include_usage": True})
+
+    def on_socket(sock: socket.socket) -> None:
+        attempt.check()
+        attempt.on_cancel(lambda: _shutdown(sock))
+
+    stats = StreamStats()
+    parts = []
+    try:
+        lines = get_transport().stream_lines(url, payload, headers, timeout, on_socket=on_socket)
+        for delta in iter_deltas(lines, stats, url=url, payload=payload):
+            attempt.check()
+            attempt.first_token()
+            parts.append(delta)
+        # A shut-down socket can also read as a clean end of stream
+        attempt.check()
+    except Exception as exc:
+        if attempt.cancelled.is_set():
+            raise AttemptCancelled(attempt.name) from exc
+        raise
+    return assemble_response(url, "".join(parts), stats)
+
+
+class Hedger:
+    def __init__(
+        self,
+        percentile: float = DEFAULT_PERCENTILE,
+        min_delay: float = DEFAULT_MIN_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        window: int = DEFAULT_WINDOW,
+        require_samples: bool = False,
+    ):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.require_samples = require_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedged = 0
+        self.backup_wins = 0
+        self.cancelled = 0
+
+    @classmethod
+    def from_env(cls, flag: str = "LLM_HEDGE", **kwargs: Any) -> Optional["Hedger"]:
+        """A hedger configured from ``LLM_HEDGE_*``, or None unless ``flag`` is set to 1."""
+        if not env_flag(flag, False):
+            return None
+        kwargs.setdefault("percentile", float(os.environ.get("LLM_HEDGE_PERCENTILE", DEFAULT_PERCENTILE)))
+        kwargs.setdefault("min_delay", float(os.environ.get("LLM_HEDGE_MIN_DELAY", DEFAULT_MIN_DELAY)))
+        kwargs.setdefault("max_delay", float(os.environ.get("LLM_HEDGE_MAX_DELAY", DEFAULT_MAX_DELAY)))
+        return cls(**kwargs)
+
+    def seed(self, ttfts: Iterable[float]) -> None:
+        """Add first-token times of the primary measured elsewhere."""
+        with self._lock:
+            self._samples.extend(t for t in ttfts if t is not None and t > 0)
+
+    def seed_from_metrics(self, model: str, endpoint: Optional[str] = None) -> int:
+        """Seed from streamed calls to ``model`` in the metrics log; returns the samples added."""
+        from agents.llm.metrics import get_metrics_log
+
+        ttfts = [
+            r["ttft_s"] for r in get_metrics_log().read()
+            if r.get("model") == model and r.get("ttft_s")
+            and (endpoint is None or endpoint in (r.get("endpoint") or ""))
+        ][-(self._samples.maxlen or DEFAULT_WINDOW):]
+        self.seed(ttfts)
+        return len(ttfts)
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait for a first token before hedging; None means do not hedge."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < MIN_SAMPLES:
+            return None if self.require_samples else self.max_delay
+        idx = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+        return min(self.max_delay, max(self.min_delay, samples[idx]))
+
+    def call(self, primary: Callable[[Attempt], Any], backup: Optional[Callable[[Attempt], Any]]) -> Any:
+        """Run ``primary``, hedging with ``backup`` if its first token is late."""
+        with self._lock:
+            self.calls += 1
+        delay = self.delay() if backup is not None else None
+        if delay is None:
+            return primary(Attempt("primary", self._record))
+
+        results: "queue.Queue[Tuple[Attempt, bool, Any]]" = queue.Queue()
+        attempts: List[Attempt] = []
+        winner: List[Attempt] = []
+
+        def on_first_token(attempt: Attempt) -> None:
+            with self._lock:
+                if attempt.name == "primary":
+                    self._samples.append(attempt.ttft)
+                if winner:
+                    return
+                winner.append(attempt)
+                losers = [a for a in attempts if a is not attempt and a.finished is None]
+                self.cancelled += len(losers)
+                if attempt.name == "backup":
+                    self.backup_wins += 1
+            for loser in losers:
+                loser.cancel()
+
+        def run(fn: Callable[[Attempt], Any], attempt: Attempt) -> None:
+            try:
+                value = fn(attempt)
+            except Exception as exc:
+                attempt.finished = time.perf_counter()
+                results.put((attempt, False, exc))
+            else:
+                attempt.finished = time.perf_counter()
+                attempt.first_token()
+                results.put((attempt, True, value))
+
+        def start(attempt: Attempt, fn: Callable[[Attempt], Any]) -> None:
+            attempts.append(attempt)
+            threading.Thread(target=run, args=(fn, attempt), daemon=True).start()
+
+        start(Attempt("primary", on_first_token), primary)
+        # Wake on first token or on an early result (including an error)
+        deadline = time.perf_counter() + delay
+        while not winner and results.empty() and time.perf_counter() < deadline:
+            time.sleep(min(0.05, max(0.0, deadline - time.perf_counter())))
+        with self._lock:
+            # A primary that already failed is hedged straight away
+            hedge = not winner
+            if hedge:
+                self.hedged += 1
+                start(Attempt("backup", on_first_token), backup)
+
+        error: Optional[BaseException] = None
+        for _ in range(len(attempts)):
+            attempt, ok, value = results.get()
+            won = bool(winner) and winner[0] is attempt
+            if ok and won:
+                return value
+            if not ok and not isinstance(value, AttemptCancelled):
+                # The winner's error beats an earlier loser's
+                if won or error is None:
+                    error = value
+                if won:
+                    break
+        raise error if error is not None else AttemptCancelled("all attempts cancelled")
+
+    def _record(self, attempt: Attempt) -> None:
+        with self._lock:
+            self._samples.append(attempt.ttft)
+
+    def stats_line(self) -> str:
+        return (
+            f"hedging: fired {self.hedged}/{self.calls} calls, "
+            f"backup won {self.backup_wins}, {self.cancelled} slower attempts cancelled"
+        )
@@ -0,0 +1,210 @@
+"""Dependency-free keep-alive JSON transport built on ``http.client``.
+
+Used as the fallback when ``requests`` is unavailable or fails, in place of
+forking ``curl`` per call.  Connections are kept open per (scheme, host,
+port) and per thread, request bodies are written in slices straight from
+the encoded buffer (no argv size limit), and streamed responses are read
+line by line as they arrive.  Like ``LLMClient``, requests are retried
+under the shared deadline policy (``agents.llm.retry``).
+
+Usage:
+  transport = StdlibTransport()
+  data = transport.post_json(url, payload, headers)
+  for line in transport.stream_lines(url, dict(payload, stream=True), headers):
+      ...
+"""
+from __future__ import annotations
+
+import http.client
+import json
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+from agents.llm.admission import admit
+from agents.llm.metrics import record_call
+from agents.llm.retry import RetryPolicy, cap_timeout, get_policy
+
+
+DEFAULT_TIMEOUT = 120
+_SEND_CHUNK = 64 * 1024
+
+# A kept-alive socket the server already closed fails on first use with one
+# of these; the request is then retried once on a fresh connection.
+_STALE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    BrokenPipeError,
+    ConnectionResetError,
+    ConnectionAbortedError,
+)
+
+
+class HTTPStatusError(RuntimeError):
+    def __init__(self, status: int, body: str):
+        super().__init__(f"HTTP {status}: {body}")
+        self.status = status
+        self.body = body
+
+
+class StdlibTransport:
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connections(self) -> Dict[Tuple[str, str, int], http.client.HTTPConnection]:
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        return conns
+
+    def _connection(self, scheme: str, host: str, port: int, timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+        """Return (connection, reused) for the target, creating it if needed."""
+        key = (scheme, host, port)
+        conns = self._connections()
+        conn = conns.get(key)
+        if conn is not None:
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            return conn, True
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        conn = conns[key] = cls(host, port, timeout=timeout)
+        return conn, False
+
+    def _drop(self, scheme: str, host: str, port: int) -> None:
+        conn = self._connections().pop((scheme, host, port), None)
+        if conn is not None:
+            conn.close()
+
+    def _send(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        headers: Optional[Dict[str, str]],
+        timeout: Optional[float],
+        on_socket: Optional[Callable[[socket.socket], None]] = None,
+    ) -> Tuple[http.client.HTTPResponse, Tuple[str, str, int]]:
+        parts = urlsplit(url)
+        scheme = parts.scheme or "http"
+        host = parts.hostname or "localhost"
+        port = parts.port or (443 if scheme == "https" else 80)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        body = memoryview(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+        hdrs = {"Content-Type": "application/json", "Connection": "keep-alive"}
+        hdrs.update(headers or {})
+        hdrs["Content-Length"] = str(len(body))
+
+        for attempt in (0, 1):
+            conn, reused = self._connection(scheme, host, port, cap_timeout(timeout or self.timeout))
+            try:
+                if conn.sock is None:
+                    try:
+                        conn.connect()
+                    except socket.timeout as exc:
+                        # Unlike a read timeout, always worth retrying
+                        raise ConnectionError(f"connect to {host}:{port} timed out") from exc
+                if on_socket is not None:
+                    on_socket(conn.sock)
+                conn.putrequest("POST", path, skip_accept_encoding=True)
+                for k, v in hdrs.items():
+                    conn.putheader(k, v)
+                conn.endheaders()
+                for offset in range(0, len(body), _SEND_CHUNK):
+                    conn.send(body[offset:offset + _SEND_CHUNK])
+                return conn.getresponse(), (scheme, host, port)
+            except _STALE_ERRORS:
+                self._drop(scheme, host, port)
+                if not reused or attempt:
+                    raise
+            except Exception:
+                self._drop(scheme, host, port)
+                raise
+        raise AssertionError("unreachable")
+
+    def _check(self, resp: http.client.HTTPResponse, key: Tuple[str, str, int]) -> None:
+        if resp.status >= 400:
+            body = resp.read().decode("utf-8", errors="replace")
+            if resp.will_close:
+                self._drop(*key)
+            raise HTTPStatusError(resp.status, body)
+
+    def post_json(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        policy: Optional[RetryPolicy] = None,
+    ) -> Any:
+        """POST a JSON payload and return the decoded JSON response."""
+        def attempt(attempt_timeout: float) -> Any:
+            with admit(url) as queued:
+                t0 = time.perf_counter()
+                resp, key = self._send(url, payload, headers, attempt_timeout)
+                self._check(resp, key)
+                data = resp.read()
+                if resp.will_close:
+                    self._drop(*key)
+            decoded = json.loads(data)
+            record_call(url, payload, decoded, time.perf_counter() - t0, queue_s=queued)
+            return decoded
+
+        # A non-streamed generation that timed out would only time out again
+        retry_timeouts = "embed" in urlsplit(url).path
+        return (policy or get_policy()).call(attempt, timeout or self.timeout, retry_timeouts)
+
+    def stream_lines(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        policy: Optional[RetryPolicy] = None,
+        on_socket: Optional[Callable[[socket.socket], None]] = None,
+    ) -> Iterator[bytes]:
+        """POST and yield response lines (SSE/NDJSON) as they arrive.
+
+        Only opening the stream is retried, not a response already being read.
+        ``on_socket`` gets the socket before the request is sent, e.g. so
+        another thread can shut it down to abandon the request.
+        """
+        def attempt(attempt_timeout: float) -> Tuple[http.client.HTTPResponse, Tuple[str, str, int]]:
+            resp, key = self._send(url, payload, headers, attempt_timeout, on_socket)
+            self._check(resp, key)
+            return resp, key
+
+        with admit(url):
+            resp, key = (policy or get_policy()).call(attempt, timeout or self.timeout)
+            finished = False
+            try:
+                while True:
+                    line = resp.readline()
+                    if not line:
+                        break
+                    yield line
+                finished = True
+            finally:
+                # A half-read response leaves the socket unusable for reuse
+                if not finished or resp.will_close:
+                    self._drop(*key)
+
+    def close(self) -> None:
+        for conn in self._connections().values():
+            conn.close()
+        self._connections().clear()
+
+
+_default_transport: Optional[StdlibTransport] = None
+
+
+def get_transport() -> StdlibTransport:
+    global _default_transport
+    if _default_transport is None:
+        _default_transport = StdlibTransport()
+    return _default_transport
@@ -0,0 +1,101 @@
+"""Pick complete elements out of a JSON array while it is still streaming.
+
+A tool-calling model answers with one object such as
+``{"actions": [{"type": "shell", ...}, {"type": "read", ...}]}``.  Waiting
+for the whole reply before acting wastes the generation time of every
+later action; ``ArrayStreamParser`` scans the text chunk by chunk (tracking
+strings, escapes and nesting) and returns each element of the top-level
+``key`` array as soon as its closing brace arrives.
+
+Usage:
+  parser = ArrayStreamParser("actions")
+  for delta in session.stream(task):
+      for action in parser.feed(delta):
+          run(action)
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, List, Optional
+
+
+class ArrayStreamParser:
+    def __init__(self, key: str = "actions"):
+        self.key = key
+        self.count = 0
+        self._parts: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string: List[str] = []
+        self._last_string: Optional[str] = None
+        self._current_key: Optional[str] = None
+        # Nesting depth inside the array, once its "[" has been seen
+        self._array_depth: Optional[int] = None
+        self._array_closed = False
+        self._item: Optional[List[str]] = None
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        return "".join(self._parts)
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Consume the next piece of text; returns the elements it completed."""
+        self._parts.append(chunk)
+        done: List[Any] = []
+        for ch in chunk:
+            if self._item is not None:
+                self._item.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._last_string = "".join(self._string)
+                elif self._depth == 1:
+                    self._string.append(ch)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string = []
+            elif ch == ":" and self._depth == 1:
+                self._current_key = self._last_string
+            elif ch == "," and self._depth == 1:
+                self._current_key = None
+            elif ch in "{[":
+                if (
+                    ch == "["
+                    and self._depth == 1
+                    and self._current_key == self.key
+                    and self._array_depth is None
+                    and not self._array_closed
+                ):
+                    self._array_depth = 2
+                elif self._depth == self._array_depth and self._item is None:
+                    self._item = [ch]
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._array_depth is None:
+                    continue
+                if self._item is not None and self._depth == self._array_depth:
+                    item = self._finish_item()
+                    if item is not None:
+                        done.append(item)
+                elif self._depth < self._array_depth:
+                    self._array_depth = None
+                    self._array_closed = True
+        return done
+
+    def _finish_item(self) -> Any:
+        text, self._item = "".join(self._item or []), None
+        try:
+            item = json.loads(text)
+        except ValueError:
+            return None
+        self.count += 1
+        return item
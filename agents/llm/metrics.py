@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""Token-throughput telemetry for LLM calls.
+
+Every call made through ``LLMClient``, ``StdlibTransport`` or a stream
+parsed by ``iter_deltas`` appends one JSON line to a local log with what
+the server reported about it:
+
+- native Ollama responses: ``prompt_eval_count``/``prompt_eval_duration``,
+  ``eval_count``/``eval_duration``, ``load_duration`` and ``total_duration``
+- OpenAI-compatible responses: ``usage`` token counts; tokens/s is then
+  derived from wall-clock time (``"timing": "wall"``)
+
+Summary per model (calls, p50/p95 latency and time-to-first-token,
+prompt and generation tokens/s, share of time spent loading the model,
+p95 of the time spent waiting for admission, see ``agents.llm.admission``):
+
+  python -m agents.llm.metrics
+  python -m agents.llm.metrics --since 24h --model llama3.1:8b
+
+Settings come from ``config.yaml`` (``global.metrics_enabled``,
+``metrics_log``) and can be overridden with ``LLM_METRICS`` (0/1) and
+``LLM_METRICS_LOG``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+from agents.llm.config import env_flag, load_global_config, resolve_path
+
+
+DEFAULT_LOG = "logs/llm_metrics.jsonl"
+_NS = 1e9
+
+
+def _seconds(ns: Any) -> Optional[float]:
+    return ns / _NS if isinstance(ns, (int, float)) and ns > 0 else None
+
+
+def _rate(tokens: Optional[int], seconds: Optional[float]) -> Optional[float]:
+    if tokens is None or not seconds:
+        return None
+    return round(tokens / seconds, 2)
+
+
+def build_record(
+    url: str,
+    payload: Optional[Dict[str, Any]],
+    response: Any,
+    latency_s: float,
+    ttft_s: Optional[float] = None,
+    stream: bool = False,
+    queue_s: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Structured metrics for one call from its (final) response body."""
+    try:
+        from agents.llm.client import endpoint_kind
+        kind: Optional[str] = endpoint_kind(url)
+    except ImportError:  # requests missing; only the stdlib transport is in use
+        kind = None
+
+    data = response if isinstance(response, dict) else {}
+    usage = data.get("usage") or {}
+    parts = urlsplit(url)
+    record: Dict[str, Any] = {
+        "ts": round(time.time(), 3),
+        "model": data.get("model") or (payload or {}).get("model"),
+        "kind": kind,
+        "endpoint": f"{parts.netloc}{parts.path}",
+        "stream": stream,
+        "latency_s": round(latency_s, 4),
+        "ttft_s": round(ttft_s, 4) if ttft_s is not None else None,
+        "queue_s": round(queue_s, 4) if queue_s is not None else None,
+        "prompt_tokens": data.get("prompt_eval_count", usage.get("prompt_tokens")),
+        "completion_tokens": data.get("eval_count", usage.get("completion_tokens")),
+        "prompt_eval_s": _seconds(data.get("prompt_eval_duration")),
+        "eval_s": _seconds(data.get("eval_duration")),
+        "load_s": _seconds(data.get("load_duration")),
+        "total_s": _seconds(data.get("total_duration")),
+    }
+    if record["eval_s"] is not None:
+        record["timing"] = "server"
+        record["prompt_tps"] = _rate(record["prompt_tokens"], record["prompt_eval_s"])
+        record["gen_tps"] = _rate(record["completion_tokens"], record["eval_s"])
+    else:
+        # Without server timings, generation runs from first token to the end
+        record["timing"] = "wall"
+        record["prompt_tps"] = None
+        record["gen_tps"] = _rate(record["completion_tokens"], latency_s - (ttft_s or 0.0))
+    return record
+
+
+class MetricsLog:
+    def __init__(self, path: Path, enabled: bool = True):
+        self.path = Path(path)
+        self.enabled = enabled
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> "MetricsLog":
+        cfg = load_global_config()
+        path = os.environ.get("LLM_METRICS_LOG") or cfg.get("metrics_log", DEFAULT_LOG)
+        return cls(
+            resolve_path(path),
+            enabled=env_flag("LLM_METRICS", bool(cfg.get("metrics_enabled", True))),
+        )
+
+    def append(self, record: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line)
+
+    def read(self, since: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        if not self.path.exists():
+            return
+        with self.path.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn line from a concurrent writer
+                if since is None or record.get("ts", 0) >= since:
+                    yield record
+
+
+_default_log: Optional[MetricsLog] = None
+
+
+def get_metrics_log() -> MetricsLog:
+    global _default_log
+    if _default_log is None:
+        _default_log = MetricsLog.from_config()
+    return _default_log
+
+
+def record_call(
+    url: str,
+    payload: Optional[Dict[str, Any]],
+    response: Any,
+    latency_s: float,
+    ttft_s: Optional[float] = None,
+    stream: bool = False,
+    queue_s: Optional[float] = None,
+) -> None:
+    """Append one call to the metrics log; never raises into the caller."""
+    try:
+        log = get_metrics_log()
+        if log.enabled:
+            log.append(build_record(url, payload, response, latency_s, ttft_s, stream, queue_s))
+    except Exception:
+        pass
+
+
+# -- summary ---------------------------------------------------------------
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of ``values`` (None when empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Per-model aggregates, busiest model first."""
+    by_model: Dict[str, List[Dict[str, Any]]] = {}
+    for record in records:
+        by_model.setdefault(record.get("model") or "?", []).append(record)
+
+    rows = []
+    for model, recs in by_model.items():
+        def col(name: str) -> List[float]:
+            return [r[name] for r in recs if r.get(name) is not None]
+
+        load = sum(col("load_s"))
+        busy = sum(r.get("total_s") or r.get("latency_s") or 0.0 for r in recs)
+        prompt_tokens = sum(col("prompt_tokens"))
+        timed = [r for r in recs if r.get("prompt_eval_s") and r.get("prompt_tokens")]
+        prompt_s = sum(r["prompt_eval_s"] for r in timed)
+        rows.append({
+            "model": model,
+            "calls": len(recs),
+            "prompt_tokens": int(prompt_tokens),
+            "completion_tokens": int(sum(col("completion_tokens"))),
+            "latency_p50": percentile(col("latency_s"), 50),
+            "latency_p95": percentile(col("latency_s"), 95),
+            "ttft_p50": percentile(col("ttft_s"), 50),
+            "queue_p95": percentile(col("queue_s"), 95),
+            "gen_tps_p50": percentile(col("gen_tps"), 50),
+            "gen_tps_p5": percentile(col("gen_tps"), 5),
+            "prompt_tps": round(sum(r["prompt_tokens"] for r in timed) / prompt_s, 1) if prompt_s else None,
+            "load_share": load / busy if busy else 0.0,
+        })
+    rows.sort(key=lambda r: r["calls"], reverse=True)
+    return rows
+
+
+def parse_since(value: str) -> float:
+    """Epoch seconds for a relative window like ``90m``, ``24h`` or ``7d``."""
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([smhd])", value.strip())
+    if not match:
+        raise argparse.ArgumentTypeError(f"expected e.g. 30m, 24h or 7d, got {value!r}")
+    scale = {"s": 1, "m": 60, "h": 3600, "d": 86400}[match.group(2)]
+    return time.time() - float(match.group(1)) * scale
+
+
+def _fmt(value: Optional[float], spec: str = ".2f") -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Summarise LLM token-throughput telemetry.")
+    parser.add_argument("--log", help="Metrics JSONL (default: from config.yaml / LLM_METRICS_LOG)")
+    parser.add_argument("--since", type=parse_since, help="Only calls in the last window, e.g. 24h")
+    parser.add_argument("--model", help="Only this model")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    log = MetricsLog(resolve_path(args.log)) if args.log else MetricsLog.from_config()
+    records = [r for r in log.read(args.since) if not args.model or r.get("model") == args.model]
+    if not records:
+        print(f"No calls recorded in {log.path}")
+        return 1
+    rows = summarize(records)
+    if args.json:
+        print(json.dumps(rows, indent=2, ensure_ascii=False))
+        return 0
+
+    print(f"{len(records)} calls from {log.path}\n")
+    header = (
+        f"{'model':<28} {'calls':>6} {'p50 s':>7} {'p95 s':>7} {'ttft':>6} "
+        f"{'gen t/s':>8} {'p5 t/s':>7} {'prompt t/s':>10} {'load':>6} {'queue p95':>9}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        print(
+            f"{r['model'][:28]:<28} {r['calls']:>6} {_fmt(r['latency_p50']):>7} {_fmt(r['latency_p95']):>7} "
+            f"{_fmt(r['ttft_p50']):>6} {_fmt(r['gen_tps_p50'], '.1f'):>8} {_fmt(r['gen_tps_p5'], '.1f'):>7} "
+            f"{_fmt(r['prompt_tps'], '.1f'):>10} {r['load_share']:>6.0%} {_fmt(r['queue_p95']):>9}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,536 @@
+#!/usr/bin/env python3
+"""Offline mock of the Ollama and OpenAI-compatible HTTP APIs for load tests.
+
+Answers like a real server, without a model, so client-side concurrency and
+overhead can be benchmarked reproducibly on any machine:
+
+- ``POST /v1/chat/completions``, ``/v1/completions``: OpenAI shapes, SSE
+  when ``stream`` is set (with a usage chunk if ``stream_options`` asks)
+- ``POST /api/chat``, ``/api/generate``: Ollama shapes with ``eval_count``,
+  ``eval_duration`` and friends, NDJSON when streaming (the default there)
+- ``POST /v1/embeddings``, ``/api/embed``, ``/api/embeddings``
+- ``GET /api/tags``, ``/api/ps``, ``/v1/models`` and ``/mock/stats``
+  (request counts and the peak number of requests in flight)
+
+Replies are deterministic: the same prompt and ``--seed`` give the same
+text and the same embedding.  Timing follows ``--ttft`` plus one token
+every ``1/--tps`` seconds (with ``--jitter``), a model not used for
+``--keep-alive`` seconds pays ``--load-time`` first, and ``--parallel``
+queues requests like ``OLLAMA_NUM_PARALLEL``.  ``--error-rate`` makes a
+share of requests fail with ``--error-status``.
+
+Usage:
+  python -m agents.llm.mock_server --port 11435 --ttft 0.3 --tps 40 --parallel 4
+
+  # then point any tool at it, e.g.
+  OLLAMA_BASE_URL=http://127.0.0.1:11435 python "agents/VisaBot/macOS Tahoe 26.2/run_visabot.py"
+  OLLAMA_BASE_URL=http://127.0.0.1:11435 python examples/programming/02_ollama_local_demo.py \\
+      --prompts-file prompts.jsonl -c 16
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+_PINNED_UNTIL = datetime(2318, 1, 1, tzinfo=timezone.utc).timestamp()
+
+_VOCAB = (
+    "the model returns a short answer about your request with some detail on each step "
+    "first check the input then run the code and verify that results match expectations "
+    "use a list of items to describe options and keep the output clear and concise"
+).split()
+
+
+@dataclass
+class MockConfig:
+    models: List[str] = field(default_factory=lambda: ["llama3.1:8b", "deepseek-r1:8b", "nomic-embed-text"])
+    ttft: float = 0.2
+    tps: float = 50.0
+    prompt_tps: float = 0.0
+    jitter: float = 0.0
+    tokens: int = 64
+    load_time: float = 0.0
+    keep_alive: float = 300.0
+    parallel: int = 0
+    error_rate: float = 0.0
+    error_status: int = 500
+    embed_dim: int = 768
+    seed: int = 0
+    replies: Dict[str, str] = field(default_factory=dict)
+
+
+def _hash_int(*parts: Any) -> int:
+    digest = hashlib.sha256(json.dumps(parts, sort_keys=True, ensure_ascii=False).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def _count_tokens(text: str) -> int:
+    # close enough to a BPE count for timing purposes
+    return max(1, math.ceil(len(text.split()) * 1.3)) if text else 0
+
+
+def _nanos(seconds: float) -> int:
+    return int(seconds * 1e9)
+
+
+class MockState:
+    """Counters and per-model load state shared by all handler threads."""
+
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.lock = threading.Lock()
+        self.requests: Dict[str, int] = {}
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.expires: Dict[str, float] = {}
+        self.slots = threading.Semaphore(config.parallel) if config.parallel > 0 else None
+
+    def begin(self, path: str) -> None:
+        with self.lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def end(self) -> None:
+        with self.lock:
+            self.in_flight -= 1
+
+    def load(self, model: str, keep_alive: Optional[float] = None) -> float:
+        """Seconds of load time this request pays for ``model``; renews its keep_alive."""
+        now = time.time()
+        ttl = self.config.keep_alive if keep_alive is None else keep_alive
+        with self.lock:
+            cold = self.expires.get(model, 0.0) < now
+            self.expires[model] = math.inf if ttl < 0 else now + ttl
+        return self.config.load_time if cold else 0.0
+
+    def unload(self, model: str) -> None:
+        with self.lock:
+            self.expires.pop(model, None)
+
+    def resident(self) -> List[Tuple[str, float]]:
+        now = time.time()
+        with self.lock:
+            return [(m, t) for m, t in self.expires.items() if t >= now]
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "requests": dict(self.requests),
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+            }
+
+
+class Generation:
+    """The deterministic reply and its timing for one request."""
+
+    def __init__(
+        self,
+        state: MockState,
+        model: str,
+        prompt: str,
+        max_tokens: Optional[int],
+        keep_alive: Optional[float] = None,
+    ):
+        cfg = state.config
+        self.model = model
+        self.rng = random.Random(_hash_int(cfg.seed, model, prompt))
+        self.pieces = self._pieces(cfg, prompt, max_tokens)
+        self.finish_reason = "length" if max_tokens is not None and self.truncated else "stop"
+        self.prompt_tokens = _count_tokens(prompt)
+        scale = 1 + self.rng.uniform(-cfg.jitter, cfg.jitter) if cfg.jitter else 1.0
+        self.load_s = state.load(model, keep_alive)
+        self.prompt_s = self.prompt_tokens / cfg.prompt_tps if cfg.prompt_tps > 0 else 0.0
+        self.ttft_s = cfg.ttft * scale
+        self.token_s = scale / cfg.tps if cfg.tps > 0 else 0.0
+
+    def _pieces(self, cfg: MockConfig, prompt: str, max_tokens: Optional[int]) -> List[str]:
+        reply = next((r for key, r in cfg.replies.items() if key != "default" and key in prompt), None)
+        if reply is None:
+            reply = cfg.replies.get("default")
+        if reply is not None:
+            words = [w + " " for w in reply.split(" ")]
+            words[-1] = words[-1][:-1]
+        else:
+            words = [self.rng.choice(_VOCAB) + " " for _ in range(cfg.tokens)]
+        limit = len(words) if max_tokens is None else max(0, max_tokens)
+        self.truncated = len(words) > limit
+        return words[:limit]
+
+    @property
+    def text(self) -> str:
+        return "".join(self.pieces)
+
+    @property
+    def eval_s(self) -> float:
+        return self.token_s * len(self.pieces)
+
+    @property
+    def total_s(self) -> float:
+        return self.load_s + self.prompt_s + self.ttft_s + self.eval_s
+
+    def stream(self) -> Iterator[str]:
+        """Sleep like a server would and yield one piece at a time."""
+        time.sleep(self.load_s + self.prompt_s + self.ttft_s)
+        for piece in self.pieces:
+            yield piece
+            time.sleep(self.token_s)
+
+    def ollama_counters(self) -> Dict[str, Any]:
+        return {
+            "done": True,
+            "done_reason": "length" if self.finish_reason == "length" else "stop",
+            "total_duration": _nanos(self.total_s),
+            "load_duration": _nanos(self.load_s),
+            "prompt_eval_count": self.prompt_tokens,
+            "prompt_eval_duration": _nanos(self.prompt_s + self.ttft_s),
+            "eval_count": len(self.pieces),
+            "eval_duration": _nanos(self.eval_s),
+        }
+
+    def usage(self) -> Dict[str, int]:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": len(self.pieces),
+            "total_tokens": self.prompt_tokens + len(self.pieces),
+        }
+
+
+def _prompt_of(body: Dict[str, Any]) -> str:
+    if "messages" in body:
+        return "\n".join(str(m.get("content", "")) for m in body["messages"] or [])
+    prompt = body.get("prompt", "")
+    return "\n".join(prompt) if isinstance(prompt, list) else str(prompt)
+
+
+def _max_tokens(body: Dict[str, Any]) -> Optional[int]:
+    value = body.get("max_tokens", body.get("max_completion_tokens"))
+    if value is None:
+        value = (body.get("options") or {}).get("num_predict")
+    return None if value is None or value < 0 else int(value)
+
+
+def _keep_alive_seconds(value: Any) -> Optional[float]:
+    """Ollama keep_alive ("5m", "1h", 300, -1) in seconds; None when absent."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip()
+    units = {"s": 1, "m": 60, "h": 3600}
+    if text and text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+def embed_vector(seed: int, model: str, text: str, dim: int) -> List[float]:
+    """Deterministic unit vector for ``text``."""
+    rng = random.Random(_hash_int(seed, model, text))
+    vec = [rng.gauss(0.0, 1.0) for _ in range(dim)]
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [round(v / norm, 6) for v in vec]
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "MockServer"
+
+    def setup(self) -> None:
+        super().setup()
+        # Small writes (SSE chunks, short bodies) must not wait on Nagle
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, fmt: str, *args: Any) -> None:
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    # -- helpers -------------------------------------------------------------
+
+    def _send_json(self, obj: Any, status: int = 200) -> None:
+        body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_chunked(self, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _chunk(self, data: str) -> None:
+        raw = data.encode("utf-8")
+        self.wfile.write(f"{len(raw):x}\r\n".encode("ascii") + raw + b"\r\n")
+        self.wfile.flush()
+
+    def _end_chunked(self) -> None:
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    # -- routing ---------------------------------------------------------------
+
+    def do_GET(self) -> None:
+        state = self.server.state
+        path = self.path.split("?", 1)[0]
+        if path == "/api/tags":
+            self._send_json({"models": [{"name": m, "model": m, "size": 0} for m in state.config.models]})
+        elif path == "/api/ps":
+            models = []
+            for name, expires in state.resident():
+                # Ollama reports pinned models as expiring centuries from now
+                stamp = datetime.fromtimestamp(min(expires, _PINNED_UNTIL), timezone.utc)
+                models.append({"name": name, "model": name, "size": 0, "size_vram": 0,
+                               "expires_at": stamp.isoformat()})
+            self._send_json({"models": models})
+        elif path == "/v1/models":
+            self._send_json({"object": "list", "data": [{"id": m, "object": "model"} for m in state.config.models]})
+        elif path == "/mock/stats":
+            self._send_json(state.stats())
+        else:
+            self._send_json({"error": f"not found: {path}"}, status=404)
+
+    def do_POST(self) -> None:
+        state = self.server.state
+        path = self.path.split("?", 1)[0]
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json({"error": "invalid JSON body"}, status=400)
+            return
+
+        handlers = {
+            "/v1/chat/completions": self._openai_completion,
+            "/v1/completions": self._openai_completion,
+            "/api/chat": self._ollama_completion,
+            "/api/generate": self._ollama_completion,
+            "/v1/embeddings": self._embeddings,
+            "/api/embed": self._embeddings,
+            "/api/embeddings": self._embeddings,
+        }
+        handler = handlers.get(path)
+        if handler is None:
+            self._send_json({"error": f"not found: {path}"}, status=404)
+            return
+
+        state.begin(path)
+        try:
+            cfg = state.config
+            if cfg.error_rate and random.random() < cfg.error_rate:
+                with state.lock:
+                    state.errors += 1
+                self._send_json({"error": {"message": "injected failure", "type": "mock_error"}},
+                                status=cfg.error_status)
+                return
+            if state.slots is not None:
+                with state.slots:
+                    handler(path, body)
+            else:
+                handler(path, body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client went away mid-stream (e.g. a cancelled hedge)
+        finally:
+            state.end()
+
+    # -- endpoints -------------------------------------------------------------
+
+    def _openai_completion(self, path: str, body: Dict[str, Any]) -> None:
+        chat = path.endswith("/chat/completions")
+        model = body.get("model") or self.server.state.config.models[0]
+        gen = Generation(self.server.state, model, _prompt_of(body), _max_tokens(body))
+        ident = f"{'chatcmpl' if chat else 'cmpl'}-{_hash_int(model, gen.text) % 10**12}"
+        created = int(time.time())
+        obj = "chat.completion" if chat else "text_completion"
+
+        def choice(text: str, finish: Optional[str], delta: bool) -> Dict[str, Any]:
+            if not chat:
+                return {"index": 0, "text": text, "finish_reason": finish}
+            key = "delta" if delta else "message"
+            return {"index": 0, key: {"role": "assistant", "content": text}, "finish_reason": finish}
+
+        if not body.get("stream"):
+            time.sleep(gen.total_s)
+            self._send_json({
+                "id": ident, "object": obj, "created": created, "model": model,
+                "choices": [choice(gen.text, gen.finish_reason, delta=False)],
+                "usage": gen.usage(),
+            })
+            return
+
+        chunk_obj = f"{obj}.chunk" if chat else obj
+        self._start_chunked("text/event-stream")
+        for piece in gen.stream():
+            event = {"id": ident, "object": chunk_obj, "created": created, "model": model,
+                     "choices": [choice(piece, None, delta=True)]}
+            self._chunk(f"data: {json.dumps(event, ensure_ascii=False)}\n\n")
+        final = {"id": ident, "object": chunk_obj, "created": created, "model": model,
+                 "choices": [choice("", gen.finish_reason, delta=True)]}
+        self._chunk(f"data: {json.dumps(final)}\n\n")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            usage = {"id": ident, "object": chunk_obj, "created": created, "model": model,
+                     "choices": [], "usage": gen.usage()}
+            self._chunk(f"data: {json.dumps(usage)}\n\n")
+        self._chunk("data: [DONE]\n\n")
+        self._end_chunked()
+
+    def _ollama_completion(self, path: str, body: Dict[str, Any]) -> None:
+        state = self.server.state
+        chat = path == "/api/chat"
+        model = body.get("model") or state.config.models[0]
+        keep_alive = _keep_alive_seconds(body.get("keep_alive"))
+        prompt = _prompt_of(body)
+        if keep_alive == 0:
+            state.unload(model)
+            self._send_json({"model": model, "created_at": _now(), "response": "", "done": True,
+                             "done_reason": "unload"})
+            return
+        if not prompt:
+            # Preload: load the model, generate nothing
+            load_s = state.load(model, keep_alive)
+            time.sleep(load_s)
+            self._send_json({"model": model, "created_at": _now(), "response": "", "done": True,
+                             "done_reason": "load", "load_duration": _nanos(load_s),
+                             "total_duration": _nanos(load_s)})
+            return
+
+        gen = Generation(state, model, prompt, _max_tokens(body), keep_alive)
+
+        def event(text: str) -> Dict[str, Any]:
+            out: Dict[str, Any] = {"model": model, "created_at": _now()}
+            if chat:
+                out["message"] = {"role": "assistant", "content": text}
+            else:
+                out["response"] = text
+            return out
+
+        if body.get("stream", True) is False:
+            time.sleep(gen.total_s)
+            self._send_json({**event(gen.text), **gen.ollama_counters()})
+            return
+
+        self._start_chunked("application/x-ndjson")
+        for piece in gen.stream():
+            self._chunk(json.dumps({**event(piece), "done": False}, ensure_ascii=False) + "\n")
+        self._chunk(json.dumps({**event(""), **gen.ollama_counters()}) + "\n")
+        self._end_chunked()
+
+    def _embeddings(self, path: str, body: Dict[str, Any]) -> None:
+        cfg = self.server.state.config
+        model = body.get("model") or cfg.models[-1]
+        raw = body.get("input", body.get("prompt", ""))
+        texts = raw if isinstance(raw, list) else [raw]
+        vectors = [embed_vector(cfg.seed, model, str(t), cfg.embed_dim) for t in texts]
+        prompt_tokens = sum(_count_tokens(str(t)) for t in texts)
+        # embeddings are one forward pass: charge prompt time only
+        elapsed = cfg.ttft * 0.1 + (prompt_tokens / cfg.prompt_tps if cfg.prompt_tps > 0 else 0.0)
+        time.sleep(elapsed)
+        if path == "/api/embed":
+            self._send_json({"model": model, "embeddings": vectors, "prompt_eval_count": prompt_tokens,
+                             "total_duration": _nanos(elapsed), "load_duration": 0})
+        elif path == "/api/embeddings":
+            self._send_json({"embedding": vectors[0]})
+        else:
+            self._send_json({
+                "object": "list", "model": model,
+                "data": [{"object": "embedding", "index": i, "embedding": v} for i, v in enumerate(vectors)],
+                "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+            })
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], config: MockConfig, verbose: bool = False):
+        super().__init__(address, MockHandler)
+        self.state = MockState(config)
+        self.verbose = verbose
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_mock_server(config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0) -> MockServer:
+    """Start a mock server on a background thread (port 0 picks a free port)."""
+    server = MockServer((host, port), config or MockConfig())
+    threading.Thread(target=server.serve_forever, name="llm-mock-server", daemon=True).start()
+    return server
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435, help="Port (default 11435, next to Ollama's 11434)")
+    parser.add_argument("--models", default="llama3.1:8b,deepseek-r1:8b,llama2-13b-chat,nomic-embed-text",
+                        help="Comma-separated models reported by /api/tags")
+    parser.add_argument("--ttft", type=float, default=0.2, help="Seconds before the first token")
+    parser.add_argument("--tps", type=float, default=50.0, help="Generated tokens per second (0: instant)")
+    parser.add_argument("--prompt-tps", type=float, default=0.0, help="Prompt tokens per second (0: free)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random +/- fraction applied to timings")
+    parser.add_argument("--tokens", type=int, default=64, help="Reply length when no max_tokens is sent")
+    parser.add_argument("--load-time", type=float, default=0.0, help="Cold-start seconds for an idle model")
+    parser.add_argument("--keep-alive", type=float, default=300.0, help="Seconds a model stays loaded when idle")
+    parser.add_argument("--parallel", type=int, default=0, help="Requests served at once (0: unlimited)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status of injected failures")
+    parser.add_argument("--embed-dim", type=int, default=768)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--replies", help='JSON file {"substring": "reply", "default": "reply"} of canned answers')
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    replies: Dict[str, str] = {}
+    if args.replies:
+        with open(args.replies, "r", encoding="utf-8") as f:
+            replies = json.load(f)
+    config = MockConfig(
+        models=[m.strip() for m in args.models.split(",") if m.strip()],
+        ttft=args.ttft,
+        tps=args.tps,
+        prompt_tps=args.prompt_tps,
+        jitter=args.jitter,
+        tokens=args.tokens,
+        load_time=args.load_time,
+        keep_alive=args.keep_alive,
+        parallel=args.parallel,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        embed_dim=args.embed_dim,
+        seed=args.seed,
+        replies=replies,
+    )
+    server = MockServer((args.host, args.port), config, verbose=args.verbose)
+    print(f"Mock LLM server on {server.base_url} (models: {', '.join(config.models)})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.state.stats()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""Keep local Ollama models loaded so interactive tools never hit a cold model.
+
+Ollama unloads an idle model after its ``keep_alive`` (5 minutes by
+default), and the next request then pays several seconds of load time.
+``ModelManager`` preloads models with an empty ``/api/generate`` call
+carrying a ``keep_alive``, checks ``/api/ps`` periodically and loads them
+again when they were evicted or are about to expire.  A negative
+``keep_alive`` (e.g. ``-1``) pins a model until Ollama restarts; the
+manager then only reloads it if it disappears.
+
+Usage:
+  manager = ModelManager(base_url).start(["llama3.1:8b"])   # background thread
+  ...
+  manager.stop()
+
+  python -m agents.llm.model_manager --list
+  python -m agents.llm.model_manager --preload deepseek-r1:8b llama3.1:8b --keep-alive 1h
+  python -m agents.llm.model_manager --measure llama3.1:8b
+
+Environment variables:
+  OLLAMA_BASE_URL       Ollama server (default: http://localhost:11434)
+  OLLAMA_KEEP_ALIVE     keep_alive sent with preloads (default: 30m)
+  OLLAMA_PRELOAD        set to 0 to disable preloading in the interactive tools
+  OLLAMA_PRELOAD_MODELS extra comma-separated models to keep warm
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from agents.llm.config import env_flag
+
+
+DEFAULT_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+DEFAULT_REFRESH_INTERVAL = 60.0
+# Reload a model this many seconds before its keep_alive runs out
+DEFAULT_REFRESH_MARGIN = 120.0
+LOAD_TIMEOUT = 600
+
+
+def _base_url(base_url: Optional[str]) -> str:
+    return (base_url or os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")).rstrip("/")
+
+
+def same_model(a: str, b: str) -> bool:
+    """Compare model names, treating a missing tag as ``:latest``."""
+    def norm(name: str) -> str:
+        return name if ":" in name else f"{name}:latest"
+    return norm(a) == norm(b)
+
+
+def parse_expiry(value: str) -> Optional[float]:
+    """Epoch seconds from Ollama's ``expires_at`` (RFC 3339, nanosecond precision)."""
+    if not value:
+        return None
+    # datetime wants at most 6 fractional digits and no "Z" on Python 3.8
+    value = re.sub(r"(\.\d{6})\d+", r"\1", value.replace("Z", "+00:00"))
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def configured_models(*defaults: str) -> List[str]:
+    """``defaults`` plus any models listed in ``OLLAMA_PRELOAD_MODELS``."""
+    models = [m for m in defaults if m]
+    for name in os.environ.get("OLLAMA_PRELOAD_MODELS", "").split(","):
+        name = name.strip()
+        if name and not any(same_model(name, m) for m in models):
+            models.append(name)
+    return models
+
+
+@dataclass
+class ResidentModel:
+    name: str
+    size: int
+    size_vram: int
+    expires: Optional[float]
+
+    def expires_in(self) -> Optional[float]:
+        return None if self.expires is None else self.expires - time.time()
+
+
+class ModelManager:
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        keep_alive: str = DEFAULT_KEEP_ALIVE,
+        refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+        refresh_margin: float = DEFAULT_REFRESH_MARGIN,
+    ):
+        self.base_url = _base_url(base_url)
+        self.keep_alive = keep_alive
+        self.refresh_interval = refresh_interval
+        self.refresh_margin = refresh_margin
+        self.load_times: Dict[str, float] = {}
+        self.last_error: Optional[str] = None
+        self._watched: Set[str] = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def pinned(self) -> bool:
+        return str(self.keep_alive).lstrip().startswith("-")
+
+    def _post(self, path: str, payload: Dict[str, Any]) -> Any:
+        from agents.llm.client import get_client
+        return get_client().post_json(f"{self.base_url}{path}", payload, timeout=LOAD_TIMEOUT)
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def preload(self, model: str, keep_alive: Optional[str] = None, options: Optional[Dict[str, Any]] = None) -> float:
+        """Load ``model`` (a no-op if resident) and reset its keep_alive; returns seconds.
+
+        ``options`` fixed at load time (``num_ctx``, ``num_thread``, ...) must
+        match later requests, or Ollama loads the model again.
+        """
+        payload: Dict[str, Any] = {"model": model, "keep_alive": keep_alive or self.keep_alive}
+        if options:
+            payload["options"] = options
+        t0 = time.perf_counter()
+        self._post("/api/generate", payload)
+        elapsed = time.perf_counter() - t0
+        self.load_times[model] = elapsed
+        return elapsed
+
+    def unload(self, model: str) -> None:
+        self._post("/api/generate", {"model": model, "keep_alive": 0})
+
+    def resident(self) -> List[ResidentModel]:
+        """Models currently loaded by the server (``/api/ps``)."""
+        from agents.llm.client import get_client
+        data = get_client().get_json(f"{self.base_url}/api/ps", timeout=10)
+        return [
+            ResidentModel(
+                name=m.get("name") or m.get("model", ""),
+                size=int(m.get("size", 0)),
+                size_vram=int(m.get("size_vram", 0)),
+                expires=parse_expiry(m.get("expires_at", "")),
+            )
+            for m in data.get("models", [])
+        ]
+
+    def ensure(self, models: Iterable[str]) -> List[str]:
+        """Preload models that are not resident or expire soon; returns those loaded."""
+        loaded = {m.name: m for m in self.resident()}
+        refreshed = []
+        for model in models:
+            current = next((m for name, m in loaded.items() if same_model(name, model)), None)
+            if current is not None:
+                remaining = current.expires_in()
+                if self.pinned or remaining is None or remaining > self.refresh_margin:
+                    continue
+            self.preload(model)
+            refreshed.append(model)
+        return refreshed
+
+    # -- background refresh -----------------------------------------------
+
+    def watch(self, model: str) -> None:
+        """Keep ``model`` warm from now on (loaded on the next refresh, promptly)."""
+        with self._lock:
+            if any(same_model(model, m) for m in self._watched):
+                return
+            self._watched.add(model)
+        self._wake.set()
+
+    def start(self, models: Iterable[str]) -> "ModelManager":
+        """Preload ``models`` in a background thread and keep them warm."""
+        for model in models:
+            self.watch(model)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._refresh_loop, name="ollama-preload", daemon=True)
+            self._thread.start()
+        return self
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.is_set():
+            self._wake.clear()
+            with self._lock:
+                models = sorted(self._watched)
+            try:
+                self.ensure(models)
+                self.last_error = None
+            except Exception as exc:
+                # Ollama not running yet: try again on the next round
+                self.last_error = str(exc)
+            self._wake.wait(self.refresh_interval)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    # -- measurement -------------------------------------------------------
+
+    def measure(self, model: str, prompt: str = "Hi") -> Dict[str, float]:
+        """Latency of a one-token request with the model unloaded (cold) and loaded (warm)."""
+        payload = {"model": model, "prompt": prompt, "stream": False, "options": {"num_predict": 1}}
+        self.unload(model)
+        timings: Dict[str, float] = {}
+        for label in ("cold", "warm"):
+            t0 = time.perf_counter()
+            data = self._post("/api/generate", payload)
+            timings[f"{label}_s"] = time.perf_counter() - t0
+            timings[f"{label}_load_s"] = data.get("load_duration", 0) / 1e9
+        return timings
+
+
+def enabled() -> bool:
+    """Whether the interactive tools should preload their models (OLLAMA_PRELOAD)."""
+    return env_flag("OLLAMA_PRELOAD", True)
+
+
+def _format_bytes(n: int) -> str:
+    return f"{n / 2**30:.1f} GiB"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", help="Ollama server (default: OLLAMA_BASE_URL)")
+    parser.add_argument("--keep-alive", default=DEFAULT_KEEP_ALIVE, help="keep_alive for preloads, e.g. 30m, 2h or -1 to pin")
+    parser.add_argument("--list", action="store_true", help="List resident models")
+    parser.add_argument("--preload", nargs="*", metavar="MODEL", help="Preload models (default: OLLAMA_PRELOAD_MODELS)")
+    parser.add_argument("--unload", nargs="+", metavar="MODEL", help="Unload models")
+    parser.add_argument("--measure", nargs="+", metavar="MODEL", help="Compare cold-start and warm latency")
+    parser.add_argument("--watch", action="store_true", help="Keep the preloaded models warm until interrupted")
+    args = parser.parse_args()
+
+    manager = ModelManager(args.base_url, keep_alive=args.keep_alive)
+    preload = configured_models(*(args.preload or [])) if args.preload is not None else []
+
+    for model in args.unload or []:
+        manager.unload(model)
+        print(f"unloaded {model}")
+    for model in preload:
+        print(f"preloaded {model} in {manager.preload(model):.2f}s (keep_alive {manager.keep_alive})")
+    for model in args.measure or []:
+        t = manager.measure(model)
+        print(
+            f"{model}: cold {t['cold_s']:.2f}s (load {t['cold_load_s']:.2f}s), "
+            f"warm {t['warm_s']:.2f}s (load {t['warm_load_s']:.2f}s), "
+            f"cold start costs {t['cold_s'] - t['warm_s']:.2f}s"
+        )
+    if args.list or not (preload or args.unload or args.measure):
+        for m in manager.resident():
+            remaining = m.expires_in()
+            until = "pinned" if remaining is None or remaining > 10 * 365 * 86400 else f"expires in {remaining / 60:.0f} min"
+            print(f"{m.name:<32} {_format_bytes(m.size):>9}  VRAM {_format_bytes(m.size_vram):>9}  {until}")
+    if args.watch and preload:
+        manager.start(preload)
+        print("keeping models warm; Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            manager.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,155 @@
+"""Compact encoding of tool results fed back to an agent's model.
+
+Raw command output is mostly noise to a model: progress bars, the same
+warning a hundred times, thousands of lines of which the first and last
+few matter.  ``encode_observation`` turns one action result into a short
+text block:
+
+- a header with the command (or path) and a structured outcome, e.g.
+  ``exit 1 (failed); stdout 2310 lines, stderr 4 lines``
+- output cleaned of ANSI escapes and carriage-return progress redraws,
+  with runs of repeated lines (identical, or differing only in numbers)
+  collapsed to the first and last plus a count
+- stdout cut in the middle and stderr cut at the head (errors are at the
+  end) so the block fits its token budget
+
+``encode_step`` encodes all results of one step within a single budget,
+failures first, so the prompt added per step stays bounded however much
+the actions print.
+
+Usage:
+  text = encode_step([(action, result), ...], budget=1500, counter=session.counter)
+"""
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from agents.llm.tokens import Section, TokenCounter, fit_sections, get_counter, trim_to_tokens
+
+
+DEFAULT_STEP_TOKENS = 1500
+# No result is squeezed below this, however many actions a step has
+MIN_RESULT_TOKENS = 120
+
+_ANSI = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]|\x1b\][^\x07]*\x07")
+_NUMBERS = re.compile(r"\d+")
+
+
+def clean_output(text: str) -> str:
+    """Strip ANSI escapes and keep only the last redraw of ``\\r`` progress lines."""
+    text = _ANSI.sub("", text)
+    return "\n".join(line.rsplit("\r", 1)[-1] for line in text.replace("\r\n", "\n").split("\n"))
+
+
+def collapse_repeats(text: str) -> str:
+    """Collapse runs of 3+ lines that are equal apart from their numbers."""
+    lines = text.split("\n")
+    out: List[str] = []
+    i = 0
+    while i < len(lines):
+        key = _NUMBERS.sub("#", lines[i])
+        j = i + 1
+        while j < len(lines) and _NUMBERS.sub("#", lines[j]) == key:
+            j += 1
+        run = j - i
+        if run < 3:
+            out.extend(lines[i:j])
+        elif all(line == lines[i] for line in lines[i:j]):
+            out += [lines[i], f"[... line repeated {run - 1} more times ...]"]
+        else:
+            out += [lines[i], f"[... {run - 2} similar lines ...]", lines[j - 1]]
+        i = j
+    return "\n".join(out)
+
+
+def _compact(text: str) -> str:
+    return collapse_repeats(clean_output(text or "")).strip("\n")
+
+
+def _line_count(text: str) -> int:
+    return text.count("\n") + (not text.endswith("\n")) if text else 0
+
+
+def failed(result: Dict[str, Any]) -> bool:
+    return bool(result.get("error")) or result.get("returncode") not in (None, 0) or result.get("status") == "error"
+
+
+def _shell(action_args: Dict[str, Any], result: Dict[str, Any]) -> Tuple[str, List[Section]]:
+    cmd = result.get("cmd") or action_args.get("cmd", "")
+    if result.get("status") == "skipped":
+        return f"$ {cmd}\nskipped: {result.get('output', 'declined')}", []
+    if "returncode" not in result:
+        return f"$ {cmd}\nerror: {result.get('error', 'unknown')}", []
+    rc = result["returncode"]
+    stdout, stderr = _compact(result.get("stdout", "")), _compact(result.get("stderr", ""))
+    outcome = "ok" if rc == 0 else "timed out" if result.get("timed_out") else "failed"
+    header = (
+        f"$ {cmd}\nexit {rc} ({outcome}); "
+        f"stdout {_line_count(result.get('stdout', ''))} lines, stderr {_line_count(result.get('stderr', ''))} lines"
+    )
+    sections = []
+    if stdout:
+        sections.append(Section("stdout", stdout, priority=1, cut="middle"))
+    if stderr:
+        # stderr matters most when the command failed; errors come last
+        sections.append(Section("stderr", stderr, priority=0 if rc else 2, cut="head"))
+    return header, sections
+
+
+def _body(action: Dict[str, Any], result: Dict[str, Any]) -> Tuple[str, List[Section]]:
+    kind = action.get("type")
+    args = action.get("args") or {}
+    if kind == "shell":
+        return _shell(args, result)
+    if result.get("error"):
+        target = result.get("path") or kind
+        return f"{kind} {target}: error: {result['error']}", []
+    if kind == "read":
+        content = result.get("content", "")
+        header = f"read {result.get('path')}: {_line_count(content)} lines, {len(content)} chars"
+        return header, [Section("content", content, priority=1, cut="middle")] if content else []
+    if kind == "write":
+        return f"write {result.get('path')}: {result.get('status', 'done')}", []
+    if kind == "embed":
+        summary = result.get("embeddings") or {}
+        return f"embed: {summary.get('embedded', 0)} embedded, {summary.get('duplicates', 0)} duplicates, " \
+               f"{summary.get('failed', 0)} failed", []
+    return f"{kind}: {result}", []
+
+
+def encode_observation(action: Dict[str, Any], result: Dict[str, Any], budget: int, counter: TokenCounter) -> str:
+    """One action result as a compact block of at most ~``budget`` tokens."""
+    header, sections = _body(action, result)
+    header = trim_to_tokens(header, max(budget // 4, 32), counter, cut="tail")
+    remaining = budget - counter.count(header) - 4 * len(sections)
+    kept = fit_sections(sections, remaining, counter) if remaining > 0 else []
+    parts = [header]
+    for section in sections:
+        shown = next((s for s in kept if s.name == section.name), None)
+        if shown is None:
+            parts.append(f"[{section.name} omitted: {_line_count(section.text)} lines]")
+        else:
+            parts.append(f"{section.name}:\n{shown.text}")
+    return "\n".join(parts)
+
+
+def encode_step(
+    results: Sequence[Tuple[Dict[str, Any], Dict[str, Any]]],
+    budget: int = DEFAULT_STEP_TOKENS,
+    counter: Optional[TokenCounter] = None,
+) -> str:
+    """All (action, result) pairs of a step within ``budget`` tokens; failures are kept longest."""
+    counter = counter or get_counter()
+    if not results:
+        return ""
+    share = max(MIN_RESULT_TOKENS, budget // len(results))
+    blocks = [
+        Section(f"{i + 1}", encode_observation(action, result, share, counter), priority=0 if failed(result) else 1)
+        for i, (action, result) in enumerate(results)
+    ]
+    kept = {s.name: s.text for s in fit_sections(blocks, budget, counter)}
+    return "\n\n".join(
+        f"[{b.name}] {kept[b.name]}" if b.name in kept else f"[{b.name}] (omitted to stay within budget)"
+        for b in blocks
+    )
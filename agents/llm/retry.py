@@ -0,0 +1,194 @@
+"""Deadlines and retries shared by every LLM call.
+
+A call gets one overall deadline, chosen by the process's priority class
+(``agents.llm.admission``): interactive tools give up sooner than batch
+jobs.  Within it, ``RetryPolicy.call``:
+
+- gives each attempt the endpoint's full timeout, capped only by the time
+  left before the deadline
+- retries connection failures, timeouts and 408/425/429/5xx responses
+  after an exponential backoff with jitter (or the server's
+  ``Retry-After``), and other errors not at all.  Callers pass
+  ``retry_timeouts=False`` for non-streamed generation calls: a read
+  timeout there means the generation itself is too slow, and repeating it
+  cannot finish sooner
+- raises ``DeadlineExceeded`` once the deadline has passed, instead of
+  starting an attempt that cannot finish in time
+
+The deadline is visible to nested calls: ``LLMClient`` and
+``StdlibTransport`` cap every socket timeout at the time left, and
+``iter_deltas`` stops a stream when the enclosing ``deadline()`` runs out.
+
+Usage:
+  with deadline(20):                       # everything inside shares 20 s
+      data = get_client().post_json(url, payload)
+
+  data = get_policy().call(lambda timeout: send(payload, timeout))
+
+Environment variables:
+  LLM_DEADLINE_INTERACTIVE  seconds per interactive call, retries included (default: 90)
+  LLM_DEADLINE_DEFAULT      seconds per call for other tools (default: 180)
+  LLM_DEADLINE_BATCH        seconds per batch-job call (default: 600)
+  LLM_MAX_ATTEMPTS          attempts per call (default: 3)
+"""
+from __future__ import annotations
+
+import contextlib
+import http.client
+import math
+import os
+import random
+import socket
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, Optional, TypeVar
+
+from agents.llm.admission import current_priority
+
+
+T = TypeVar("T")
+
+DEFAULT_DEADLINES: Dict[str, float] = {
+    "interactive": float(os.environ.get("LLM_DEADLINE_INTERACTIVE", "90")),
+    "default": float(os.environ.get("LLM_DEADLINE_DEFAULT", "180")),
+    "batch": float(os.environ.get("LLM_DEADLINE_BATCH", "600")),
+}
+DEFAULT_MAX_ATTEMPTS = int(os.environ.get("LLM_MAX_ATTEMPTS", "3"))
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.expires - time.monotonic()
+
+    def check(self) -> None:
+        if self.remaining() <= 0:
+            raise DeadlineExceeded(f"deadline of {self.seconds:.0f}s exceeded")
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("llm_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+@contextlib.contextmanager
+def deadline(seconds: float) -> Iterator[Deadline]:
+    """Bound everything inside to ``seconds``; an earlier enclosing deadline still wins."""
+    outer = _current.get()
+    inner = Deadline(seconds)
+    active = outer if outer is not None and outer.expires <= inner.expires else inner
+    token = _current.set(active)
+    try:
+        yield active
+    finally:
+        _current.reset(token)
+
+
+def cap_timeout(timeout: float) -> float:
+    """``timeout`` shortened to the time left before the current deadline."""
+    limit = _current.get()
+    if limit is None:
+        return timeout
+    limit.check()
+    return min(timeout, limit.remaining())
+
+
+def _status(exc: BaseException) -> Optional[int]:
+    # requests.HTTPError (.response.status_code), urllib's HTTPError (.code),
+    # http_transport.HTTPStatusError and httpx (.status / .response.status_code)
+    response = getattr(exc, "response", None)
+    for value in (getattr(response, "status_code", None), getattr(exc, "status", None), getattr(exc, "code", None)):
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_timeout(exc: BaseException) -> bool:
+    """A read timeout (``requests``' ``ReadTimeout`` or a socket timeout), not a connect failure."""
+    if type(exc).__name__ in ("ReadTimeout", "ReadTimeoutError"):
+        return True
+    return isinstance(exc, socket.timeout) and type(exc).__name__ != "ConnectTimeout"
+
+
+def retryable(exc: BaseException, retry_timeouts: bool = True) -> bool:
+    if isinstance(exc, DeadlineExceeded):
+        return False
+    if not retry_timeouts and is_timeout(exc):
+        return False
+    # A malformed body (requests' JSONDecodeError is an OSError too) or an
+    # undecodable content encoding will not parse any better next time
+    if isinstance(exc, ValueError) or type(exc).__name__ == "ContentDecodingError":
+        return False
+    status = _status(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    # Connection errors and timeouts: requests' exceptions are OSErrors too
+    return isinstance(exc, (OSError, http.client.HTTPException))
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    value = headers.get("Retry-After") if hasattr(headers, "get") else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None  # an HTTP date; use our own backoff
+
+
+@dataclass
+class RetryPolicy:
+    deadline_s: float
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS
+    backoff_s: float = 0.5
+    max_backoff_s: float = 8.0
+
+    @classmethod
+    def for_priority(cls, priority: str) -> "RetryPolicy":
+        return cls(deadline_s=DEFAULT_DEADLINES.get(priority, DEFAULT_DEADLINES["default"]))
+
+    def backoff(self, attempt: int) -> float:
+        """Exponential backoff with jitter before attempt ``attempt + 1``."""
+        return random.uniform(0.5, 1.0) * min(self.max_backoff_s, self.backoff_s * 2 ** attempt)
+
+    def call(self, fn: Callable[[float], T], timeout: Optional[float] = None, retry_timeouts: bool = True) -> T:
+        """Call ``fn(attempt_timeout)`` until it succeeds, fails for good or the deadline passes.
+
+        Each attempt gets ``timeout`` (e.g. the endpoint's read timeout), or
+        less once the deadline is closer.  With ``retry_timeouts=False`` a
+        read timeout is final.
+        """
+        last: Optional[BaseException] = None
+        attempts = max(1, self.max_attempts)
+        with deadline(self.deadline_s) as limit:
+            for attempt in range(attempts):
+                remaining = limit.remaining()
+                if remaining <= 0:
+                    break
+                try:
+                    return fn(min(remaining, timeout if timeout is not None else math.inf))
+                except Exception as exc:
+                    if not retryable(exc, retry_timeouts) or attempt == attempts - 1:
+                        raise
+                    last = exc
+                pause = max(self.backoff(attempt), _retry_after(last) or 0.0)
+                if pause >= limit.remaining():
+                    break
+                time.sleep(pause)
+            detail = f" after {attempt + 1} attempt(s): {last}" if last is not None else ""
+            raise DeadlineExceeded(f"deadline of {limit.seconds:.0f}s exceeded{detail}") from last
+
+
+def get_policy() -> RetryPolicy:
+    """The policy for this process's priority class (see ``admission.set_priority``)."""
+    return RetryPolicy.for_priority(current_priority())
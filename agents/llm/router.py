@@ -0,0 +1,237 @@
+"""Route LLM requests across several Ollama hosts.
+
+Each request goes to the healthy endpoint that serves the requested model
+and has the fewest requests in flight (ties rotate).  A background thread
+polls ``/api/tags`` on every endpoint: it learns which models each host
+has, re-admits ejected hosts that answer again and ejects hosts that fail
+``failure_threshold`` checks in a row.  Failed requests (connection errors,
+5xx) count towards ejection as well, so a dead box stops receiving traffic
+before the next health check.
+
+Endpoints come from ``OLLAMA_ENDPOINTS``, a comma-separated list of base
+URLs, each optionally followed by ``=model|model`` to pin the models it
+serves (otherwise they are discovered):
+
+  OLLAMA_ENDPOINTS="http://127.0.0.1:11434=deepseek-r1:8b|llama3.1:8b, http://10.0.0.5:11434"
+
+Without it the router wraps the single ``OLLAMA_BASE_URL``.  With a
+``Hedger`` (``LLM_HEDGE=1``) requests are streamed: one whose host is slow
+to send its first token is duplicated to a second host, the first host to
+stream a token wins and the other request is cancelled.
+"""
+from __future__ import annotations
+
+import itertools
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set
+
+from agents.llm.client import LLMClient, get_client
+from agents.llm.hedging import Attempt, AttemptCancelled, Hedger, stream_json
+from agents.llm.retry import DeadlineExceeded, _status
+
+
+DEFAULT_HEALTH_INTERVAL = 10.0
+DEFAULT_FAILURE_THRESHOLD = 3
+HEALTH_TIMEOUT = 3.0
+
+
+@dataclass
+class Endpoint:
+    base_url: str
+    models: Set[str] = field(default_factory=set)
+    pinned: bool = False
+    in_flight: int = 0
+    healthy: bool = True
+    failures: int = 0
+    served: int = 0
+    errors: int = 0
+
+    def serves(self, model: Optional[str]) -> bool:
+        if not model or not self.models:
+            return True
+        # "llama3.1" matches "llama3.1:latest"
+        return model in self.models or f"{model}:latest" in self.models
+
+
+def parse_endpoints(spec: str) -> List[Endpoint]:
+    endpoints = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        url, _, models = entry.partition("=")
+        pinned = {m.strip() for m in models.split("|") if m.strip()}
+        endpoints.append(Endpoint(url.strip().rstrip("/"), models=pinned, pinned=bool(pinned)))
+    return endpoints
+
+
+class NoEndpointAvailable(RuntimeError):
+    pass
+
+
+class OllamaRouter:
+    def __init__(
+        self,
+        endpoints: List[Endpoint],
+        client: Optional[LLMClient] = None,
+        health_interval: float = DEFAULT_HEALTH_INTERVAL,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        hedger: Optional[Hedger] = None,
+    ):
+        if not endpoints:
+            raise ValueError("at least one endpoint is required")
+        self.endpoints = endpoints
+        self.client = client
+        self.health_interval = health_interval
+        self.failure_threshold = failure_threshold
+        self.hedger = hedger
+        self._lock = threading.Lock()
+        self._rotation = itertools.count()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls, **kwargs: Any) -> "OllamaRouter":
+        spec = os.environ.get("OLLAMA_ENDPOINTS") or os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+        kwargs.setdefault("hedger", Hedger.from_env())
+        return cls(parse_endpoints(spec), **kwargs)
+
+    def _client(self) -> LLMClient:
+        return self.client or get_client()
+
+    # -- selection ---------------------------------------------------------
+
+    def pick(self, model: Optional[str], exclude: Sequence[Endpoint] = ()) -> Endpoint:
+        """Least-outstanding-requests choice among healthy endpoints for ``model``."""
+        with self._lock:
+            candidates = [
+                e for e in self.endpoints
+                if e.healthy and e.serves(model) and all(e is not x for x in exclude)
+            ]
+            if not candidates:
+                raise NoEndpointAvailable(f"no healthy endpoint serves model {model!r}")
+            fewest = min(e.in_flight for e in candidates)
+            tied = [e for e in candidates if e.in_flight == fewest]
+            return tied[next(self._rotation) % len(tied)]
+
+    @contextmanager
+    def acquire(self, model: Optional[str], exclude: Sequence[Endpoint] = ()) -> Iterator[Endpoint]:
+        """Reserve an endpoint for one request; failures count towards ejection."""
+        endpoint = self.pick(model, exclude)
+        with self._lock:
+            endpoint.in_flight += 1
+        try:
+            yield endpoint
+        except Exception as exc:
+            if _is_backend_failure(exc):
+                self._record_failure(endpoint)
+            raise
+        else:
+            with self._lock:
+                endpoint.failures = 0
+                endpoint.served += 1
+        finally:
+            with self._lock:
+                endpoint.in_flight -= 1
+
+    def post_json(self, path: str, payload: Dict[str, Any], **kwargs: Any) -> Any:
+        """POST ``payload`` to ``path`` (e.g. "/api/chat") on the chosen endpoint."""
+        if self.hedger is None or len(self.endpoints) < 2:
+            return self._post_once(path, payload, [], **kwargs)
+        # The backup goes to a different host than the primary
+        used: List[Endpoint] = []
+        return self.hedger.call(
+            lambda attempt: self._post_once(path, payload, used, attempt, **kwargs),
+            lambda attempt: self._post_once(path, payload, used, attempt, **kwargs),
+        )
+
+    def _post_once(
+        self,
+        path: str,
+        payload: Dict[str, Any],
+        used: List[Endpoint],
+        attempt: Optional[Attempt] = None,
+        **kwargs: Any,
+    ) -> Any:
+        with self.acquire(payload.get("model"), exclude=used) as endpoint:
+            used.append(endpoint)
+            url = f"{endpoint.base_url}{path}"
+            if attempt is None:
+                return self._client().post_json(url, payload, **kwargs)
+            # Streamed, so the loser stops as soon as the other host sends a token
+            return stream_json(url, payload, attempt, headers=kwargs.get("headers"), timeout=kwargs.get("timeout"))
+
+    # -- health ------------------------------------------------------------
+
+    def _record_failure(self, endpoint: Endpoint) -> None:
+        with self._lock:
+            endpoint.errors += 1
+            endpoint.failures += 1
+            if endpoint.failures >= self.failure_threshold:
+                endpoint.healthy = False
+
+    def check(self, endpoint: Endpoint) -> bool:
+        """Probe one endpoint now, updating its health and model list."""
+        try:
+            tags = self._client().get_json(f"{endpoint.base_url}/api/tags", timeout=HEALTH_TIMEOUT)
+        except Exception:
+            self._record_failure(endpoint)
+            return False
+        with self._lock:
+            if not endpoint.pinned:
+                endpoint.models = {m.get("name", "") for m in tags.get("models", [])}
+            endpoint.failures = 0
+            endpoint.healthy = True
+        return True
+
+    def check_all(self) -> None:
+        for endpoint in self.endpoints:
+            self.check(endpoint)
+
+    def start(self) -> "OllamaRouter":
+        """Run an initial check and start the background health thread."""
+        self.check_all()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._health_loop, name="ollama-router-health", daemon=True)
+            self._thread.start()
+        return self
+
+    def _health_loop(self) -> None:
+        while not self._stop.wait(self.health_interval):
+            self.check_all()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=HEALTH_TIMEOUT + 1)
+            self._thread = None
+
+    def stats_lines(self) -> List[str]:
+        with self._lock:
+            lines = [
+                f"{e.base_url}: {'up' if e.healthy else 'EJECTED'}, served {e.served}, "
+                f"errors {e.errors}, in flight {e.in_flight}"
+                for e in self.endpoints
+            ]
+        if self.hedger is not None:
+            lines.append(self.hedger.stats_line())
+        return lines
+
+
+def _is_backend_failure(exc: BaseException) -> bool:
+    """Connection problems and 5xx mean the host is in trouble; 4xx do not.
+
+    A cancelled hedge attempt or the caller's deadline running out says
+    nothing about the host.
+    """
+    if isinstance(exc, (AttemptCancelled, DeadlineExceeded)):
+        return False
+    # requests' .response.status_code and the stdlib transport's .status alike
+    status = _status(exc)
+    if status is not None:
+        return status >= 500
+    # requests' exceptions derive from OSError as well
+    return isinstance(exc, OSError)
@@ -0,0 +1,221 @@
+"""Semantic response cache: answer paraphrased questions from past answers.
+
+Prompts are embedded through an embeddings endpoint (Ollama ``/api/embed``
+by default, or any callable such as ``DeepseekClient.embed``) and compared
+by cosine similarity against every stored prompt.  The vectors live in a
+float32 file that is memory-mapped read-only for lookups and grown by
+appending, so the index does not have to fit in RAM; answers and their
+original latency sit in a JSONL sidecar with one line per row.
+
+Usage:
+  cache = SemanticCache.from_env(namespace=model)
+  answer = cache.get_or_compute(question, lambda: ask_model(question))
+  print(cache.stats_line())
+
+Environment variables:
+  SEMANTIC_CACHE            set to 1 to enable (``from_env`` returns None otherwise)
+  SEMANTIC_CACHE_THRESHOLD  minimum cosine similarity for a hit (default: 0.92)
+  SEMANTIC_CACHE_DIR        storage root (default: <config cache_dir>/semantic)
+  EMBED_MODEL               Ollama embedding model (default: nomic-embed-text)
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+import numpy as np
+
+from agents.llm.config import env_flag, load_global_config, resolve_path
+
+
+DEFAULT_THRESHOLD = 0.92
+DEFAULT_EMBED_MODEL = os.environ.get("EMBED_MODEL", "nomic-embed-text")
+
+EmbedFn = Callable[[List[str]], Any]
+
+
+def parse_embeddings(data: Any) -> List[List[float]]:
+    """Vectors from an Ollama ``/api/embed`` or OpenAI-style embeddings response."""
+    if isinstance(data, dict):
+        if "embeddings" in data:
+            return data["embeddings"]
+        if "embedding" in data:
+            return [data["embedding"]]
+        if "data" in data:
+            return [row["embedding"] for row in sorted(data["data"], key=lambda r: r.get("index", 0))]
+    if isinstance(data, list):
+        return data
+    raise ValueError("unrecognised embeddings response")
+
+
+def ollama_embedder(base_url: Optional[str] = None, model: str = DEFAULT_EMBED_MODEL) -> EmbedFn:
+    """Embed function backed by Ollama's ``/api/embed`` via the shared client."""
+    from agents.llm.client import get_client
+
+    url = f"{(base_url or os.environ.get('OLLAMA_BASE_URL', 'http://localhost:11434')).rstrip('/')}/api/embed"
+
+    def embed(texts: List[str]) -> Any:
+        return get_client().post_json(url, {"model": model, "input": texts})
+
+    return embed
+
+
+class SemanticCache:
+    def __init__(
+        self,
+        cache_dir: Path,
+        embed_fn: EmbedFn,
+        threshold: float = DEFAULT_THRESHOLD,
+    ):
+        self.dir = Path(cache_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self._vectors_path = self.dir / "vectors.f32"
+        self._entries_path = self.dir / "entries.jsonl"
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.memmap] = None
+        self.entries: List[dict] = []
+        self.dim: Optional[int] = None
+        self.lookups = 0
+        self.hits = 0
+        self.saved_s = 0.0
+        self.errors = 0
+        self._load()
+
+    @classmethod
+    def for_namespace(cls, namespace: str, embed_fn: Optional[EmbedFn] = None) -> "SemanticCache":
+        """Open the cache for ``namespace`` (e.g. app + model) under the configured root."""
+        root = os.environ.get("SEMANTIC_CACHE_DIR")
+        if root is None:
+            root = str(resolve_path(load_global_config().get("cache_dir", ".cache")) / "semantic")
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", namespace)
+        return cls(
+            Path(root) / safe,
+            embed_fn or ollama_embedder(),
+            threshold=float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", DEFAULT_THRESHOLD)),
+        )
+
+    @classmethod
+    def from_env(cls, namespace: str, embed_fn: Optional[EmbedFn] = None) -> Optional["SemanticCache"]:
+        """Like ``for_namespace``, but None unless SEMANTIC_CACHE is enabled."""
+        if not env_flag("SEMANTIC_CACHE", False):
+            return None
+        return cls.for_namespace(namespace, embed_fn)
+
+    def _load(self) -> None:
+        lines = 0
+        if self._entries_path.exists():
+            with self._entries_path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        self.entries.append(json.loads(line))
+                    except ValueError:
+                        break  # torn last line from an interrupted store
+        size = self._vectors_path.stat().st_size if self._vectors_path.exists() else 0
+        if self.entries:
+            self.dim = self.entries[0]["dim"]
+            # An interrupted store can leave one side a row ahead; cut both
+            # back to the rows present in full so later appends stay aligned.
+            row_bytes = 4 * self.dim
+            self.entries = self.entries[: size // row_bytes]
+        rows = len(self.entries)
+        if rows != lines:
+            with self._entries_path.open("w", encoding="utf-8") as f:
+                f.writelines(json.dumps(e, ensure_ascii=False) + "\n" for e in self.entries)
+        expected = rows * 4 * self.dim if self.dim else 0
+        if size != expected:
+            with self._vectors_path.open("r+b") as f:
+                f.truncate(expected)
+
+    def _view(self) -> Optional[np.ndarray]:
+        """Read-only memmap over the first len(entries) rows."""
+        n = len(self.entries)
+        if n == 0:
+            return None
+        if self._matrix is None or self._matrix.shape[0] != n:
+            self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(n, self.dim))
+        return self._matrix
+
+    def _embed(self, text: str) -> np.ndarray:
+        vec = np.asarray(parse_embeddings(self.embed_fn([text]))[0], dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def _nearest(self, vec: np.ndarray) -> tuple[int, float]:
+        matrix = self._view()
+        if matrix is None or matrix.shape[1] != vec.shape[0]:
+            return -1, -1.0
+        sims = matrix @ vec
+        idx = int(np.argmax(sims))
+        return idx, float(sims[idx])
+
+    def lookup(self, prompt: str) -> tuple[Optional[str], np.ndarray]:
+        """Return (answer or None, prompt vector) for a prompt."""
+        vec = self._embed(prompt)
+        with self._lock:
+            self.lookups += 1
+            idx, sim = self._nearest(vec)
+            if idx < 0 or sim < self.threshold:
+                return None, vec
+            entry = self.entries[idx]
+            self.hits += 1
+            self.saved_s += entry.get("latency_s", 0.0)
+        return entry["answer"], vec
+
+    def store(self, prompt: str, answer: str, latency_s: float, vec: Optional[np.ndarray] = None) -> None:
+        if vec is None:
+            vec = self._embed(prompt)
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vec.shape[0])
+            if vec.shape[0] != self.dim:
+                return  # embedding model changed; keep the index consistent
+            with self._vectors_path.open("ab") as f:
+                f.write(vec.astype(np.float32).tobytes())
+            entry = {
+                "prompt": prompt,
+                "answer": answer,
+                "latency_s": round(latency_s, 4),
+                "dim": self.dim,
+                "created": time.time(),
+            }
+            with self._entries_path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.entries.append(entry)
+
+    def get_or_compute(self, prompt: str, compute: Callable[[], str]) -> str:
+        """Answer from the cache, or call ``compute`` and remember its answer."""
+        t0 = time.perf_counter()
+        try:
+            answer, vec = self.lookup(prompt)
+        except Exception:
+            # embeddings endpoint unavailable: answer uncached
+            self.errors += 1
+            return compute()
+        if answer is not None:
+            # the lookup itself is not free; count only the net saving
+            self.saved_s -= time.perf_counter() - t0
+            return answer
+        t1 = time.perf_counter()
+        answer = compute()
+        if answer:
+            self.store(prompt, answer, time.perf_counter() - t1, vec)
+        return answer
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def stats_line(self) -> str:
+        return (
+            f"semantic cache: {self.hits}/{self.lookups} hits ({self.hit_rate:.0%}), "
+            f"saved {self.saved_s:.1f}s, {len(self.entries)} entries"
+        )
+
@@ -0,0 +1,289 @@
+"""A long-lived shell for running an agent's commands.
+
+``subprocess.run(cmd, shell=True)`` per action pays a shell start-up each
+time and forgets everything between actions: a ``cd``, an ``export`` or an
+activated virtualenv is gone by the next command.  ``ShellSession`` keeps
+one ``bash`` process instead and feeds it commands over stdin:
+
+- each command is passed in a quoted heredoc and ``eval``-ed in the shell
+  itself (stdin from ``/dev/null``), so state it changes persists
+- after it, the shell prints a random per-session marker with the exit
+  status and working directory to stdout and the marker to stderr; output
+  up to the markers is the command's stdout and stderr
+- a command still running at its timeout has its process tree killed
+  (SIGTERM, then SIGKILL); the shell itself survives with its state.  A
+  command that ends the shell (``exit``, ``set -e``) or a builtin loop
+  that cannot be interrupted ends the session, and the next command starts
+  a fresh one
+
+Results have the shape ``execute_shell`` always returned:
+``{"cmd", "returncode", "stdout", "stderr"}`` plus ``timed_out`` and ``cwd``.
+
+Usage:
+  shell = ShellSession.from_env()          # None on Windows or when disabled
+  shell.run("cd backend && source .venv/bin/activate")
+  shell.run("pytest -q", timeout=600)
+  shell.close()
+
+Environment variables (``from_env``):
+  AGENT_SHELL_SESSION   set to 0 to run every command in a new shell (default: 1)
+  AGENT_SHELL_TIMEOUT   seconds per command (default: 300)
+"""
+from __future__ import annotations
+
+import os
+import queue
+import shutil
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from agents.llm.config import env_flag
+
+
+DEFAULT_TIMEOUT = 300.0
+# After SIGTERM, how long a timed-out command gets before SIGKILL
+KILL_GRACE_S = 2.0
+
+
+def _descendants(pid: int) -> List[int]:
+    """PIDs of all processes below ``pid`` (via ``ps``, so Linux and macOS alike)."""
+    try:
+        out = subprocess.run(["ps", "-A", "-o", "pid=", "-o", "ppid="], capture_output=True, text=True, timeout=5).stdout
+    except (OSError, subprocess.SubprocessError):
+        return []
+    children: Dict[int, List[int]] = {}
+    for line in out.splitlines():
+        parts = line.split()
+        if len(parts) == 2:
+            children.setdefault(int(parts[1]), []).append(int(parts[0]))
+    found, todo = [], [pid]
+    while todo:
+        for child in children.get(todo.pop(), []):
+            found.append(child)
+            todo.append(child)
+    return found
+
+
+def _signal_all(pids: List[int], sig: int) -> None:
+    for pid in pids:
+        try:
+            os.kill(pid, sig)
+        except OSError:
+            pass
+
+
+def _exists(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    # A killed child stays a zombie until the shell reaps it
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().split(") ", 1)[1][:1] != "Z"
+    except (OSError, IndexError):
+        return True
+
+
+class ShellSession:
+    def __init__(
+        self,
+        shell: str = "bash",
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+    ):
+        self.shell = shell
+        self.cwd = cwd or os.getcwd()
+        self.env = env
+        self.timeout = timeout
+        self.commands = 0
+        self.timeouts = 0
+        self.restarts = 0
+        self._proc: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, cwd: Optional[str] = None) -> Optional["ShellSession"]:
+        if os.name == "nt" or not env_flag("AGENT_SHELL_SESSION", True):
+            return None
+        shell = shutil.which("bash")
+        if shell is None:
+            return None
+        return cls(shell, cwd=cwd, timeout=float(os.environ.get("AGENT_SHELL_TIMEOUT", DEFAULT_TIMEOUT)))
+
+    # -- process -------------------------------------------------------------
+
+    def _start(self) -> None:
+        self._marker = f"__agent_shell_{uuid.uuid4().hex}__"
+        self._proc = subprocess.Popen(
+            [self.shell, "--noprofile", "--norc"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=self.cwd,
+            env=self.env,
+            start_new_session=True,
+        )
+        self._queues = {"stdout": queue.Queue(), "stderr": queue.Queue()}
+        for name in self._queues:
+            threading.Thread(
+                target=self._pump, args=(getattr(self._proc, name), self._queues[name]), daemon=True
+            ).start()
+        # The end-of-command report: marker, exit status, whether the shell is ending, cwd
+        self._write(
+            f"__agent_done() {{ printf '%s %d %s %s\\n' '{self._marker}' \"$1\" \"$2\" \"$PWD\"; "
+            f"printf '%s\\n' '{self._marker}' >&2; }}\n"
+            "trap '__agent_done $? exit' EXIT\n"
+        )
+
+    @staticmethod
+    def _pump(stream: Any, out: "queue.Queue[Optional[bytes]]") -> None:
+        while True:
+            chunk = os.read(stream.fileno(), 65536)
+            if not chunk:
+                out.put(None)
+                return
+            out.put(chunk)
+
+    def _write(self, text: str) -> None:
+        assert self._proc is not None and self._proc.stdin is not None
+        self._proc.stdin.write(text.encode())
+        self._proc.stdin.flush()
+
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def close(self) -> None:
+        if self._proc is None:
+            return
+        proc, self._proc = self._proc, None
+        _signal_all(_descendants(proc.pid), signal.SIGKILL)
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=KILL_GRACE_S)
+        except (OSError, subprocess.TimeoutExpired):
+            proc.kill()
+            proc.wait()
+
+    def __enter__(self) -> "ShellSession":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    # -- commands ------------------------------------------------------------
+
+    def run(self, cmd: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Run ``cmd`` in the session; a timeout kills the command, not the session."""
+        with self._lock:
+            if not self.alive():
+                self.close()
+                self._start()
+            self.commands += 1
+            delimiter = f"{self._marker}EOF"
+            self._write(
+                f"IFS= read -r -d '' __agent_cmd <<'{delimiter}' || true\n{cmd}\n{delimiter}\n"
+                "eval \"$__agent_cmd\" </dev/null\n"
+                "__agent_done $? done\n"
+            )
+            return self._collect(cmd, timeout if timeout is not None else self.timeout)
+
+    def _collect(self, cmd: str, timeout: float) -> Dict[str, Any]:
+        marker = self._marker.encode()
+        buffers = {"stdout": bytearray(), "stderr": bytearray()}
+        ends: Dict[str, int] = {}
+        timed_out = False
+        deadline = time.monotonic() + timeout
+        while len(ends) < 2:
+            for name, q in self._queues.items():
+                if name in ends:
+                    continue
+                wait = max(0.0, min(0.05, deadline - time.monotonic()))
+                try:
+                    chunk = q.get(timeout=wait)
+                except queue.Empty:
+                    continue
+                if chunk is None:  # the shell is gone and no report came
+                    ends[name] = len(buffers[name])
+                    continue
+                buf = buffers[name]
+                start = max(0, len(buf) - len(marker))
+                buf += chunk
+                at = buf.find(marker, start)
+                if at >= 0:
+                    ends[name] = at
+            if len(ends) == 2 or not time.monotonic() >= deadline:
+                if timed_out and self._proc is not None:
+                    # Whatever the rest of the command line starts is killed too
+                    _signal_all(_descendants(self._proc.pid), signal.SIGKILL)
+                continue
+            if timed_out:
+                # Killing the command's processes did not end it (a builtin loop): drop the shell
+                self._proc.kill()
+                self.close()
+                break
+            timed_out = True
+            self.timeouts += 1
+            self._interrupt()
+            deadline = time.monotonic() + 2 * KILL_GRACE_S
+        out, err = buffers["stdout"], buffers["stderr"]
+        returncode, ending, cwd = self._report(out, ends.get("stdout"))
+        if cwd:
+            self.cwd = cwd
+        if ending:
+            # The command ended the shell; the next one starts a new session
+            self.restarts += 1
+            self.close()
+        return {
+            "cmd": cmd,
+            "returncode": returncode,
+            "stdout": bytes(out[:ends.get("stdout", len(out))]).decode("utf-8", "replace"),
+            "stderr": bytes(err[:ends.get("stderr", len(err))]).decode("utf-8", "replace"),
+            "timed_out": timed_out,
+            "cwd": self.cwd,
+        }
+
+    def _report(self, out: bytearray, end: Optional[int]) -> Tuple[int, bool, Optional[str]]:
+        """Exit status, whether the shell is ending, and cwd from the line after the stdout marker."""
+        if end is not None and out[end:].startswith(self._marker.encode()):
+            line = bytes(out[end + len(self._marker):]).decode("utf-8", "replace")
+            # The rest of the line may not have arrived with the marker's chunk
+            while "\n" not in line and self.alive():
+                try:
+                    chunk = self._queues["stdout"].get(timeout=1)
+                except queue.Empty:
+                    break
+                if chunk is None:
+                    break
+                line += chunk.decode("utf-8", "replace")
+            fields = line.split("\n", 1)[0].strip().split(" ", 2)
+            if len(fields) == 3 and fields[0].lstrip("-").isdigit():
+                return int(fields[0]), fields[1] == "exit", fields[2]
+        if self._proc is not None:
+            try:
+                return self._proc.wait(timeout=KILL_GRACE_S), True, None
+            except subprocess.TimeoutExpired:
+                pass
+        return -int(signal.SIGKILL), True, None
+
+    def _interrupt(self) -> None:
+        """Terminate everything the running command started, leaving the shell."""
+        if self._proc is None:
+            return
+        pids = _descendants(self._proc.pid)
+        _signal_all(pids, signal.SIGTERM)
+        give_up = time.monotonic() + KILL_GRACE_S
+        while time.monotonic() < give_up and any(_exists(pid) for pid in pids):
+            time.sleep(0.05)
+        _signal_all(_descendants(self._proc.pid), signal.SIGKILL)
+
+    def stats_line(self) -> str:
+        return f"shell: {self.commands} commands, {self.timeouts} timed out, {self.restarts} restarts"
+
@@ -0,0 +1,166 @@
+"""Parse streamed chat completions from Ollama into text deltas.
+
+Ollama streams in two formats:
+- OpenAI-compatible endpoints (``/v1/chat/completions``, ``/v1/completions``)
+  send Server-Sent Events: ``data: {...}`` lines ending with ``data: [DONE]``.
+- Native endpoints (``/api/chat``, ``/api/generate``) send NDJSON: one JSON
+  object per line, the last one with ``"done": true`` and eval counters.
+
+``iter_deltas`` accepts the raw lines of either format and yields the text
+pieces, filling a ``StreamStats`` with time-to-first-token and tokens/s.
+Given the request ``url``, a finished stream is logged by
+``agents.llm.metrics``.  Inside ``agents.llm.retry.deadline()`` the stream
+is abandoned with ``DeadlineExceeded`` once the deadline passes.
+"""
+from __future__ import annotations
+
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, Optional, Union
+
+
+_DONE = object()
+
+
+@dataclass
+class StreamStats:
+    started: float = field(default_factory=time.perf_counter)
+    ttft: Optional[float] = None
+    elapsed: float = 0.0
+    chunks: int = 0
+    completion_tokens: Optional[int] = None
+    eval_duration: Optional[float] = None
+    final: Optional[Dict[str, Any]] = None
+
+    @property
+    def tokens(self) -> int:
+        """Server-reported completion tokens, else the number of deltas."""
+        return self.completion_tokens if self.completion_tokens is not None else self.chunks
+
+    @property
+    def tokens_per_s(self) -> float:
+        # Prefer Ollama's own eval timing; otherwise time from first token on
+        if self.eval_duration:
+            return self.tokens / self.eval_duration
+        gen_time = self.elapsed - (self.ttft or 0.0)
+        return self.tokens / gen_time if gen_time > 0 else 0.0
+
+    def summary(self) -> str:
+        ttft = f"{self.ttft:.2f}s" if self.ttft is not None else "n/a"
+        return (
+            f"ttft {ttft}, {self.tokens} tokens in {self.elapsed:.2f}s, "
+            f"{self.tokens_per_s:.1f} tokens/s"
+        )
+
+
+def parse_stream_line(line: Union[str, bytes]) -> Any:
+    """Decode one SSE or NDJSON line.
+
+    Returns the JSON event, ``None`` for lines to ignore (blank, SSE comments
+    and ``event:`` fields) or the module-level ``_DONE`` sentinel.
+    """
+    if isinstance(line, bytes):
+        line = line.decode("utf-8", errors="replace")
+    line = line.strip()
+    if not line or line.startswith(":"):
+        return None
+    if line.startswith("data:"):
+        line = line[len("data:"):].strip()
+        if line == "[DONE]":
+            return _DONE
+    elif line.startswith(("event:", "id:", "retry:")):
+        return None
+    return json.loads(line)
+
+
+def extract_delta(event: Dict[str, Any]) -> str:
+    """Return the text carried by one streamed event (may be empty)."""
+    if "error" in event:
+        err = event["error"]
+        raise RuntimeError(err.get("message", str(err)) if isinstance(err, dict) else str(err))
+    choices = event.get("choices")
+    if choices:
+        choice = choices[0]
+        delta = choice.get("delta") or {}
+        return delta.get("content") or choice.get("text") or ""
+    if "message" in event:
+        return (event.get("message") or {}).get("content") or ""
+    return event.get("response") or ""
+
+
+def _record_final(event: Dict[str, Any], stats: StreamStats) -> None:
+    usage = event.get("usage")
+    if usage and usage.get("completion_tokens") is not None:
+        stats.completion_tokens = usage["completion_tokens"]
+        stats.final = event
+    if event.get("done"):
+        if event.get("eval_count") is not None:
+            stats.completion_tokens = event["eval_count"]
+        if event.get("eval_duration"):
+            stats.eval_duration = event["eval_duration"] / 1e9
+        stats.final = event
+
+
+def iter_deltas(
+    lines: Iterable[Union[str, bytes]],
+    stats: Optional[StreamStats] = None,
+    url: Optional[str] = None,
+    payload: Optional[Dict[str, Any]] = None,
+    queue_s: Optional[float] = None,
+) -> Iterator[str]:
+    """Yield text deltas from streamed lines, updating ``stats`` as they arrive."""
+    from agents.llm.retry import current_deadline
+
+    stats = stats if stats is not None else StreamStats()
+    limit = current_deadline()
+    finished = False
+    try:
+        for line in lines:
+            if limit is not None:
+                limit.check()
+            event = parse_stream_line(line)
+            if event is None:
+                continue
+            if event is _DONE:
+                break
+            _record_final(event, stats)
+            text = extract_delta(event)
+            if not text:
+                continue
+            if stats.ttft is None:
+                stats.ttft = time.perf_counter() - stats.started
+            stats.chunks += 1
+            yield text
+        finished = True
+    finally:
+        stats.elapsed = time.perf_counter() - stats.started
+        if url is not None and finished:
+            _record_stream(url, payload, stats, queue_s)
+
+
+def assemble_response(url: str, text: str, stats: StreamStats) -> Dict[str, Any]:
+    """The non-streamed response body equivalent to a finished stream of ``text``."""
+    final = dict(stats.final or {})
+    path = url.split("?", 1)[0].rstrip("/")
+    if path.endswith("/api/chat"):
+        final["message"] = {"role": "assistant", "content": text}
+    elif path.endswith("/api/generate"):
+        final["response"] = text
+    elif path.endswith("/chat/completions"):
+        final["choices"] = [{"index": 0, "message": {"role": "assistant", "content": text}}]
+    else:
+        final["choices"] = [{"index": 0, "text": text}]
+    return final
+
+
+def _record_stream(
+    url: str, payload: Optional[Dict[str, Any]], stats: StreamStats, queue_s: Optional[float] = None
+) -> None:
+    from agents.llm.metrics import record_call
+
+    final = dict(stats.final or {})
+    if stats.completion_tokens is None:
+        # No usage block: count streamed deltas as completion tokens
+        final.setdefault("usage", {})["completion_tokens"] = stats.chunks
+    record_call(url, payload, final, stats.elapsed, ttft_s=stats.ttft, stream=True, queue_s=queue_s)
@@ -0,0 +1,257 @@
+"""Token counting and prompt budgeting.
+
+``TokenCounter`` counts with a real tokenizer when one is installed:
+
+- ``tokenizers`` with ``LLM_TOKENIZER`` set to a ``tokenizer.json`` path or
+  a Hugging Face repo id (exact for that model; preferred for local models)
+- ``tiktoken``: the model's own encoding for OpenAI models, ``cl100k_base``
+  otherwise
+- otherwise a heuristic: ASCII text at ~3.6 characters per token, CJK at
+  ~0.8 tokens per character, roughly what those tokenizers give for code,
+  English and Chinese
+
+``cl100k_base`` and the heuristic only approximate a local model's
+tokenizer and undercount for some (Llama 2's vocabulary splits most Chinese
+characters into several byte tokens), so their counts are scaled up by a
+safety margin, larger for CJK text, to keep budgeted prompts inside
+``num_ctx``.
+
+Counts are memoized per chunk of text (split at line breaks), so prompts
+rebuilt from mostly the same pieces, and files read again after a small
+edit, are only tokenized where they changed.
+
+``fit_sections`` makes a prompt fit a token budget: sections are trimmed
+(keeping their head, tail or both ends, with a marker saying how much was
+left out) or dropped, least important first, so prompt-eval time stays
+bounded however much text a tool returns.
+
+Usage:
+  counter = get_counter("llama3.1:8b")
+  sections = fit_sections([
+      Section("task", task, priority=0),
+      Section("file", content, priority=2, cut="middle"),
+  ], budget=6000, counter=counter)
+  prompt = "\\n\\n".join(s.text for s in sections)
+
+Environment variables:
+  LLM_TOKENIZER         tokenizer for non-OpenAI models (see above)
+  LLM_TOKEN_MARGIN      factor applied to approximate counts (default: 1.15)
+  LLM_TOKEN_MARGIN_CJK  factor for CJK text instead (default: 1.5)
+"""
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, Hashable, List, Optional
+
+
+ASCII_CHARS_PER_TOKEN = 3.6
+CJK_TOKENS_PER_CHAR = 0.8
+OTHER_TOKENS_PER_CHAR = 0.5
+# Memoization granularity and size
+CHUNK_CHARS = 2048
+MEMO_ENTRIES = 16384
+# A section trimmed below this many tokens is dropped instead
+MIN_SECTION_TOKENS = 32
+# Approximate counts are multiplied by these, interpolated by the CJK share of a chunk
+APPROX_MARGIN = float(os.environ.get("LLM_TOKEN_MARGIN", "1.15"))
+APPROX_MARGIN_CJK = float(os.environ.get("LLM_TOKEN_MARGIN_CJK", "1.5"))
+
+_CJK = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]")
+_NON_ASCII = re.compile(r"[^\x00-\x7f]")
+_OPENAI_PREFIXES = ("gpt-", "o1", "o3", "o4", "text-embedding-")
+
+
+def heuristic_tokens(text: str) -> int:
+    if not text:
+        return 0
+    non_ascii = len(_NON_ASCII.findall(text))
+    cjk = len(_CJK.findall(text)) if non_ascii else 0
+    estimate = (
+        (len(text) - non_ascii) / ASCII_CHARS_PER_TOKEN
+        + cjk * CJK_TOKENS_PER_CHAR
+        + (non_ascii - cjk) * OTHER_TOKENS_PER_CHAR
+    )
+    return max(1, math.ceil(estimate))
+
+
+def _load_encoder(model: str) -> "tuple[str, Optional[Callable[[str], int]], bool]":
+    """(backend name, counting function, exact) for ``model``; the function is None for the heuristic."""
+    tokenizer_name = os.environ.get("LLM_TOKENIZER")
+    if tokenizer_name and not model.startswith(_OPENAI_PREFIXES):
+        try:
+            from tokenizers import Tokenizer
+
+            if os.path.exists(tokenizer_name):
+                tok = Tokenizer.from_file(tokenizer_name)
+            else:
+                tok = Tokenizer.from_pretrained(tokenizer_name)
+            return f"tokenizers:{tokenizer_name}", lambda text: len(tok.encode(text, add_special_tokens=False).ids), True
+        except Exception:
+            pass  # not installed, or the tokenizer could not be loaded
+    try:
+        import tiktoken
+    except ImportError:
+        return "heuristic", None, False
+    try:
+        enc, exact = tiktoken.encoding_for_model(model), True
+    except KeyError:
+        enc, exact = tiktoken.get_encoding("cl100k_base"), False
+    return f"tiktoken:{enc.name}", lambda text: len(enc.encode(text, disallowed_special=())), exact
+
+
+def approx_margin(text: str) -> float:
+    """Safety factor for an approximate count of ``text``."""
+    if not text or not _NON_ASCII.search(text):
+        return APPROX_MARGIN
+    share = len(_CJK.findall(text)) / len(text)
+    return APPROX_MARGIN + (APPROX_MARGIN_CJK - APPROX_MARGIN) * share
+
+
+def _chunks(text: str, size: int = CHUNK_CHARS) -> List[str]:
+    """Split at line breaks into pieces of roughly ``size`` characters."""
+    pieces = []
+    start = 0
+    while len(text) - start > size:
+        cut = text.find("\n", start + size)
+        if cut == -1:
+            break
+        pieces.append(text[start:cut + 1])
+        start = cut + 1
+    pieces.append(text[start:])
+    return pieces
+
+
+class TokenCounter:
+    def __init__(self, model: str = ""):
+        self.model = model
+        # Not exact: cl100k_base for a non-OpenAI model, or the heuristic
+        self.backend, self._encode, self.exact = _load_encoder(model)
+        self._memo: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _count_chunk(self, chunk: str) -> int:
+        key: Hashable = chunk if len(chunk) <= 64 else hashlib.blake2b(chunk.encode("utf-8"), digest_size=16).digest()
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                self.hits += 1
+                return self._memo[key]
+        n = self._encode(chunk) if self._encode is not None else heuristic_tokens(chunk)
+        if not self.exact:
+            n = math.ceil(n * approx_margin(chunk))
+        with self._lock:
+            self.misses += 1
+            self._memo[key] = n
+            if len(self._memo) > MEMO_ENTRIES:
+                self._memo.popitem(last=False)
+        return n
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        return sum(self._count_chunk(chunk) for chunk in _chunks(text))
+
+    def count_messages(self, messages: List[Dict[str, str]]) -> int:
+        # ~4 tokens of chat-template framing per message
+        return sum(self.count(m.get("content") or "") + 4 for m in messages)
+
+
+_counters: Dict[str, TokenCounter] = {}
+_counters_lock = threading.Lock()
+
+
+def get_counter(model: str = "") -> TokenCounter:
+    """Shared counter (and memo) per model."""
+    with _counters_lock:
+        if model not in _counters:
+            _counters[model] = TokenCounter(model)
+        return _counters[model]
+
+
+# -- budgeting ---------------------------------------------------------------
+
+
+def _omitted(text: str) -> str:
+    lines = text.count("\n")
+    return f"[... {lines} lines omitted ...]" if lines > 1 else f"[... {len(text)} characters omitted ...]"
+
+
+def _snap(text: str, index: int, forward: bool) -> int:
+    """Move a cut to a nearby line break, if there is one close by."""
+    window = 200
+    if forward:
+        nl = text.find("\n", index, index + window)
+        return nl + 1 if nl != -1 else index
+    nl = text.rfind("\n", max(0, index - window), index)
+    return nl + 1 if nl != -1 else index
+
+
+def trim_to_tokens(text: str, max_tokens: int, counter: TokenCounter, cut: str = "middle") -> str:
+    """Shorten ``text`` to at most ``max_tokens``.
+
+    ``cut`` says what is removed: ``"middle"`` keeps both ends, ``"tail"``
+    keeps the beginning and ``"head"`` keeps the end (e.g. for logs).
+    """
+    total = counter.count(text)
+    if total <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+    keep = int(len(text) * max_tokens / total)
+    for _ in range(12):
+        if cut == "tail":
+            end = _snap(text, keep, forward=False)
+            result = text[:end].rstrip("\n") + "\n" + _omitted(text[end:])
+        elif cut == "head":
+            start = _snap(text, len(text) - keep, forward=True)
+            result = _omitted(text[:start]) + "\n" + text[start:]
+        else:
+            head = _snap(text, keep // 2, forward=False)
+            tail = _snap(text, len(text) - keep // 2, forward=True)
+            result = text[:head].rstrip("\n") + "\n" + _omitted(text[head:tail]) + "\n" + text[tail:]
+        if counter.count(result) <= max_tokens:
+            return result
+        keep = int(keep * 0.93)
+    return ""
+
+
+@dataclass
+class Section:
+    name: str
+    text: str
+    # 0 is kept longest; higher numbers are trimmed first
+    priority: int = 1
+    cut: str = "middle"
+    min_tokens: int = MIN_SECTION_TOKENS
+
+
+def fit_sections(sections: List[Section], budget: int, counter: TokenCounter) -> List[Section]:
+    """Trim or drop the least important sections until all fit in ``budget`` tokens.
+
+    Order is preserved; dropped sections are left out of the result.  Among
+    sections of equal priority, later ones are trimmed first.
+    """
+    counts = [counter.count(s.text) for s in sections]
+    over = sum(counts) - budget
+    result: List[Optional[Section]] = list(sections)
+    order = sorted(range(len(sections)), key=lambda i: (sections[i].priority, i), reverse=True)
+    for i in order:
+        if over <= 0:
+            break
+        target = counts[i] - over
+        if target < sections[i].min_tokens:
+            result[i] = None
+            over -= counts[i]
+            continue
+        trimmed = trim_to_tokens(sections[i].text, target, counter, sections[i].cut)
+        result[i] = replace(sections[i], text=trimmed) if trimmed else None
+        over -= counts[i] - counter.count(trimmed)
+    return [s for s in result if s is not None]
@@ -9,11 +9,19 @@ This is a small, self-contained example showing how to:
 Replace the Deepseek wrapper with the official SDK when available.
 """
 import os
+import sys
 import argparse
 import json
-import requests
+from pathlib import Path
 from dotenv import load_dotenv
 
+# Repository root, so the shared `agents.llm` helpers are importable
+REPO_ROOT = Path(__file__).resolve().parents[3]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from agents.llm.client import get_client
+
 load_dotenv()
 
 DEFAULT_TEMPERATURE = float(os.environ.get("DEFAULT_TEMPERATURE", "0.2"))
@@ -31,14 +39,11 @@ class DeepseekEmbeddings:
             raise ValueError("Set DEEPSEEK_API_URL and DEEPSEEK_API_KEY in .env")
 
     def embed(self, texts):
-        resp = requests.post(
+        return get_client().post_json(
             self.url,
+            {"model": os.environ.get("DEEPSEEK_MODEL", "deepseek-r1:8b"), "input": texts},
             headers={"Authorization": f"Bearer {self.key}", "Content-Type": "application/json"},
-            json={"model": os.environ.get("DEEPSEEK_MODEL", "deepseek-r1:8b"), "input": texts},
-            timeout=30,
         )
-        resp.raise_for_status()
-        return resp.json()
 
 
 class LangChainAgent:
@@ -75,9 +80,7 @@ class LangChainAgent:
             "temperature": self.temperature,
             "max_tokens": 200,
         }
-        r = requests.post(url, json=payload, timeout=30)
-        r.raise_for_status()
-        return r.json()
+        return get_client().post_json(url, payload)
 
     def _call_openai(self, prompt: str):
         import openai
@@ -8,15 +8,35 @@ import os
 import json
 import argparse
 import subprocess
-from typing import List, Any
+import sys
+from pathlib import Path
+from typing import Iterator, List, Any, Optional, Tuple
 from dotenv import load_dotenv
-import requests
+
+# Repository root, so the shared `agents.llm` helpers are importable
+REPO_ROOT = Path(__file__).resolve().parents[3]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from agents.llm.admission import set_priority
+from agents.llm.chat_session import ChatSession
+from agents.llm.client import get_client
+from agents.llm.coalesce import EmbedCoalescer
+from agents.llm.json_stream import ArrayStreamParser
+from agents.llm.model_manager import ModelManager, configured_models, enabled as preload_enabled
+from agents.llm.observations import encode_step
+from agents.llm.semantic_cache import parse_embeddings
+from agents.llm.shell_session import ShellSession
+from agents.llm.tokens import trim_to_tokens
 
 load_dotenv()
 
 OLLAMA_BASE = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "llama2-13b-chat")
 DEFAULT_TEMPERATURE = float(os.environ.get("DEFAULT_TEMPERATURE", "0.2"))
+# Observe-act loop: plan/act rounds per task, and the tokens of action results fed back per round
+MAX_STEPS = int(os.environ.get("AGENT_MAX_STEPS", "8"))
+OBSERVATION_TOKENS = int(os.environ.get("AGENT_OBSERVATION_TOKENS", "1500"))
 
 
 class DeepseekClient:
@@ -24,49 +44,97 @@ class DeepseekClient:
         self.url = os.environ.get("DEEPSEEK_API_URL")
         self.key = os.environ.get("DEEPSEEK_API_KEY")
         self.model = os.environ.get("DEEPSEEK_MODEL", "deepseek-r1:8b")
+        # Concurrent embed calls (e.g. the pipeline's parallel batches) share round trips
+        self.coalescer = EmbedCoalescer.from_env(self._post)
 
-    def embed(self, texts: List[str]) -> Any:
+    def embed(self, texts: List[str], timeout: Optional[float] = None) -> dict:
+        """Embed ``texts``; returns ``{"embeddings": [...]}`` whichever backend shape came back."""
+        # timeout defaults to the client's embeddings timeout (LLM_EMBEDDINGS_TIMEOUT)
         if not self.url or not self.key:
             raise RuntimeError("DEEPSEEK_API_URL/DEEPSEEK_API_KEY not set in environment")
-        resp = requests.post(
+        if self.coalescer is not None and timeout is None:
+            return self.coalescer(texts)
+        return {"embeddings": parse_embeddings(self._post(texts, timeout))}
+
+    def _post(self, texts: List[str], timeout: Optional[float] = None) -> Any:
+        return get_client().post_json(
             self.url,
+            {"model": self.model, "input": texts},
             headers={"Authorization": f"Bearer {self.key}", "Content-Type": "application/json"},
-            json={"model": self.model, "input": texts},
-            timeout=30,
+            timeout=timeout,
         )
-        resp.raise_for_status()
-        return resp.json()
+
+
+class PlanError(RuntimeError):
+    """The model's reply contained no JSON plan; the message is the raw reply."""
 
 
 class FullStackAgent:
     def __init__(self, auto_execute: bool = False):
         self.auto = auto_execute
+        self.vectors = None
+        self.session = None
+        # Whether the last run_task ended with a final message (rather than at max_steps)
+        self.completed = False
+        # One long-lived shell, so cd/export/venv activation carry over between actions
+        self.shell = ShellSession.from_env()
         self.deepseek = None
         try:
             self.deepseek = DeepseekClient()
         except RuntimeError:
             self.deepseek = None
 
-    def call_ollama(self, system: str, user_prompt: str) -> str:
-        url = f"{OLLAMA_BASE}/v1/completions"
-        payload = {
-            "model": OLLAMA_MODEL,
-            "prompt": f"System:\n{system}\n\nUser:\n{user_prompt}",
-            "temperature": DEFAULT_TEMPERATURE,
-            "max_tokens": 1024,
-        }
-        r = requests.post(url, json=payload, timeout=60)
-        r.raise_for_status()
-        data = r.json()
-        if isinstance(data, dict) and "choices" in data:
-            txt = data["choices"][0].get("text") or data["choices"][0].get("message", {}).get("content")
-            return txt
-        return json.dumps(data)
-
-    def embed_texts(self, texts: List[str]):
+    def _new_session(self) -> ChatSession:
+        return ChatSession(
+            OLLAMA_MODEL,
+            system=SYSTEM_PROMPT + (SHELL_SESSION_NOTE if self.shell is not None else ""),
+            base_url=OLLAMA_BASE,
+            options={"temperature": DEFAULT_TEMPERATURE, "num_predict": 1024},
+            format=PLAN_SCHEMA,
+        )
+
+    def plan(self, task: str, keep_history: bool = True) -> Iterator[dict]:
+        """Yield the actions planned for ``task``, each as soon as the model has written it.
+
+        With ``keep_history`` the model also sees the earlier tasks of this session.
+        """
+        if not keep_history:
+            session = self._new_session()
+        else:
+            if self.session is None:
+                self.session = self._new_session()
+            session = self.session
+        parser = ArrayStreamParser("actions")
+        # A pasted log or file is cut down rather than overflowing the context
+        task = trim_to_tokens(task, session.max_message_tokens(), session.counter)
+        for delta in session.stream(task):
+            yield from parser.feed(delta)
+        if parser.count == 0:
+            # Servers that ignore `format` may still wrap a plan in prose
+            parsed = try_parse_json(parser.text)
+            if not isinstance(parsed, dict):
+                raise PlanError(parser.text)
+            yield from parsed.get("actions", [])
+
+    def embed_texts(self, texts: List[str]) -> dict:
+        """Embed texts in batches into the agent's vector store; returns a summary."""
         if not self.deepseek:
             raise RuntimeError("Deepseek client not configured (DEEPSEEK_API_URL missing)")
-        return self.deepseek.embed(texts)
+        from agents.llm.embeddings import EmbeddingPipeline, VectorStore, text_hash
+
+        if self.vectors is None:
+            self.vectors = VectorStore.for_name(os.environ.get("AGENT_VECTOR_STORE", "programming-agent"))
+        pipeline = EmbeddingPipeline(self.deepseek.embed, self.vectors, namespace=self.deepseek.model)
+        items = [(text_hash(t, self.deepseek.model)[:16], t, None) for t in texts]
+        stats = pipeline.run(items)
+        return {
+            "embedded": stats.embedded,
+            "duplicates": stats.duplicates,
+            "failed": stats.failed,
+            "ids": [item_id for item_id, _, _ in items],
+            "store": str(self.vectors.dir),
+            "vectors": len(self.vectors),
+        }
 
     def read_file(self, path: str) -> str:
         with open(path, "r", encoding="utf-8") as f:
@@ -84,21 +152,109 @@ class FullStackAgent:
             if ans.strip().lower() != "y":
                 return {"cmd": cmd, "status": "skipped", "output": "user declined"}
 
+        if self.shell is not None:
+            return self.shell.run(cmd)
         try:
             completed = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=300)
             return {"cmd": cmd, "returncode": completed.returncode, "stdout": completed.stdout, "stderr": completed.stderr}
         except subprocess.SubprocessError as e:
             return {"cmd": cmd, "status": "error", "error": str(e)}
 
+    def run_action(self, action: dict) -> dict:
+        """Execute one planned action and return its result."""
+        t = action.get("type")
+        args = action.get("args") or {}
+        if t == "shell":
+            return self.execute_shell(args.get("cmd", ""))
+        if t == "read":
+            path = args.get("path")
+            try:
+                return {"path": path, "content": self.read_file(path)}
+            except Exception as e:
+                return {"path": path, "error": str(e)}
+        if t == "write":
+            path = args.get("path")
+            try:
+                self.write_file(path, args.get("content", ""))
+                return {"path": path, "status": "written"}
+            except Exception as e:
+                return {"path": path, "error": str(e)}
+        if t == "embed":
+            try:
+                return {"embeddings": self.embed_texts(args.get("texts", []))}
+            except Exception as e:
+                return {"error": str(e)}
+        if t == "message":
+            return {"message": args.get("text", "")}
+        return {"error": f"unknown action type {t!r}"}
+
+    def run_task(self, task: str, fresh: bool = False, max_steps: int = MAX_STEPS) -> Iterator[Tuple[int, dict, dict]]:
+        """Plan, act and show the model the results until it replies with only a message.
+
+        Yields (step, action, result) as each action completes.  Each round
+        adds at most ~OBSERVATION_TOKENS of results to the conversation, so
+        prompt size and latency per step stay bounded.  ``self.completed``
+        says afterwards whether the model finished within ``max_steps``.
+        """
+        if fresh or self.session is None:
+            self.session = self._new_session()
+        self.completed = False
+        message = task
+        for step in range(1, max_steps + 1):
+            observed = []
+            for action in self.plan(message):
+                result = self.run_action(action)
+                yield step, action, result
+                if action.get("type") != "message":
+                    observed.append((action, result))
+            if not observed:
+                self.completed = True
+                return
+            message = OBSERVATION_PROMPT.format(
+                observations=encode_step(observed, OBSERVATION_TOKENS, self.session.counter)
+            )
+
 
 SYSTEM_PROMPT = (
     "You are a senior full-stack engineer assisting with code tasks.\n"
     "You have these tools available: shell(command) -> runs a shell command; "
-    "read(path) -> returns file contents; write(path, content) -> writes file; embed(texts) -> returns embeddings.\n"
+    "read(path) -> returns file contents; write(path, content) -> writes file; embed(texts) -> stores embeddings in the local vector store.\n"
     "When you want to use a tool, return a single JSON object with an 'actions' array. "
     "Each action is an object with 'type' and 'args'. Types: 'shell','read','write','embed','message'.\n"
+    "After your actions run you are shown their results; plan the next actions from them. "
+    "When the task is done, reply with only a 'message' action summarising the outcome.\n"
 )
 
+SHELL_SESSION_NOTE = (
+    "Shell commands run one after another in the same shell session: "
+    "a 'cd', an 'export' or an activated virtualenv carries over to later commands.\n"
+)
+
+OBSERVATION_PROMPT = (
+    "Results of your actions:\n{observations}\n\n"
+    "Continue with the next actions, or reply with only a 'message' action if the task is done."
+)
+
+
+# Ollama `format`: replies are constrained to this shape, so they always parse
+PLAN_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "actions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "type": {"type": "string", "enum": ["shell", "read", "write", "embed", "message"]},
+                    "args": {"type": "object"},
+                },
+                "required": ["type", "args"],
+            },
+        },
+    },
+    "required": ["actions"],
+}
+
 
 def try_parse_json(s: str):
     s = s.strip()
@@ -116,7 +272,7 @@ def try_parse_json(s: str):
 
 
 def interactive_loop(agent: FullStackAgent):
-    print("Full-stack programming agent — interactive mode. Type 'exit' to quit.")
+    print("Full-stack programming agent — interactive mode. Type 'exit' to quit, 'reset' to forget earlier tasks.")
     while True:
         try:
             user = input("task> ")
@@ -127,85 +283,77 @@ def interactive_loop(agent: FullStackAgent):
             continue
         if user.strip().lower() in ("exit", "quit"):
             break
+        if user.strip().lower() == "reset":
+            if agent.session is not None:
+                agent.session.reset()
+            print("Started a new conversation.")
+            continue
 
         print("-> calling Ollama for plan...")
-        resp = agent.call_ollama(SYSTEM_PROMPT, user)
-        parsed = try_parse_json(resp)
-        if not parsed:
-            print("LLM response (not JSON):\n", resp)
-            continue
+        run_and_print(agent, user)
+    if agent.deepseek and agent.deepseek.coalescer and agent.deepseek.coalescer.round_trips:
+        print("embeddings:", agent.deepseek.coalescer.stats_line())
+    if agent.shell is not None and agent.shell.commands:
+        print(agent.shell.stats_line())
+
+
+def print_result(action: dict, result: dict) -> None:
+    t = action.get("type")
+    if t == "message":
+        print(result["message"])
+    elif t == "read" and "content" in result:
+        print(f"--- content of {result['path']} ---\n", result["content"])
+    elif t == "write" and "status" in result:
+        print(f"Wrote {result['path']}")
+    else:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+
 
-        actions = parsed.get("actions", [])
-        for a in actions:
-            t = a.get("type")
-            args = a.get("args", {})
-            if t == "shell":
-                print(json.dumps(agent.execute_shell(args.get("cmd")), indent=2, ensure_ascii=False))
-            elif t == "read":
-                try:
-                    print(agent.read_file(args.get("path")))
-                except Exception as e:
-                    print("read error:", e)
-            elif t == "write":
-                try:
-                    agent.write_file(args.get("path"), args.get("content", ""))
-                    print("wrote", args.get("path"))
-                except Exception as e:
-                    print("write error:", e)
-            elif t == "embed":
-                try:
-                    print(agent.embed_texts(args.get("texts", [])))
-                except Exception as e:
-                    print("embed error:", e)
-            elif t == "message":
-                print(args.get("text", ""))
-            else:
-                print("unknown action", a)
-
-
-def run_single_task(agent: FullStackAgent, task: str):
-    print("-> calling Ollama for plan...")
-    resp = agent.call_ollama(SYSTEM_PROMPT, task)
-    parsed = try_parse_json(resp)
-    if not parsed:
-        print("LLM response:\n", resp)
+def run_and_print(agent: FullStackAgent, task: str, fresh: bool = False, max_steps: int = MAX_STEPS) -> None:
+    """Run the observe-act loop for ``task``, printing each result and each step's timings."""
+    step = 0
+
+    def end_step() -> None:
+        if step and agent.session.turns:
+            print(f"[step {step}: {agent.session.turns[-1].summary()}]")
+
+    try:
+        # Each action runs as soon as it is complete, while the rest of the plan is generated
+        for n, action, result in agent.run_task(task, fresh=fresh, max_steps=max_steps):
+            if n != step:
+                end_step()
+                step = n
+            print_result(action, result)
+    except PlanError as e:
+        print("LLM response (not JSON):\n", e)
         return
-    actions = parsed.get("actions", [])
-    for a in actions:
-        t = a.get("type")
-        args = a.get("args", {})
-        if t == "shell":
-            print(json.dumps(agent.execute_shell(args.get("cmd")), indent=2, ensure_ascii=False))
-        elif t == "read":
-            try:
-                print(agent.read_file(args.get("path")))
-            except Exception as e:
-                print("read error:", e)
-        elif t == "write":
-            try:
-                agent.write_file(args.get("path"), args.get("content", ""))
-                print("wrote", args.get("path"))
-            except Exception as e:
-                print("write error:", e)
-        elif t == "embed":
-            print(agent.embed_texts(args.get("texts", [])))
-        elif t == "message":
-            print(args.get("text", ""))
-        else:
-            print("unknown action", a)
+    end_step()
+    if not agent.completed:
+        print(f"Stopped after {max_steps} steps without a final message (see --max-steps / AGENT_MAX_STEPS).")
+
+
+def run_single_task(agent: FullStackAgent, task: str, max_steps: int = MAX_STEPS):
+    run_and_print(agent, task, fresh=True, max_steps=max_steps)
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--task", help="One-off task to run (non-interactive)")
     parser.add_argument("--auto", action="store_true", help="Auto-execute shell commands without confirmations")
+    parser.add_argument("--max-steps", type=int, default=MAX_STEPS, help="Plan/act rounds per task before stopping")
     args = parser.parse_args()
 
     agent = FullStackAgent(auto_execute=args.auto)
     if args.task:
-        run_single_task(agent, args.task)
+        run_single_task(agent, args.task, max_steps=args.max_steps)
     else:
+        set_priority("interactive")
+        # Load the model while the user types the first task, and keep it warm
+        if preload_enabled():
+            ModelManager(OLLAMA_BASE).start(configured_models(OLLAMA_MODEL))
         interactive_loop(agent)
+    if agent.shell is not None:
+        agent.shell.close()
 
 
 if __name__ == "__main__":
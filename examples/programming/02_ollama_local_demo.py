@@ -3,11 +3,27 @@
 
 This script POSTs to the local Ollama HTTP API (OpenAI-compatible) to request
 chat completions (e.g., generate a Python web-scraper). It prefers the
-`requests` library and falls back to invoking `curl` if `requests` is not
-available.
+shared pooled client in `agents.llm.client` (built on `requests`) and falls
+back to the dependency-free keep-alive `http.client` transport in
+`agents.llm.http_transport` if that is not available. `--use-curl` keeps the
+old per-call `curl` subprocess path for comparison.
+
+With `--stream` the completion is printed token by token as it arrives
+(SSE from the OpenAI-compatible endpoint, NDJSON from the native `/api/chat`
+endpoint with `--native`), followed by time-to-first-token and tokens/s.
+
+With `--prompts-file` every line of a JSONL file (`{"prompt": ..., "id": ...}`
+or a bare JSON string) is sent concurrently, up to `--concurrency` requests at
+a time; results are written to JSONL in input order with per-prompt latency
+and token counts, followed by a throughput and p50/p95 latency summary.
+Set `OLLAMA_ENDPOINTS` (or `--endpoints`) to a comma-separated list of Ollama
+base URLs to spread the batch over several machines with least-outstanding-
+requests routing (see `agents/llm/router.py`).
 
 Usage:
   python examples/programming/02_ollama_local_demo.py --prompt "生成一份网页爬虫Python代码"
+  python examples/programming/02_ollama_local_demo.py --stream --prompt "..."
+  python examples/programming/02_ollama_local_demo.py --prompts-file prompts.jsonl --concurrency 8
 
 Environment variables:
   OLLAMA_BASE_URL    default: http://127.0.0.1:11434
@@ -19,14 +35,26 @@ from __future__ import annotations
 
 import os
 import json
+import time
+import asyncio
 import argparse
 import subprocess
-from typing import Any, Dict
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+# Repository root, so the shared `agents.llm` helpers are importable
+REPO_ROOT = Path(__file__).resolve().parents[2]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
 
 
 DEFAULT_BASE = os.environ.get("OLLAMA_BASE_URL", "http://127.0.0.1:11434")
 DEFAULT_KEY = os.environ.get("OLLAMA_API_KEY", "ollama")
 DEFAULT_MODEL = os.environ.get("DEEPSEEK_MODEL", "deepseek-r1:8b")
+# The requests/stdlib paths take their timeouts from agents.llm.client and retry.py
+CURL_TIMEOUT = 120
 
 
 def build_payload(prompt: str, model: str, temperature: float, max_tokens: int) -> Dict[str, Any]:
@@ -38,19 +66,42 @@ def build_payload(prompt: str, model: str, temperature: float, max_tokens: int)
     }
 
 
-def call_with_requests(url: str, headers: Dict[str, str], payload: Dict[str, Any], timeout: int = 120) -> Dict[str, Any]:
+def build_native_payload(prompt: str, model: str, temperature: float, max_tokens: int) -> Dict[str, Any]:
+    """Payload for Ollama's native /api/chat endpoint."""
+    return {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "options": {"temperature": temperature, "num_predict": max_tokens},
+        "stream": False,
+    }
+
+
+def _streaming_payload(url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    payload = dict(payload, stream=True)
+    if "/v1/" in url:
+        # ask the OpenAI-compatible endpoint for a final usage chunk
+        payload.setdefault("stream_options", {"include_usage": True})
+    return payload
+
+
+def call_with_requests(url: str, headers: Dict[str, str], payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
     import requests
-    resp = requests.post(url, headers=headers, json=payload, timeout=timeout)
+    from agents.llm.client import get_client
     try:
-        resp.raise_for_status()
-    except Exception as e:
+        return get_client().post_json(url, payload, headers=headers, timeout=timeout)
+    except requests.HTTPError as e:
         # include response body to aid debugging (status and server message)
+        resp = e.response
         body = resp.text if resp is not None else ''
-        raise RuntimeError(f"HTTP {resp.status_code}: {body}") from e
-    return resp.json()
+        raise RuntimeError(f"HTTP {getattr(resp, 'status_code', '?')}: {body}") from e
+
+
+def call_with_stdlib(url: str, headers: Dict[str, str], payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+    from agents.llm.http_transport import get_transport
+    return get_transport().post_json(url, payload, headers=headers, timeout=timeout)
 
 
-def call_with_curl(url: str, headers: Dict[str, str], payload: Dict[str, Any], timeout: int = 120) -> Dict[str, Any]:
+def call_with_curl(url: str, headers: Dict[str, str], payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
     # Build curl command similar to the user's example
     hdrs = []
     for k, v in headers.items():
@@ -59,40 +110,229 @@ def call_with_curl(url: str, headers: Dict[str, str], payload: Dict[str, Any], t
     data = json.dumps(payload, ensure_ascii=False)
     cmd = ["curl", "-sS", url, *hdrs, "-d", data]
 
-    completed = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    from agents.llm.admission import admit
+    from agents.llm.metrics import record_call
+    from agents.llm.retry import cap_timeout
+    with admit(url) as queued:
+        t0 = time.perf_counter()
+        completed = subprocess.run(cmd, capture_output=True, text=True, timeout=cap_timeout(timeout or CURL_TIMEOUT))
     if completed.returncode != 0:
         raise RuntimeError(f"curl failed: {completed.stderr.strip()}")
-    return json.loads(completed.stdout)
+    data = json.loads(completed.stdout)
+    record_call(url, payload, data, time.perf_counter() - t0, queue_s=queued)
+    return data
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--prompt", "-p", default="生成一份网页爬虫Python代码")
-    parser.add_argument("--model", "-m", default=DEFAULT_MODEL)
-    parser.add_argument("--temperature", "-t", type=float, default=0.7)
-    parser.add_argument("--max-tokens", type=int, default=2000)
-    parser.add_argument("--use-curl", action="store_true", help="Force using curl instead of requests")
-    args = parser.parse_args()
+def stream_with_requests(url: str, headers: Dict[str, str], payload: Dict[str, Any], timeout: Optional[float] = None,
+                         stats: Optional[Any] = None) -> Iterator[str]:
+    """Yield completion text deltas as they arrive (SSE or NDJSON)."""
+    from agents.llm.admission import admit
+    from agents.llm.client import get_client
+    from agents.llm.streaming import iter_deltas
+    payload = _streaming_payload(url, payload)
+    with admit(url) as queued:
+        resp = get_client().open_stream(url, payload, headers=headers, timeout=timeout)
+        try:
+            try:
+                resp.raise_for_status()
+            except Exception as e:
+                raise RuntimeError(f"HTTP {resp.status_code}: {resp.text}") from e
+            yield from iter_deltas(resp.iter_lines(), stats, url=url, payload=payload, queue_s=queued)
+        finally:
+            resp.close()
 
-    endpoint = f"{DEFAULT_BASE.rstrip('/')}/v1/chat/completions"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {DEFAULT_KEY}",
+
+def stream_with_stdlib(url: str, headers: Dict[str, str], payload: Dict[str, Any], timeout: Optional[float] = None,
+                       stats: Optional[Any] = None) -> Iterator[str]:
+    """Like `stream_with_requests`, over the stdlib keep-alive transport."""
+    from agents.llm.http_transport import get_transport
+    from agents.llm.streaming import iter_deltas
+    payload = _streaming_payload(url, payload)
+    lines = get_transport().stream_lines(url, payload, headers=headers, timeout=timeout)
+    yield from iter_deltas(lines, stats, url=url, payload=payload)
+
+
+def stream_with_curl(url: str, headers: Dict[str, str], payload: Dict[str, Any], timeout: Optional[float] = None,
+                     stats: Optional[Any] = None) -> Iterator[str]:
+    """Like `stream_with_requests`, reading `curl -N` output line by line."""
+    from agents.llm.admission import admit
+    from agents.llm.retry import cap_timeout
+    from agents.llm.streaming import iter_deltas
+    hdrs = []
+    for k, v in headers.items():
+        hdrs += ["-H", f"{k}: {v}"]
+
+    payload = _streaming_payload(url, payload)
+    data = json.dumps(payload, ensure_ascii=False)
+    cmd = ["curl", "-sS", "-N", "--max-time", str(int(cap_timeout(timeout or CURL_TIMEOUT))), url, *hdrs, "-d", data]
+
+    with admit(url) as queued:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            yield from iter_deltas(proc.stdout, stats, url=url, payload=payload, queue_s=queued)
+            if proc.wait() != 0:
+                raise RuntimeError(f"curl failed: {proc.stderr.read().decode(errors='replace').strip()}")
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+            proc.stdout.close()
+            proc.stderr.close()
+
+
+def print_stream(deltas: Iterator[str]) -> int:
+    """Print deltas as they arrive; return how many were printed."""
+    printed = 0
+    for delta in deltas:
+        print(delta, end="", flush=True)
+        printed += 1
+    print()
+    return printed
+
+
+def extract_content(result: Any) -> Optional[str]:
+    """Generated text from an OpenAI-style or native Ollama response."""
+    if not isinstance(result, dict):
+        return None
+    if result.get("choices"):
+        choice = result["choices"][0]
+        return (choice.get("message") or {}).get("content") or choice.get("text")
+    return (result.get("message") or {}).get("content") or result.get("response")
+
+
+def extract_usage(result: Any) -> Dict[str, Optional[int]]:
+    """Prompt/completion token counts from `usage` or Ollama's eval counters."""
+    if not isinstance(result, dict):
+        return {"prompt_tokens": None, "completion_tokens": None}
+    usage = result.get("usage") or {}
+    return {
+        "prompt_tokens": usage.get("prompt_tokens", result.get("prompt_eval_count")),
+        "completion_tokens": usage.get("completion_tokens", result.get("eval_count")),
     }
 
-    payload = build_payload(args.prompt, args.model, args.temperature, args.max_tokens)
 
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100.0 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def load_prompts(path: Path) -> List[Dict[str, Any]]:
+    prompts = []
+    with path.open("r", encoding="utf-8") as f:
+        for lineno, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"prompt": item}
+            if "prompt" not in item:
+                raise ValueError(f"{path}:{lineno}: missing 'prompt'")
+            item.setdefault("id", lineno)
+            prompts.append(item)
+    return prompts
+
+
+async def run_batch(prompts: List[Dict[str, Any]], endpoint: str, headers: Dict[str, str], args: argparse.Namespace,
+                    output: Path, router: Optional[Any] = None) -> List[Dict[str, Any]]:
+    """Send prompts concurrently and write results to `output` in input order.
+
+    With a `router` each request goes to the least-busy healthy host instead
+    of `endpoint`; only the endpoint's path is used.
+    """
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=args.concurrency)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    make_payload = build_native_payload if args.native else build_payload
+    records: List[Optional[Dict[str, Any]]] = [None] * len(prompts)
+    next_to_write = 0
+    api_path = "/" + endpoint.split("://", 1)[-1].split("/", 1)[-1]
+
+    def send(payload: Dict[str, Any]) -> Dict[str, Any]:
+        if router is not None:
+            return router.post_json(api_path, payload, headers=headers)
+        return call_with_requests(endpoint, headers, payload)
+
+    async def one(index: int, item: Dict[str, Any], out) -> None:
+        nonlocal next_to_write
+        payload = make_payload(
+            item["prompt"],
+            item.get("model", args.model),
+            item.get("temperature", args.temperature),
+            item.get("max_tokens", args.max_tokens),
+        )
+        async with semaphore:
+            t0 = time.perf_counter()
+            try:
+                result = await loop.run_in_executor(executor, send, payload)
+                record = {"id": item["id"], "content": extract_content(result), **extract_usage(result)}
+            except Exception as e:
+                record = {"id": item["id"], "error": str(e)}
+            record["latency_s"] = round(time.perf_counter() - t0, 4)
+        records[index] = record
+        # flush every finished record that is next in input order
+        while next_to_write < len(records) and records[next_to_write] is not None:
+            out.write(json.dumps(records[next_to_write], ensure_ascii=False) + "\n")
+            next_to_write += 1
+        out.flush()
+
+    try:
+        with output.open("w", encoding="utf-8") as out:
+            await asyncio.gather(*(one(i, item, out) for i, item in enumerate(prompts)))
+    finally:
+        executor.shutdown(wait=False)
+    return records  # type: ignore[return-value]
+
+
+def print_batch_summary(records: List[Dict[str, Any]], wall: float) -> None:
+    ok = [r for r in records if "error" not in r]
+    latencies = [r["latency_s"] for r in ok]
+    completion = sum(r.get("completion_tokens") or 0 for r in ok)
+    print("\n=== Batch summary ===")
+    print(f"prompts: {len(records)}  ok: {len(ok)}  errors: {len(records) - len(ok)}  wall: {wall:.2f}s")
+    print(f"throughput: {len(ok) / wall:.2f} req/s, {completion / wall:.1f} completion tokens/s")
+    if latencies:
+        print(f"latency p50: {percentile(latencies, 50):.2f}s  p95: {percentile(latencies, 95):.2f}s  "
+              f"max: {max(latencies):.2f}s")
+
+
+def run_single(endpoint: str, headers: Dict[str, str], payload: Dict[str, Any], args: argparse.Namespace) -> None:
+    """One call (or stream), falling back from requests to the stdlib transport."""
     print(f"Calling {endpoint} with model={args.model} temperature={args.temperature}")
 
-    use_curl = args.use_curl
-    if not use_curl:
+    transport = "curl" if args.use_curl else "stdlib" if args.use_stdlib else "requests"
+    if args.stream:
+        from agents.llm.streaming import StreamStats
+        stats = StreamStats()
+        print("\n=== Generated content ===\n")
+        if transport == "requests":
+            try:
+                print_stream(stream_with_requests(endpoint, headers, payload, stats=stats))
+            except Exception as e:
+                # only fall back if nothing was printed yet
+                if stats.chunks:
+                    raise
+                print("requests stream failed, falling back to http.client:", e)
+                transport = "stdlib"
+                stats = StreamStats()
+        if transport == "stdlib":
+            print_stream(stream_with_stdlib(endpoint, headers, payload, stats=stats))
+        elif transport == "curl":
+            print_stream(stream_with_curl(endpoint, headers, payload, stats=stats))
+        print(f"\n[{stats.summary()}]")
+        return
+
+    if transport == "requests":
         try:
             result = call_with_requests(endpoint, headers, payload)
-        except Exception as e:  # fallback to curl
-            print("requests call failed, falling back to curl:", e)
-            use_curl = True
+        except Exception as e:  # fallback to the stdlib transport
+            print("requests call failed, falling back to http.client:", e)
+            transport = "stdlib"
 
-    if use_curl:
+    if transport == "stdlib":
+        result = call_with_stdlib(endpoint, headers, payload)
+    elif transport == "curl":
         result = call_with_curl(endpoint, headers, payload)
 
     # Pretty-print the returned JSON; try to extract content if following chat schema
@@ -108,11 +348,85 @@ def main() -> None:
                 print(content)
             else:
                 print(json.dumps(result, indent=2, ensure_ascii=False))
+        elif isinstance(result, dict) and result.get("message", {}).get("content"):
+            # Native /api/chat response
+            print("\n=== Generated content ===\n")
+            print(result["message"]["content"])
         else:
             print(json.dumps(result, indent=2, ensure_ascii=False))
     except Exception:
         print(json.dumps(result, indent=2, ensure_ascii=False))
 
 
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--prompt", "-p", default="生成一份网页爬虫Python代码")
+    parser.add_argument("--model", "-m", default=DEFAULT_MODEL)
+    parser.add_argument("--temperature", "-t", type=float, default=0.7)
+    parser.add_argument("--max-tokens", type=int, default=2000)
+    parser.add_argument("--use-stdlib", action="store_true", help="Force the stdlib http.client transport instead of requests")
+    parser.add_argument("--use-curl", action="store_true", help="Force a curl subprocess per call (legacy, for comparison)")
+    parser.add_argument("--stream", action="store_true", help="Print tokens as they arrive")
+    parser.add_argument("--native", action="store_true", help="Use Ollama's native /api/chat endpoint")
+    parser.add_argument("--prompts-file", type=Path, help="JSONL file of prompts to run as a batch")
+    parser.add_argument("--output", "-o", type=Path, help="Batch results JSONL (default: <prompts-file>.results.jsonl)")
+    parser.add_argument("--concurrency", "-c", type=int, default=4, help="Max in-flight requests in batch mode")
+    parser.add_argument("--deadline", type=float, help="Give up on a single call after this many seconds, retries included")
+    parser.add_argument("--endpoints", default=os.environ.get("OLLAMA_ENDPOINTS"),
+                        help="Comma-separated Ollama base URLs (url[=model|model]) to spread a batch over")
+    args = parser.parse_args()
+
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {DEFAULT_KEY}",
+    }
+
+    if args.native:
+        endpoint = f"{DEFAULT_BASE.rstrip('/')}/api/chat"
+        payload = build_native_payload(args.prompt, args.model, args.temperature, args.max_tokens)
+    else:
+        endpoint = f"{DEFAULT_BASE.rstrip('/')}/v1/chat/completions"
+        payload = build_payload(args.prompt, args.model, args.temperature, args.max_tokens)
+
+    if args.prompts_file:
+        from agents.llm.admission import set_priority
+        from agents.llm.client import DEFAULT_POOL_SIZE, configure
+        # interactive users of the same Ollama go first
+        set_priority("batch")
+        args.concurrency = max(1, args.concurrency)
+        # one pooled connection per in-flight request
+        configure(pool_size=max(DEFAULT_POOL_SIZE, args.concurrency))
+        prompts = load_prompts(args.prompts_file)
+        output = args.output or args.prompts_file.with_suffix(".results.jsonl")
+        print(f"Running {len(prompts)} prompts against {endpoint} "
+              f"(model={args.model}, concurrency={args.concurrency})")
+        router = None
+        if args.endpoints:
+            from agents.llm.hedging import Hedger
+            from agents.llm.router import OllamaRouter, parse_endpoints
+            router = OllamaRouter(parse_endpoints(args.endpoints), hedger=Hedger.from_env()).start()
+            print(f"Routing over {len(router.endpoints)} endpoints")
+        t0 = time.perf_counter()
+        try:
+            records = asyncio.run(run_batch(prompts, endpoint, headers, args, output, router=router))
+        finally:
+            if router is not None:
+                router.stop()
+        print_batch_summary(records, time.perf_counter() - t0)
+        if router is not None:
+            for line in router.stats_lines():
+                print(f"  {line}")
+        print(f"Results written to {output}")
+        return
+
+    if args.deadline:
+        from agents.llm.retry import deadline
+        # One budget for the call, a fallback transport included
+        with deadline(args.deadline):
+            run_single(endpoint, headers, payload, args)
+    else:
+        run_single(endpoint, headers, payload, args)
+
 if __name__ == "__main__":
     main()
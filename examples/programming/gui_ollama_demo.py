@@ -21,6 +21,7 @@ from PIL import Image, ImageTk
 import tempfile
 import subprocess
 import os
+import time
 
 
 def load_demo_module() -> object:
@@ -45,6 +46,12 @@ class OllamaGUI:
             self.mod = load_demo_module()
         except Exception as e:
             messagebox.showerror("Module load error", f"Failed to load demo module:\n{e}")
+        try:
+            # Prompts typed here go ahead of batch jobs sharing the same Ollama
+            from agents.llm.admission import set_priority
+            set_priority("interactive")
+        except ImportError:
+            pass
 
         frm = ttk.Frame(root, padding=12)
         frm.grid(sticky="nsew")
@@ -74,13 +81,19 @@ class OllamaGUI:
         self.timeout_var = tk.IntVar(value=120)
         ttk.Entry(frm, textvariable=self.timeout_var, width=10).grid(row=3, column=3, sticky="w")
 
-        self.use_curl = tk.BooleanVar(value=False)
-        ttk.Checkbutton(frm, text="Force curl", variable=self.use_curl).grid(row=3, column=2, sticky="w")
+        self.use_stdlib = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frm, text="Force stdlib HTTP", variable=self.use_stdlib).grid(row=3, column=2, sticky="w")
 
         self.send_btn = ttk.Button(frm, text="Send", command=self.on_send)
         self.send_btn.grid(row=3, column=3, sticky="e")
 
         ttk.Label(frm, text="Response:").grid(row=4, column=0, sticky="w", pady=(8, 0))
+
+        # semantic cache: answer paraphrased prompts from earlier answers
+        self.semantic_var = tk.BooleanVar(value=os.environ.get("SEMANTIC_CACHE", "0").lower() in ("1", "true", "yes", "on"))
+        ttk.Checkbutton(frm, text="Semantic cache", variable=self.semantic_var).grid(row=4, column=3, sticky="e", pady=(8, 0))
+        self._semantic_caches = {}
+        self._model_manager = self._start_model_manager()
         self.output = scrolledtext.ScrolledText(frm, height=20, width=100)
         self.output.grid(row=5, column=0, columnspan=4, sticky="nsew")
 
@@ -155,9 +168,12 @@ class OllamaGUI:
             messagebox.showwarning("Empty prompt", "Please enter a prompt.")
             return
         model = self.model_var.get().strip() or getattr(self.mod, 'DEFAULT_MODEL', 'deepseek-r1:8b')
+        if self._model_manager is not None:
+            self._model_manager.watch(model)
         temp = float(self.temp_var.get())
         max_tokens = int(self.max_var.get())
-        use_curl = bool(self.use_curl.get())
+        use_stdlib = bool(self.use_stdlib.get())
+        use_semantic = bool(self.semantic_var.get())
 
         self.send_btn.config(state=tk.DISABLED)
         self.append_output(f"\nYou: {prompt}\n")
@@ -167,7 +183,7 @@ class OllamaGUI:
             self.q.put(f"Generating image for: {image_prompt} ...")
             threading.Thread(target=self.image_worker, args=(image_prompt,), daemon=True).start()
         else:
-            threading.Thread(target=self.worker, args=(prompt, model, temp, max_tokens, use_curl), daemon=True).start()
+            threading.Thread(target=self.worker, args=(prompt, model, temp, max_tokens, use_stdlib, use_semantic), daemon=True).start()
 
     def image_worker(self, prompt: str) -> None:
         try:
@@ -188,7 +204,59 @@ class OllamaGUI:
         finally:
             self.root.after(0, lambda: self.send_btn.config(state=tk.NORMAL))
 
-    def worker(self, prompt: str, model: str, temperature: float, max_tokens: int, use_curl: bool) -> None:
+    def _start_model_manager(self):
+        """Keep the selected model loaded in Ollama so the first Send is not a cold start."""
+        try:
+            from agents.llm.model_manager import ModelManager, configured_models, enabled
+            if not enabled():
+                return None
+            base = getattr(self.mod, 'DEFAULT_BASE', 'http://127.0.0.1:11434')
+            return ModelManager(base).start(configured_models(self.model_var.get().strip()))
+        except Exception:
+            logging.exception('Model preloading unavailable')
+            return None
+
+    def _semantic_cache(self, model: str):
+        """Per-model semantic cache (created on first use), or None if unavailable."""
+        if model not in self._semantic_caches:
+            try:
+                from agents.llm.semantic_cache import SemanticCache, ollama_embedder
+                base = getattr(self.mod, 'DEFAULT_BASE', 'http://127.0.0.1:11434')
+                self._semantic_caches[model] = SemanticCache.for_namespace(f"gui-{model}", ollama_embedder(base))
+            except Exception as e:
+                self.q.put(f"Semantic cache unavailable: {e}")
+                self._semantic_caches[model] = None
+        return self._semantic_caches[model]
+
+    def _show_content(self, content: str) -> None:
+        self.q.put(content)
+        # store last generated and auto-speak if enabled
+        try:
+            self._last_generated = content
+            auto_s = self.auto_speak_var.get() if getattr(self, 'auto_speak_var', None) is not None else getattr(self, 'auto_speak', False)
+            if auto_s:
+                self.root.after(0, lambda c=content: self._play_text(c))
+        except Exception:
+            pass
+
+    def worker(self, prompt: str, model: str, temperature: float, max_tokens: int, use_stdlib: bool,
+               use_semantic: bool = False) -> None:
+        cache = self._semantic_cache(model) if use_semantic else None
+        vec = None
+        if cache is not None:
+            try:
+                hit, vec = cache.lookup(prompt)
+            except Exception as e:
+                self.q.put(f"Semantic cache lookup failed: {e}")
+                hit = None
+            if hit is not None:
+                self.q.put("=== Generated content (semantic cache) ===")
+                self._show_content(hit)
+                self.q.put(cache.stats_line())
+                self.root.after(0, lambda: self.send_btn.config(state=tk.NORMAL))
+                return
+
+        t_request = time.perf_counter()
         try:
             payload = self.mod.build_payload(prompt, model, temperature, max_tokens)
             endpoint = f"{getattr(self.mod, 'DEFAULT_BASE', 'http://127.0.0.1:11434').rstrip('/')}/v1/chat/completions"
@@ -213,23 +281,17 @@ class OllamaGUI:
             except Exception:
                 pass
 
-            if not use_curl:
+            if not use_stdlib:
                 try:
                     res = self.mod.call_with_requests(endpoint, headers, payload, timeout=timeout)
                 except TypeError:
                     # older demo module may not accept timeout param
                     res = self.mod.call_with_requests(endpoint, headers, payload)
                 except Exception as e:
-                    self.q.put(f"requests failed: {e}; falling back to curl")
-                    try:
-                        res = self.mod.call_with_curl(endpoint, headers, payload, timeout=timeout)
-                    except TypeError:
-                        res = self.mod.call_with_curl(endpoint, headers, payload)
+                    self.q.put(f"requests failed: {e}; falling back to http.client")
+                    res = self.mod.call_with_stdlib(endpoint, headers, payload, timeout=timeout)
             else:
-                try:
-                    res = self.mod.call_with_curl(endpoint, headers, payload, timeout=timeout)
-                except TypeError:
-                    res = self.mod.call_with_curl(endpoint, headers, payload)
+                res = self.mod.call_with_stdlib(endpoint, headers, payload, timeout=timeout)
 
         # Pretty-format response
             if isinstance(res, dict) and "choices" in res:
@@ -239,15 +301,10 @@ class OllamaGUI:
                     content = choice.get("message", {}).get("content") or choice.get("text")
                 if content:
                     self.q.put("=== Generated content ===")
-                    self.q.put(content)
-                    # store last generated and auto-speak if enabled
-                    try:
-                        self._last_generated = content
-                        auto_s = self.auto_speak_var.get() if getattr(self, 'auto_speak_var', None) is not None else getattr(self, 'auto_speak', False)
-                        if auto_s:
-                            self.root.after(0, lambda c=content: self._play_text(c))
-                    except Exception:
-                        pass
+                    self._show_content(content)
+                    if cache is not None and vec is not None:
+                        cache.store(prompt, content, time.perf_counter() - t_request, vec)
+                        self.q.put(cache.stats_line())
                 else:
                     self.q.put(json.dumps(res, indent=2, ensure_ascii=False))
             else: